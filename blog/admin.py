@@ -7,16 +7,17 @@ from .models import Post, Comment, Like, Profile
 class ImagePreviewMixin:
     def image_preview(self, obj):
         if obj.image:
-            return mark_safe(f'<img src="{obj.image.url}" style="max-height: 200px; max-width: 200px; object-fit: contain;" />')
+            # The smallest card rendition once it exists, else the upload
+            return mark_safe(f'<img src="{obj.card_image.src}" style="max-height: 200px; max-width: 200px; object-fit: contain;" />')
         return "No Image"
     image_preview.short_description = 'Preview'
 
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin, ImagePreviewMixin):
-    list_display = ['title', 'author', 'created_at', 'view_count', 'image_preview']
+    list_display = ['title', 'author', 'created_at', 'view_count', 'like_count', 'comment_count', 'image_preview']
     list_filter = ['created_at', 'author']
     search_fields = ['title', 'content']
-    readonly_fields = ['created_at', 'updated_at', 'view_count', 'image_preview']
+    readonly_fields = ['created_at', 'updated_at', 'view_count', 'like_count', 'dislike_count', 'comment_count', 'image_preview']
     fieldsets = (
         (None, {
             'fields': ('title', 'content', 'author')
@@ -25,16 +26,12 @@ class PostAdmin(admin.ModelAdmin, ImagePreviewMixin):
             'fields': ('image', 'image_preview')
         }),
         ('Metadata', {
-            'fields': ('created_at', 'updated_at', 'view_count'),
+            'fields': ('created_at', 'updated_at', 'view_count', 'like_count', 'dislike_count', 'comment_count'),
             'classes': ('collapse',)
         }),
     )
-    
-    def save_model(self, request, obj, form, change):
-        if 'image' in form.changed_data and obj.image:
-            # Handle image resizing here if needed
-            pass
-        super().save_model(request, obj, form, change)
+    # Resized copies of a new image are built in the background by the
+    # Post post_save hook in blog.signals (see blog.images)
 
 @admin.register(Comment)
 class CommentAdmin(admin.ModelAdmin):
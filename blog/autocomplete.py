@@ -0,0 +1,230 @@
+"""
+Username typeahead served from process memory.
+
+Each worker keeps two sorted arrays of (term, user id): lowercased
+usernames, and the words of each display name plus the whole name. A
+lookup bisects to the first key with the prefix and walks forward, with no
+database or cache round trip, so username matches come back in
+microseconds and are listed before display-name matches.
+
+The index is loaded on first use and then kept current incrementally.
+User and Profile saves re-read the changed user once the write commits and
+append the user id to a change log in the shared cache. Other workers
+replay that log at most every AUTOCOMPLETE_REFRESH_INTERVAL seconds, so a
+privacy change reaches every worker within that interval. A worker that
+falls too far behind, or finds log entries evicted, rebuilds its copy in a
+background thread and keeps serving the old one meanwhile.
+"""
+import bisect
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from .search import visible_settings
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'blog:autocomplete:version'
+CHANGE_KEY_PREFIX = 'blog:autocomplete:change:'
+CHANGE_LOG_TIMEOUT = 3600
+# Past this many pending changes a full rebuild is cheaper than replaying them
+MAX_REPLAY = 1000
+# Hidden matches skipped per array before a lookup gives up
+MAX_SCAN = 1000
+
+
+def name_terms(full_name):
+    """Prefix-searchable terms for a display name: each word and the whole name"""
+    full_name = full_name.lower()
+    terms = set(full_name.split())
+    if full_name:
+        terms.add(full_name)
+    return terms
+
+
+def _discard(keys, key):
+    index = bisect.bisect_left(keys, key)
+    if index < len(keys) and keys[index] == key:
+        del keys[index]
+
+
+class PrefixIndex:
+    def __init__(self, refresh_interval=None):
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._usernames = []
+        self._names = []
+        self._users = {}
+        self._loaded = False
+        self._version = 0
+        self._checked_at = 0.0
+
+    def get_refresh_interval(self):
+        if self.refresh_interval is not None:
+            return self.refresh_interval
+        return getattr(settings, 'AUTOCOMPLETE_REFRESH_INTERVAL', 10)
+
+    def __len__(self):
+        return len(self._users)
+
+    def visibility_of(self, user_id):
+        """The indexed privacy setting for a user, or None if not indexed here"""
+        entry = self._users.get(user_id)
+        return entry[2] if entry else None
+
+    def load(self, rows):
+        """Replace the index with (user_id, username, full_name, visibility) rows"""
+        usernames, names, users = [], [], {}
+        for user_id, username, full_name, visibility in rows:
+            users[user_id] = (username, full_name, visibility)
+            usernames.append((username.lower(), user_id))
+            names.extend((term, user_id) for term in name_terms(full_name))
+        usernames.sort()
+        names.sort()
+        with self._lock:
+            self._usernames, self._names, self._users = usernames, names, users
+            self._loaded = True
+
+    def _rows_from_database(self, user_ids=None):
+        users = get_user_model().objects.order_by()
+        if user_ids is not None:
+            users = users.filter(pk__in=user_ids)
+        for user_id, username, first_name, last_name, visibility in users.values_list(
+            'pk', 'username', 'first_name', 'last_name', 'profile__privacy_setting'
+        ).iterator(chunk_size=10000):
+            yield user_id, username, f'{first_name} {last_name}'.strip(), visibility or 'public'
+
+    def reload(self):
+        # Read the version first: changes committed during the load are
+        # replayed again afterwards, which is harmless
+        version = cache.get(VERSION_KEY, 0)
+        started = time.monotonic()
+        self.load(self._rows_from_database())
+        self._version = version
+        logger.info(f"Loaded {len(self)} users into the autocomplete index in {time.monotonic() - started:.2f}s")
+
+    def _background_reload(self):
+        try:
+            self.reload()
+        except Exception:
+            logger.exception("Could not rebuild the autocomplete index")
+        finally:
+            self._reload_lock.release()
+            connection.close()
+
+    def _remove(self, user_id):
+        entry = self._users.pop(user_id, None)
+        if entry is None:
+            return
+        username, full_name, _ = entry
+        _discard(self._usernames, (username.lower(), user_id))
+        for term in name_terms(full_name):
+            _discard(self._names, (term, user_id))
+
+    def refresh_users(self, user_ids):
+        """Re-read the given users from the database and update their entries"""
+        if not self._loaded:
+            return
+        user_ids = set(user_ids)
+        rows = list(self._rows_from_database(user_ids))
+        with self._lock:
+            for user_id in user_ids:
+                self._remove(user_id)
+            for user_id, username, full_name, visibility in rows:
+                self._users[user_id] = (username, full_name, visibility)
+                bisect.insort(self._usernames, (username.lower(), user_id))
+                for term in name_terms(full_name):
+                    bisect.insort(self._names, (term, user_id))
+
+    def _replay_changes(self):
+        current = cache.get(VERSION_KEY, 0)
+        if current == self._version:
+            return
+        if current < self._version or current - self._version > MAX_REPLAY:
+            self._start_background_reload()
+            return
+        keys = [f'{CHANGE_KEY_PREFIX}{version}' for version in range(self._version + 1, current + 1)]
+        changed = cache.get_many(keys)
+        if len(changed) < len(keys):
+            # Expired or evicted entries: we can't tell who changed
+            self._start_background_reload()
+            return
+        self.refresh_users(changed.values())
+        self._version = current
+
+    def _start_background_reload(self):
+        if self._reload_lock.acquire(blocking=False):
+            threading.Thread(target=self._background_reload, daemon=True).start()
+
+    def ensure_fresh(self):
+        if not self._loaded:
+            with self._reload_lock:
+                if not self._loaded:
+                    self.reload()
+                    self._checked_at = time.monotonic()
+            return
+        now = time.monotonic()
+        if now - self._checked_at < self.get_refresh_interval() or self._reload_lock.locked():
+            return
+        self._checked_at = now
+        try:
+            self._replay_changes()
+        except Exception:
+            logger.exception("Could not replay autocomplete index changes")
+
+    def lookup(self, prefix, viewer, limit=10):
+        """
+        Up to `limit` (user_id, username, full_name) entries starting with
+        `prefix` that `viewer` may see: username matches, then name matches.
+        """
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        self.ensure_fresh()
+        visibilities = visible_settings(viewer)
+        viewer_id = viewer.pk if viewer.is_authenticated else None
+
+        results = []
+        seen = set()
+        with self._lock:
+            for keys in (self._usernames, self._names):
+                index = bisect.bisect_left(keys, (prefix,))
+                end = min(index + MAX_SCAN, len(keys))
+                while index < end and len(results) < limit:
+                    term, user_id = keys[index]
+                    if not term.startswith(prefix):
+                        break
+                    index += 1
+                    if user_id in seen:
+                        continue
+                    seen.add(user_id)
+                    username, full_name, visibility = self._users[user_id]
+                    if visibilities is None or visibility in visibilities or user_id == viewer_id:
+                        results.append((user_id, username, full_name))
+        return results
+
+
+autocomplete_index = PrefixIndex()
+
+
+def record_user_change(user_id):
+    """
+    Update this worker's entry for the user and log the change for the
+    others, once the current transaction commits.
+    """
+    def apply():
+        try:
+            cache.add(VERSION_KEY, 0, timeout=None)
+            version = cache.incr(VERSION_KEY)
+            cache.set(f'{CHANGE_KEY_PREFIX}{version}', user_id, CHANGE_LOG_TIMEOUT)
+            autocomplete_index.refresh_users([user_id])
+        except Exception:
+            logger.exception(f"Could not update the autocomplete index for user {user_id}")
+
+    transaction.on_commit(apply)
@@ -0,0 +1,134 @@
+"""
+HTTP validators (ETag / Last-Modified) for the main read views.
+
+Each *_validators() helper runs one or two narrow queries that capture
+everything the page shows and turns them into an ETag and a Last-Modified
+date. Counter updates don't touch Post.updated_at, so Last-Modified also
+takes Post.activity_at, which every counter write sets. Views call
+not_modified() before doing any real work, so a returning reader with a
+matching validator gets a 304 without a page build.
+"""
+import hashlib
+
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.contrib.auth import get_user_model
+from django.contrib.messages import get_messages
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .models import Post, Comment, PostRanking
+from .pagination import KeysetPaginator, InvalidCursor
+from .profile_summary import viewer_is_following
+
+FEED_PAGE_SIZE = 5
+
+# What a post card or post_detail shows from the post row and its author;
+# updated_at and activity_at (positions 1 and 2) feed Last-Modified
+RENDERED_POST_FIELDS = (
+    'pk', 'updated_at', 'activity_at', 'view_count', 'like_count', 'dislike_count', 'comment_count',
+    'author__username',
+)
+
+
+def _make_etag(request, *parts):
+    # The viewer changes what the page renders. The CSRF cookie is left out:
+    # it is usually first set by the response being validated, and the
+    # masked form token in a cached page stays valid for the same secret.
+    viewer = request.user.pk if request.user.is_authenticated else 'anon'
+    raw = '|'.join(str(part) for part in (viewer, request.get_full_path()) + parts)
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+def _latest(*values):
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
+
+def _is_conditional_request(request):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    # Flash messages are rendered once, so those pages must never be revalidated
+    return len(get_messages(request)) == 0
+
+
+def not_modified(request, etag, last_modified):
+    """Return a 304 response if the client's cached copy is still valid, else None"""
+    if etag is None or not _is_conditional_request(request):
+        return None
+    return get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+
+
+def apply_validators(request, response, etag, last_modified):
+    """Attach validators to a freshly rendered 200 response"""
+    if etag is None or response.status_code != 200 or not _is_conditional_request(request):
+        return response
+    if not response.has_header('ETag'):
+        response['ETag'] = etag
+    if last_modified and not response.has_header('Last-Modified'):
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
+
+
+def feed_validators(request):
+    """Validators for the home feed: the visible page of posts plus the featured sidebar"""
+    page = request.GET.get('page')
+    if page:
+        try:
+            offset = (max(int(page), 1) - 1) * FEED_PAGE_SIZE
+        except ValueError:
+            offset = 0
+        rows = Post.objects.order_by('-created_at', '-id')[offset:offset + FEED_PAGE_SIZE + 1]
+    else:
+        try:
+            posts, _, _ = KeysetPaginator(Post.objects.all(), FEED_PAGE_SIZE).window(request.GET.get('cursor'))
+        except InvalidCursor:
+            posts, _, _ = KeysetPaginator(Post.objects.all(), FEED_PAGE_SIZE).window()
+        rows = posts[:FEED_PAGE_SIZE + 1]
+    rows = list(rows.values_list(*RENDERED_POST_FIELDS))
+    if not rows:
+        # Out-of-range pages fall back to other content; don't validate those
+        return None, None
+    # The same rows top_posts() renders in the sidebar
+    featured = list(PostRanking.objects.order_by('-featured', '-score').values_list(
+        'post_id', 'computed_at', 'post__updated_at', 'post__author__username',
+    )[:2])
+
+    last_modified = _latest(
+        *[row[1] for row in rows], *[row[2] for row in rows],
+        *[row[1] for row in featured], *[row[2] for row in featured],
+    )
+    return _make_etag(request, rows, featured), last_modified
+
+
+def post_validators(request, pk):
+    """Validators for post_detail: the post row, its counters and its newest comment"""
+    latest_comment = Comment.objects.filter(post=OuterRef('pk')).order_by('-created_at').values('created_at')[:1]
+    row = Post.objects.filter(pk=pk).annotate(
+        latest_comment=Subquery(latest_comment)
+    ).values_list(*RENDERED_POST_FIELDS, 'latest_comment').first()
+    if row is None:
+        return None, None
+    return _make_etag(request, row), _latest(row[1], row[2], row[-1])
+
+
+def profile_validators(request, username):
+    """Validators for profile_view: the user, their profile, posts and follow counts"""
+    row = get_user_model().objects.filter(username=username).annotate(
+        profile_updated=Max('profile__updated_at'),
+        posts_updated=Max('post__updated_at'),
+        # Every counter write sets activity_at to now, so its max moves too
+        posts_activity=Max('post__activity_at'),
+        posts_total=Count('post'),
+    ).values_list(
+        'pk', 'first_name', 'last_name', 'profile_updated', 'posts_updated', 'posts_activity',
+        'posts_total', 'profile__followers_count', 'profile__following_count',
+    ).first()
+    if row is None:
+        return None, None
+    if request.user.is_authenticated and request.user.pk != row[0]:
+        row = row + (viewer_is_following(request, row[0]),)
+    return _make_etag(request, row), _latest(row[3], row[4], row[5])
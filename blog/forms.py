@@ -1,7 +1,7 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
-from .models import Post, Comment, Profile
+from .models import ChunkedUpload, Post, Comment, Profile
 
 
 class UserSearchForm(forms.Form):
@@ -18,6 +18,20 @@ class UserSearchForm(forms.Form):
     )
 
 
+class PostSearchForm(forms.Form):
+    """Form for searching posts"""
+    query = forms.CharField(
+        required=False,
+        widget=forms.TextInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'Search posts by title or content...',
+            'aria-label': 'Search posts'
+        }),
+        label='',
+        max_length=200
+    )
+
+
 class PostForm(forms.ModelForm):
     class Meta:
         model = Post
@@ -37,11 +51,58 @@ class PostForm(forms.ModelForm):
             'featured': 'Check to feature this post on the homepage',
         }
     
-    def __init__(self, *args, **kwargs):
+    # Ids of finished chunked uploads (see blog/uploads.py), set by
+    # static/js/chunked_upload.js in place of a multipart file
+    video_upload = forms.UUIDField(required=False, widget=forms.HiddenInput)
+    audio_upload = forms.UUIDField(required=False, widget=forms.HiddenInput)
+
+    def __init__(self, *args, user=None, **kwargs):
         super().__init__(*args, **kwargs)
+        self.user = user
         # Set default value for featured field if it's a new post
         if not self.instance.pk:
             self.initial['featured'] = False
+        for kind in ('video', 'audio'):
+            self.fields[kind].widget.attrs['data-chunked-upload'] = f'id_{kind}_upload'
+
+    def _clean_upload(self, kind):
+        upload_id = self.cleaned_data.get(f'{kind}_upload')
+        if not upload_id:
+            return None
+        upload = ChunkedUpload.objects.filter(
+            pk=upload_id, user_id=getattr(self.user, 'pk', None), kind=kind, status='complete'
+        ).first()
+        if upload is None:
+            raise forms.ValidationError('The uploaded file could not be found. Please upload it again.')
+        return upload
+
+    def clean_video_upload(self):
+        return self._clean_upload('video')
+
+    def clean_audio_upload(self):
+        return self._clean_upload('audio')
+
+    def _attached_uploads(self):
+        uploads = (self.cleaned_data.get(f'{kind}_upload') for kind in ('video', 'audio'))
+        return [upload for upload in uploads if upload is not None]
+
+    def save(self, commit=True):
+        post = super().save(commit=False)
+        for upload in self._attached_uploads():
+            # Already in media storage; just point the post at it
+            setattr(post, upload.kind, upload.file_name)
+        if commit:
+            post.save()
+            self._save_m2m()
+        return post
+
+    def _save_m2m(self):
+        super()._save_m2m()
+        # Runs once the post is saved: from save(), or from save_m2m() after
+        # save(commit=False). Until then the upload row keeps the stored file
+        # from being orphaned; purge_chunked_uploads spares files a post uses.
+        for upload in self._attached_uploads():
+            upload.delete()
 
 class CommentForm(forms.ModelForm):
     class Meta:
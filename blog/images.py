@@ -0,0 +1,243 @@
+"""
+Sized image derivatives for post images and profile pictures.
+
+Uploads are served at their original size and cropped with CSS, so a feed
+card can download and decode a multi-megapixel photo to show 300px of it.
+After a post image or profile picture is saved, a small worker pool
+generates resized copies with Pillow (each width as WebP plus a JPEG/PNG
+fallback) and records their storage names on the model. Templates then
+emit <picture> elements with srcset/sizes and fall back to the original
+until the derivatives exist.
+
+The recorded dict carries the source file name, so derivatives made for a
+previous upload are ignored until the new ones are written.
+"""
+import hashlib
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from .page_cache import bump_version, feed_version_key, post_version_key, profile_version_key
+
+logger = logging.getLogger(__name__)
+
+# Widths per rendition; each is also the largest width a slot needs at 2x
+POST_IMAGE_SIZES = {
+    'card': [480, 960],
+    'detail': [720, 1440],
+}
+# Square avatar edges
+AVATAR_SIZES = {
+    'avatar': [48, 96, 200],
+}
+DERIVATIVE_PREFIX = 'derivatives/'
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class ResponsiveImage:
+    """What a template needs to render an image with srcset"""
+
+    def __init__(self, src, srcset='', webp_srcset='', width=None, height=None):
+        self.src = src
+        self.srcset = srcset
+        self.webp_srcset = webp_srcset
+        self.width = width
+        self.height = height
+
+
+def responsive_image(field_file, derivatives, rendition):
+    """A ResponsiveImage for `field_file`, using its derivatives if they are current"""
+    if not field_file:
+        return None
+    variants = None
+    if derivatives and derivatives.get('source') == field_file.name:
+        variants = derivatives.get(rendition)
+    if not variants:
+        return ResponsiveImage(field_file.url)
+
+    storage = field_file.storage
+    srcset = ', '.join(f"{storage.url(variant['fallback'])} {variant['width']}w" for variant in variants)
+    webp_srcset = ', '.join(f"{storage.url(variant['webp'])} {variant['width']}w" for variant in variants)
+    smallest = variants[0]
+    return ResponsiveImage(
+        storage.url(smallest['fallback']), srcset, webp_srcset, smallest['width'], smallest['height']
+    )
+
+
+def derivatives_are_current(field_file, derivatives):
+    return bool(derivatives) and derivatives.get('source') == field_file.name
+
+
+def _encode(image, format, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, format=format, **options)
+    return buffer.getvalue()
+
+
+def _save_variant(storage, source_name, rendition, width, extension, content):
+    # Content-addressed, so /media/ can serve it as immutable
+    root, _ = os.path.splitext(source_name)
+    digest = hashlib.md5(content).hexdigest()[:12]
+    return storage.save(f'{DERIVATIVE_PREFIX}{root}-{rendition}-{width}.{digest}.{extension}', ContentFile(content))
+
+
+def _resize(image, width, square):
+    if square:
+        return ImageOps.fit(image, (width, width), Image.LANCZOS)
+    height = max(round(image.height * width / image.width), 1)
+    return image.resize((width, height), Image.LANCZOS)
+
+
+def build_derivatives(field_file, sizes, square=False):
+    """
+    Write every rendition in `sizes` for `field_file` to its storage.
+    Returns the dict recorded on the model.
+    """
+    storage = field_file.storage
+    with field_file.open('rb') as source:
+        image = Image.open(source)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+    fallback_format, fallback_extension = ('PNG', 'png') if has_alpha else ('JPEG', 'jpg')
+    edge = min(image.width, image.height) if square else image.width
+
+    derivatives = {'source': field_file.name}
+    for rendition, widths in sizes.items():
+        # Never upscale; a small source still gets one rendition at its own size
+        usable = [width for width in widths if width <= edge] or [edge]
+        variants = []
+        for width in usable:
+            resized = _resize(image, width, square)
+            webp_name = _save_variant(
+                storage, field_file.name, rendition, width, 'webp',
+                _encode(resized, 'WEBP', quality=WEBP_QUALITY, method=4),
+            )
+            fallback_options = {'optimize': True}
+            if fallback_format == 'JPEG':
+                fallback_options.update(quality=JPEG_QUALITY, progressive=True)
+            fallback_name = _save_variant(
+                storage, field_file.name, rendition, width, fallback_extension,
+                _encode(resized, fallback_format, **fallback_options),
+            )
+            variants.append({
+                'width': resized.width,
+                'height': resized.height,
+                'webp': webp_name,
+                'fallback': fallback_name,
+            })
+        derivatives[rendition] = variants
+    return derivatives
+
+
+def delete_derivatives(storage, derivatives):
+    """Best-effort removal of the files listed in a derivatives dict"""
+    for key, variants in (derivatives or {}).items():
+        if key == 'source':
+            continue
+        for variant in variants:
+            for name in (variant['webp'], variant['fallback']):
+                try:
+                    storage.delete(name)
+                except Exception as e:
+                    logger.warning(f"Could not delete image derivative {name}: {str(e)}")
+
+
+def _store(model, pk, file_field, derivatives_field, sizes, square, version_keys, force=False):
+    obj = model.objects.filter(pk=pk).only(file_field, derivatives_field).first()
+    if obj is None:
+        return False
+    field_file = getattr(obj, file_field)
+    previous = getattr(obj, derivatives_field)
+    if not field_file or (derivatives_are_current(field_file, previous) and not force):
+        return False
+
+    derivatives = build_derivatives(field_file, sizes, square=square)
+    # Only record them if the upload wasn't replaced while we worked
+    updated = model.objects.filter(pk=pk, **{file_field: field_file.name}).update(
+        **{derivatives_field: derivatives}
+    )
+    if not updated:
+        delete_derivatives(field_file.storage, derivatives)
+        return False
+    delete_derivatives(field_file.storage, previous)
+    bump_version(*version_keys)
+    return True
+
+
+def generate_post_derivatives(post_id, force=False):
+    """Build and record derivatives for a post's image. Returns True if any were written."""
+    from .models import Post
+
+    post = Post.objects.filter(pk=post_id).select_related('author').only('pk', 'author__username').first()
+    if post is None:
+        return False
+    return _store(
+        Post, post_id, 'image', 'image_derivatives', POST_IMAGE_SIZES, False,
+        [feed_version_key(), post_version_key(post_id), profile_version_key(post.author.username)],
+        force=force,
+    )
+
+
+def generate_profile_derivatives(profile_id, force=False):
+    """Build and record avatar derivatives for a profile picture. Returns True if any were written."""
+    from .models import Profile
+
+    profile = Profile.objects.filter(pk=profile_id).select_related('user').only('pk', 'user__username').first()
+    if profile is None:
+        return False
+    return _store(
+        Profile, profile_id, 'profile_picture', 'picture_derivatives', AVATAR_SIZES, True,
+        [feed_version_key(), profile_version_key(profile.user.username)],
+        force=force,
+    )
+
+
+def _run(task, pk):
+    try:
+        task(pk)
+    except Exception as e:
+        logger.error(f"Error generating image derivatives ({task.__name__}, {pk}): {str(e)}", exc_info=True)
+    finally:
+        connection.close()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'IMAGE_DERIVATIVE_WORKERS', 2),
+                thread_name_prefix='image-derivatives',
+            )
+        return _executor
+
+
+def schedule_derivatives(task, pk):
+    """
+    Run `task(pk)` in the worker pool once the current transaction commits.
+    With IMAGE_DERIVATIVE_WORKERS = 0 it runs inline instead.
+    """
+    def submit():
+        if getattr(settings, 'IMAGE_DERIVATIVE_WORKERS', 2) <= 0:
+            try:
+                task(pk)
+            except Exception as e:
+                logger.error(f"Error generating image derivatives ({task.__name__}, {pk}): {str(e)}", exc_info=True)
+            return
+        _get_executor().submit(_run, task, pk)
+
+    transaction.on_commit(submit)
@@ -0,0 +1,60 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.management.base import BaseCommand, CommandError
+from blog.autocomplete import PrefixIndex
+from blog.management.commands.benchmark_user_search import FIRST_NAMES, LAST_NAMES, PRIVACY_WEIGHTS
+
+
+class Command(BaseCommand):
+    help = 'Time autocomplete lookups against an in-memory prefix index of synthetic users'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000000, help='Synthetic users to index')
+        parser.add_argument('--lookups', type=int, default=10000, help='Lookups to time')
+        parser.add_argument('--limit', type=int, default=8, help='Results per lookup')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for names and prefixes')
+        parser.add_argument(
+            '--max-p99',
+            type=float,
+            default=1.0,
+            help='Fail if the 99th percentile lookup takes longer than this many milliseconds',
+        )
+
+    def synthetic_rows(self, rng, total):
+        settings_pool = [name for name, weight in PRIVACY_WEIGHTS for _ in range(weight)]
+        for i in range(total):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            yield i + 1, f'{first}{last}{i}', f'{first.title()} {last.title()}', rng.choice(settings_pool)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        # Built straight from synthetic rows, so no database rows are written
+        index = PrefixIndex(refresh_interval=float('inf'))
+        started = time.perf_counter()
+        index.load(self.synthetic_rows(rng, options['users']))
+        self.stdout.write(f'Indexed {len(index)} users in {time.perf_counter() - started:.1f}s')
+
+        names = FIRST_NAMES + LAST_NAMES
+        viewers = [('anonymous', AnonymousUser()), ('registered', User(pk=1, username='viewer'))]
+        for label, viewer in viewers:
+            timings = []
+            found = 0
+            for _ in range(options['lookups']):
+                name = rng.choice(names)
+                prefix = name[:rng.randint(1, len(name))]
+                started = time.perf_counter()
+                found += len(index.lookup(prefix, viewer, options['limit']))
+                timings.append(time.perf_counter() - started)
+            timings.sort()
+            p99 = timings[max(int(len(timings) * 0.99) - 1, 0)]
+            self.stdout.write(
+                f'{label:<11} p50 {statistics.median(timings) * 1e6:.1f}us, '
+                f'p99 {p99 * 1e6:.1f}us, max {timings[-1] * 1e6:.1f}us, '
+                f'{found / len(timings):.1f} results per lookup'
+            )
+            if p99 * 1000 > options['max_p99']:
+                raise CommandError(f'p99 lookup for {label} took {p99 * 1000:.3f}ms, over {options["max_p99"]}ms')
+        self.stdout.write(self.style.SUCCESS('Autocomplete lookups stayed within the latency target'))
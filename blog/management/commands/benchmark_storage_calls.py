@@ -0,0 +1,107 @@
+import time
+from collections import Counter
+from io import BytesIO
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.files.base import ContentFile
+from django.core.files.storage import InMemoryStorage, default_storage
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+from PIL import Image
+from blog.models import Post
+from blog.storage import CachedURLStorage
+from blog.views import home
+
+
+class CountingStorage(InMemoryStorage):
+    """In-memory stand-in for the media backend that counts url()/exists() calls"""
+
+    def __init__(self, *args, url_delay=0.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.url_delay = url_delay
+        self.calls = Counter()
+
+    def url(self, name):
+        self.calls['url'] += 1
+        if self.url_delay:
+            # Stands in for URL signing or a remote lookup
+            time.sleep(self.url_delay)
+        return super().url(name)
+
+    def exists(self, name):
+        self.calls['exists'] += 1
+        return super().exists(name)
+
+
+def png_bytes(size=(640, 480)):
+    # A real image, so the derivative pipeline and metadata probe can read it
+    buffer = BytesIO()
+    Image.new('RGB', size, (90, 120, 200)).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class Command(BaseCommand):
+    help = 'Count media storage calls per rendered home feed page, with and without the URL memo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10, help='Synthetic posts with media to create')
+        parser.add_argument('--renders', type=int, default=5, help='Page renders per storage setup')
+        parser.add_argument(
+            '--url-delay',
+            type=float,
+            default=0.0005,
+            help='Seconds each backend url() call takes, to mimic URL signing',
+        )
+
+    def build_posts(self, prefix, count):
+        author = User.objects.create_user(username=prefix)
+        for i in range(count):
+            post = Post(title=f'{prefix} {i}', content='Storage benchmark post', author=author)
+            # Mix of the card variants the feed renders
+            if i % 3 == 0:
+                post.video.save(f'{prefix}-{i}.mp4', ContentFile(b'0' * 16), save=False)
+            elif i % 3 == 1:
+                post.audio.save(f'{prefix}-{i}.mp3', ContentFile(b'0' * 16), save=False)
+            else:
+                post.image.save(f'{prefix}-{i}.png', ContentFile(png_bytes()), save=False)
+            post.save()
+        return author
+
+    def render_feed(self, renders):
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        request.session = {}
+        request._messages = []
+        started = time.perf_counter()
+        for _ in range(renders):
+            home(request)
+        return (time.perf_counter() - started) / renders
+
+    def handle(self, *args, **options):
+        prefix = f'bench-storage-{int(time.time())}'
+        backend = CountingStorage(url_delay=options['url_delay'])
+        original = default_storage._wrapped
+        # Dummy caches so the page and fragment caches don't hide storage calls
+        dummy_caches = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        author = None
+        try:
+            default_storage._wrapped = backend
+            # Build image derivatives inline, into this backend, before measuring
+            with override_settings(IMAGE_DERIVATIVE_WORKERS=0):
+                author = self.build_posts(prefix, options['posts'])
+            with override_settings(CACHES=dummy_caches):
+                for label, storage in (('direct', backend), ('memoized', CachedURLStorage(backend=backend))):
+                    default_storage._wrapped = storage
+                    # The first render warms the memo; the rest show the steady state
+                    for phase, renders in (('first', 1), ('repeat', options['renders'])):
+                        backend.calls.clear()
+                        elapsed = self.render_feed(renders)
+                        self.stdout.write(
+                            f'{label:<9} {phase:<7} url() {backend.calls["url"] / renders:5.1f}/page, '
+                            f'exists() {backend.calls["exists"] / renders:4.1f}/page, '
+                            f'render {elapsed * 1000:.1f}ms/page'
+                        )
+        finally:
+            default_storage._wrapped = original
+            if author is not None:
+                author.delete()
@@ -0,0 +1,124 @@
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from blog.models import Follow
+from blog.suggestions import compute_suggestions
+
+
+class Command(BaseCommand):
+    help = 'Time follow suggestions on a synthetic power-law follow graph'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Accounts in the synthetic graph')
+        parser.add_argument('--follows', type=int, default=5, help='Accounts each new user follows')
+        parser.add_argument(
+            '--heavy-follows',
+            type=int,
+            default=2000,
+            help='Accounts followed by one extra "heavy" user (capped at --users)',
+        )
+        parser.add_argument('--sample', type=int, default=100, help='Users to time suggestions for')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the graph')
+        parser.add_argument(
+            '--max-overrun',
+            type=float,
+            default=0.1,
+            help='Seconds a run may exceed SUGGESTIONS_TIME_BUDGET before the benchmark fails',
+        )
+        parser.add_argument('--keep', action='store_true', help='Keep the synthetic users and follows')
+
+    def build_graph(self, prefix, options):
+        rng = random.Random(options['seed'])
+        users = [User(username=f'{prefix}-{i}') for i in range(options['users'])]
+        # bulk_create skips the Profile signals; suggestions don't need profiles
+        User.objects.bulk_create(users)
+        ids = list(User.objects.filter(username__startswith=prefix).order_by('pk').values_list('pk', flat=True))
+
+        # Preferential attachment: each account appears once in `targets` plus
+        # once per follower, so popular accounts keep attracting followers
+        edges = set()
+        targets = []
+        for index, user_id in enumerate(ids):
+            chosen = set()
+            while len(chosen) < min(options['follows'], index):
+                chosen.add(rng.choice(targets))
+            for target in chosen:
+                edges.add((user_id, target))
+                targets.append(target)
+            targets.append(user_id)
+
+        heavy = User.objects.create(username=f'{prefix}-heavy')
+        for target in rng.sample(ids, min(options['heavy_follows'], len(ids))):
+            edges.add((heavy.pk, target))
+
+        # bulk_create skips the Follow signals, so no counters or timelines are touched
+        Follow.objects.bulk_create(
+            [Follow(follower_id=follower, following_id=following) for follower, following in edges],
+            batch_size=1000,
+        )
+        return ids, heavy, len(edges)
+
+    def cleanup(self, prefix):
+        # One plain DELETE for the follows: a cascading User delete would fire
+        # the Follow signals (counters, timelines, cache) once per row
+        table = connection.ops.quote_name(Follow._meta.db_table)
+        user_table = connection.ops.quote_name(User._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {table} WHERE follower_id IN (SELECT id FROM {user_table} WHERE username LIKE %s)',
+                [f'{prefix}-%'],
+            )
+        User.objects.filter(username__startswith=prefix).delete()
+
+    def time_run(self, user_id):
+        started = time.perf_counter()
+        ranked, truncated = compute_suggestions(user_id)
+        return time.perf_counter() - started, ranked, truncated
+
+    def handle(self, *args, **options):
+        prefix = f'bench-suggest-{int(time.time())}'
+        budget = getattr(settings, 'SUGGESTIONS_TIME_BUDGET', 0.2)
+
+        started = time.perf_counter()
+        ids, heavy, edge_count = self.build_graph(prefix, options)
+        self.stdout.write(
+            f'Backend {connection.vendor}: {len(ids) + 1} users, {edge_count} follows '
+            f'built in {time.perf_counter() - started:.2f}s; time budget {budget:.3f}s'
+        )
+
+        try:
+            rng = random.Random(options['seed'])
+            sample = rng.sample(ids, min(options['sample'], len(ids)))
+            timings = []
+            truncated_runs = 0
+            for user_id in sample:
+                elapsed, _, truncated = self.time_run(user_id)
+                timings.append(elapsed)
+                truncated_runs += truncated
+
+            heavy_elapsed, heavy_ranked, heavy_truncated = self.time_run(heavy.pk)
+        finally:
+            if not options['keep']:
+                self.cleanup(prefix)
+
+        timings.sort()
+        p95 = timings[max(int(len(timings) * 0.95) - 1, 0)]
+        self.stdout.write(
+            f'{len(timings)} users: p50 {statistics.median(timings) * 1000:.1f}ms, '
+            f'p95 {p95 * 1000:.1f}ms, max {timings[-1] * 1000:.1f}ms, '
+            f'{truncated_runs} hit the budget'
+        )
+        self.stdout.write(
+            f'Heavy user ({options["heavy_follows"]} follows): {heavy_elapsed * 1000:.1f}ms, '
+            f'{len(heavy_ranked)} candidates, {"hit" if heavy_truncated else "within"} the budget'
+        )
+
+        slowest = max(timings[-1], heavy_elapsed)
+        if slowest > budget + options['max_overrun']:
+            raise CommandError(f'Slowest run took {slowest:.3f}s, over the {budget:.3f}s budget')
+        self.stdout.write(self.style.SUCCESS('Suggestions stayed within the time budget'))
@@ -0,0 +1,132 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max, Q
+from blog.models import Profile, UserSearchIndex
+from blog.search import search_users, users_in_order, user_search_entry
+
+FIRST_NAMES = [
+    'james', 'mary', 'john', 'patricia', 'robert', 'jennifer', 'michael', 'linda', 'david', 'maria',
+    'joseph', 'susan', 'thomas', 'sarah', 'daniel', 'grace', 'brian', 'amina', 'kevin', 'wanjiru',
+]
+LAST_NAMES = [
+    'smith', 'johnson', 'williams', 'brown', 'jones', 'garcia', 'miller', 'davis', 'otieno', 'kamau',
+    'wilson', 'anderson', 'taylor', 'thomas', 'moore', 'jackson', 'martin', 'lee', 'mwangi', 'muhavi',
+]
+PRIVACY_WEIGHTS = [('public', 80), ('registered', 15), ('private', 5)]
+PAGE_SIZE = 10
+
+
+def legacy_search(query, viewer):
+    """The user_search query as it was before the search index"""
+    users = User.objects.filter(
+        Q(username__icontains=query) |
+        Q(first_name__icontains=query) |
+        Q(last_name__icontains=query) |
+        Q(email__icontains=query)
+    ).select_related('profile').order_by('username')
+    if not viewer.is_authenticated:
+        users = users.filter(profile__privacy_setting='public')
+    elif not viewer.is_superuser:
+        users = users.exclude(~Q(profile__user=viewer) & Q(profile__privacy_setting='private'))
+    # What the view's Paginator did for page one
+    return users.count(), list(users[:PAGE_SIZE])
+
+
+def indexed_search(query, viewer):
+    ids = search_users(query, viewer)
+    return len(ids), users_in_order(ids[:PAGE_SIZE])
+
+
+class Command(BaseCommand):
+    help = 'Compare the indexed user search with the old icontains query on a large synthetic user table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000000, help='Synthetic users to create')
+        parser.add_argument('--batch-size', type=int, default=10000, help='Rows per bulk insert')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per query; the median is reported')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for names and privacy settings')
+        parser.add_argument('--skip-legacy', action='store_true', help='Only time the indexed search')
+        parser.add_argument('--keep', action='store_true', help='Keep the synthetic users')
+
+    def build_users(self, first_pk, options):
+        rng = random.Random(options['seed'])
+        settings_pool = [name for name, weight in PRIVACY_WEIGHTS for _ in range(weight)]
+        total = options['users']
+        batch_size = options['batch_size']
+
+        for start in range(0, total, batch_size):
+            batch = []
+            for i in range(start, min(start + batch_size, total)):
+                first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                batch.append(User(
+                    pk=first_pk + i,
+                    username=f'{first}{last}{i}',
+                    first_name=first.title(),
+                    last_name=last.title(),
+                    email=f'{first}.{last}{i}@example.com',
+                ))
+            privacy = [rng.choice(settings_pool) for _ in batch]
+            # bulk_create skips every signal, so the profile and search rows are written here
+            with transaction.atomic():
+                User.objects.bulk_create(batch)
+                Profile.objects.bulk_create(
+                    [Profile(user_id=user.pk, privacy_setting=setting) for user, setting in zip(batch, privacy)]
+                )
+                UserSearchIndex.objects.bulk_create(
+                    [user_search_entry(user, setting) for user, setting in zip(batch, privacy)]
+                )
+            self.stdout.write(f'  {start + len(batch)} users', ending='\r')
+            self.stdout.flush()
+        self.stdout.write('')
+
+    def cleanup(self, first_pk):
+        with connection.cursor() as cursor:
+            for model, column in ((UserSearchIndex, 'user_id'), (Profile, 'user_id'), (User, 'id')):
+                table = connection.ops.quote_name(model._meta.db_table)
+                cursor.execute(f'DELETE FROM {table} WHERE {column} >= %s', [first_pk])
+
+    def time_query(self, search, query, viewer, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            found, _ = search(query, viewer)
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings), found
+
+    def handle(self, *args, **options):
+        first_pk = (User.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+        started = time.perf_counter()
+        self.build_users(first_pk, options)
+        self.stdout.write(
+            f'Backend {connection.vendor}: {options["users"]} users built in {time.perf_counter() - started:.1f}s'
+        )
+
+        try:
+            sample = User.objects.filter(pk__gte=first_pk).order_by('pk').values_list('username', flat=True)
+            exact = sample[options['users'] // 2] if options['users'] else 'nobody'
+            queries = [exact, 'jo', 'maria', 'garcia', 'wanjiru kamau', 'example.com', 'zzqx']
+            viewers = [('anonymous', AnonymousUser()), ('registered', User.objects.get(pk=first_pk))]
+
+            header = f'{"query":<22} {"viewer":<11} {"indexed":>10}'
+            if not options['skip_legacy']:
+                header += f' {"legacy":>10} {"speedup":>8}'
+            self.stdout.write(header)
+            for query in queries:
+                for label, viewer in viewers:
+                    indexed, found = self.time_query(indexed_search, query, viewer, options['repeat'])
+                    line = f'{query:<22} {label:<11} {indexed * 1000:>8.2f}ms'
+                    if not options['skip_legacy']:
+                        legacy, legacy_found = self.time_query(legacy_search, query, viewer, options['repeat'])
+                        line += f' {legacy * 1000:>8.2f}ms {legacy / indexed:>7.1f}x'
+                        line += f'  ({found} vs {legacy_found} matches)'
+                    else:
+                        line += f'  ({found} matches)'
+                    self.stdout.write(line)
+        finally:
+            if not options['keep']:
+                self.cleanup(first_pk)
@@ -0,0 +1,102 @@
+import random
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.db.models import Count, Q
+from blog.models import Post, Like
+from blog.votes import apply_vote
+
+
+class Command(BaseCommand):
+    help = 'Hammer one post with concurrent votes and check the counters stay exact'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Number of concurrent voters')
+        parser.add_argument('--votes', type=int, default=200, help='Votes cast by each thread')
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=None,
+            help='Distinct voting users (default: one per thread; fewer forces same-user races)',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the vote sequence')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark post and users')
+
+    def handle(self, *args, **options):
+        threads = options['threads']
+        votes_per_thread = options['votes']
+        user_count = options['users'] or threads
+
+        prefix = f'bench-votes-{int(time.time())}'
+        users = [User(username=f'{prefix}-{i}') for i in range(user_count)]
+        # bulk_create skips the Profile signals; the benchmark doesn't need profiles
+        User.objects.bulk_create(users)
+        users = list(User.objects.filter(username__startswith=prefix).order_by('pk'))
+        post = Post.objects.create(title=f'{prefix} post', content='Vote benchmark', author=users[0])
+
+        errors = []
+        retries = [0]
+        lock = threading.Lock()
+        barrier = threading.Barrier(threads)
+
+        def voter(index):
+            rng = random.Random(options['seed'] + index)
+            user = users[index % user_count]
+            try:
+                barrier.wait()
+                for _ in range(votes_per_thread):
+                    choice = rng.choice([True, False, None])
+                    while True:
+                        try:
+                            apply_vote(user, post.pk, choice)
+                            break
+                        except OperationalError as e:
+                            # SQLite reports writer contention as "database is locked"
+                            if 'locked' not in str(e):
+                                raise
+                            with lock:
+                                retries[0] += 1
+            except Exception as e:
+                with lock:
+                    errors.append(e)
+            finally:
+                connection.close()
+
+        self.stdout.write(
+            f'Backend {connection.vendor}: {threads} threads x {votes_per_thread} votes '
+            f'from {user_count} users on post {post.pk}'
+        )
+        workers = [threading.Thread(target=voter, args=(i,)) for i in range(threads)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+        post.refresh_from_db()
+        actual = Like.objects.filter(post=post).aggregate(
+            like_count=Count('id', filter=Q(is_like=True)),
+            dislike_count=Count('id', filter=Q(is_like=False)),
+        )
+        total = threads * votes_per_thread
+
+        self.stdout.write(f'{total} votes in {elapsed:.2f}s ({total / elapsed:.0f} votes/s), {retries[0]} lock retries')
+        self.stdout.write(
+            f'Counters: like={post.like_count} dislike={post.dislike_count}; '
+            f'rows: like={actual["like_count"]} dislike={actual["dislike_count"]}'
+        )
+
+        exact = post.like_count == actual['like_count'] and post.dislike_count == actual['dislike_count']
+        if not options['keep']:
+            post.delete()
+            User.objects.filter(username__startswith=prefix).delete()
+
+        if errors:
+            raise CommandError(f'{len(errors)} voter threads failed, first error: {errors[0]}')
+        if not exact:
+            raise CommandError('Counters drifted from the Like rows')
+        self.stdout.write(self.style.SUCCESS('Counters are exact'))
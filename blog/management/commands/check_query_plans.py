@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from blog.query_plans import bad_patterns, hot_queries, plan_problems
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the hot queries and fail if any falls back to a full scan or an unindexed sort'
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        patterns = bad_patterns()
+        if patterns is None:
+            self.stdout.write(self.style.WARNING(f'No plan rules for the {vendor} backend; skipping'))
+            return
+
+        failures = []
+        with transaction.atomic():
+            if vendor == 'postgresql':
+                # Small dev tables would otherwise make a seq scan the cheapest plan
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+
+            for name, queryset in hot_queries().items():
+                plan, bad_lines = plan_problems(queryset, patterns)
+                if bad_lines:
+                    failures.append(name)
+                    self.stdout.write(self.style.ERROR(f'FAIL {name}'))
+                    for line in plan.splitlines():
+                        self.stdout.write(f'    {line}')
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'ok   {name}'))
+                    if options['verbosity'] > 1:
+                        for line in plan.splitlines():
+                            self.stdout.write(f'    {line}')
+
+        if failures:
+            raise CommandError(f'{len(failures)} hot queries are not using an index: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('All hot queries use an index'))
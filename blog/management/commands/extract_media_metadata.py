@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from blog.media_metadata import MEDIA_METADATA_FIELDS, media_metadata_is_current, refresh_media_metadata
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Record dimensions, size, MIME type and duration for posts whose media metadata is missing or stale'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Posts to load per query')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        updated = 0
+        while True:
+            batch = list(Post.objects.filter(pk__gt=last_id).order_by('pk')[:batch_size])
+            if not batch:
+                break
+            for post in batch:
+                if media_metadata_is_current(post):
+                    continue
+                refresh_media_metadata(post)
+                # Only the metadata columns; leaves updated_at and the ETags alone
+                Post.objects.filter(pk=post.pk).update(
+                    **{field: getattr(post, field) for field in MEDIA_METADATA_FIELDS}
+                )
+                updated += 1
+            last_id = batch[-1].pk
+        self.stdout.write(self.style.SUCCESS(f'Recorded media metadata for {updated} posts'))
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from blog.images import generate_post_derivatives, generate_profile_derivatives
+from blog.models import Post, Profile
+
+
+class Command(BaseCommand):
+    help = 'Build the resized/WebP copies of post images and profile pictures that are missing or stale'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Rebuild derivatives that are already current')
+        parser.add_argument('--posts-only', action='store_true', help='Skip profile pictures')
+        parser.add_argument('--profiles-only', action='store_true', help='Skip post images')
+
+    def handle(self, *args, **options):
+        if not options['profiles_only']:
+            ids = Post.objects.exclude(Q(image__isnull=True) | Q(image='')).order_by('pk').values_list('pk', flat=True)
+            self.build('post images', ids, generate_post_derivatives, options['force'])
+            self.report_card_weight()
+        if not options['posts_only']:
+            ids = Profile.objects.exclude(profile_picture__contains='default-avatar').exclude(
+                profile_picture=''
+            ).order_by('pk').values_list('pk', flat=True)
+            self.build('profile pictures', ids, generate_profile_derivatives, options['force'])
+
+    def build(self, label, ids, generate, force):
+        built = failed = 0
+        # Synchronously, one at a time; ids are read up front so new uploads
+        # (handled by the worker pool) don't extend the run
+        for pk in list(ids):
+            try:
+                built += generate(pk, force=force)
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f'{label} {pk}: {e}')
+        self.stdout.write(self.style.SUCCESS(f'Built derivatives for {built} {label} ({failed} failed)'))
+
+    def report_card_weight(self):
+        """Compare what a feed card downloads now (smallest WebP) with the original uploads"""
+        original = card = 0
+        for post in Post.objects.exclude(image_derivatives__isnull=True).only('image', 'image_derivatives'):
+            variants = post.image_derivatives.get('card')
+            if post.image_derivatives.get('source') != post.image.name or not variants:
+                continue
+            storage = post.image.storage
+            try:
+                original += storage.size(post.image.name)
+                card += storage.size(variants[0]['webp'])
+            except Exception:
+                continue
+        if card:
+            self.stdout.write(
+                f'Feed card images: {original / 1024:.0f} KiB as uploaded, '
+                f'{card / 1024:.0f} KiB as the smallest card WebP ({original / card:.1f}x smaller)'
+            )
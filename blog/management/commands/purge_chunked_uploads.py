@@ -0,0 +1,42 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from blog.models import ChunkedUpload, Post
+from blog.uploads import discard_temp_file
+
+
+class Command(BaseCommand):
+    help = 'Delete chunked uploads that were abandoned, with their temp or stored files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=getattr(settings, 'CHUNKED_UPLOAD_EXPIRY_HOURS', 24),
+            help='Remove uploads untouched for this many hours',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be removed')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        expired = ChunkedUpload.objects.filter(updated_at__lt=cutoff).order_by('updated_at')
+        purged = 0
+        for upload in expired.iterator():
+            if options['dry_run']:
+                self.stdout.write(f'Would remove {upload}')
+                purged += 1
+                continue
+            discard_temp_file(upload)
+            # Stored but never attached to a post (attaching deletes the row)
+            if upload.file_name and not Post.objects.filter(**{upload.kind: upload.file_name}).exists():
+                storage = Post._meta.get_field(upload.kind).storage
+                try:
+                    storage.delete(upload.file_name)
+                except Exception as e:
+                    self.stderr.write(f'Could not delete {upload.file_name}: {e}')
+            upload.delete()
+            purged += 1
+        verb = 'Would remove' if options['dry_run'] else 'Removed'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {purged} abandoned uploads'))
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from blog.models import Profile, Follow
+
+
+def _count_by(field):
+    """Correlated COUNT of Follow rows whose `field` is the outer profile's user"""
+    subquery = Follow.objects.filter(**{field: OuterRef('user_id')}).order_by().values(field).annotate(n=Count('id')).values('n')
+    return Coalesce(Subquery(subquery, output_field=IntegerField()), 0)
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized follower/following counts on Profile'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of profiles to update per UPDATE statement',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many profiles have drifted counts',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        expected = {
+            'expected_followers': _count_by('following'),
+            'expected_following': _count_by('follower'),
+        }
+
+        drifted = Profile.objects.annotate(**expected).filter(
+            ~Q(followers_count=F('expected_followers')) |
+            ~Q(following_count=F('expected_following'))
+        ).count()
+        self.stdout.write(f'{drifted} profiles have drifted follow counts')
+
+        if options['dry_run']:
+            return
+
+        last_id = 0
+        updated = 0
+        while True:
+            ids = list(
+                Profile.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                updated += Profile.objects.filter(pk__in=ids).update(
+                    followers_count=expected['expected_followers'],
+                    following_count=expected['expected_following'],
+                )
+            last_id = ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt follow counts for {updated} profiles'))
@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from blog.models import Post, Like, Comment
+
+
+def _count_of(queryset):
+    """Correlated COUNT subquery for the rows of `queryset` belonging to the outer post"""
+    subquery = queryset.filter(post=OuterRef('pk')).order_by().values('post').annotate(n=Count('id')).values('n')
+    return Coalesce(Subquery(subquery, output_field=IntegerField()), 0)
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized like/dislike/comment counters on Post'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of posts to update per UPDATE statement',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many posts have drifted counters',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        expected = {
+            'expected_likes': _count_of(Like.objects.filter(is_like=True)),
+            'expected_dislikes': _count_of(Like.objects.filter(is_like=False)),
+            'expected_comments': _count_of(Comment.objects.all()),
+        }
+
+        drifted = Post.objects.annotate(**expected).filter(
+            ~Q(like_count=F('expected_likes')) |
+            ~Q(dislike_count=F('expected_dislikes')) |
+            ~Q(comment_count=F('expected_comments'))
+        ).count()
+        self.stdout.write(f'{drifted} posts have drifted counters')
+
+        if options['dry_run']:
+            return
+
+        last_id = 0
+        updated = 0
+        while True:
+            ids = list(
+                Post.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                updated += Post.objects.filter(pk__in=ids).update(
+                    like_count=expected['expected_likes'],
+                    dislike_count=expected['expected_dislikes'],
+                    comment_count=expected['expected_comments'],
+                )
+            last_id = ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt counters for {updated} posts'))
@@ -0,0 +1,59 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from blog.models import Post, Profile, UserSearchIndex
+from blog.search import POST_FTS_TABLE, POST_SEARCH_CONFIG, search_visibility, user_search_entry
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the user search rows and the post full-text index'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of users to reindex per transaction',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        users = get_user_model().objects.order_by('pk').only('pk', 'username', 'first_name', 'last_name', 'email')
+
+        last_pk = 0
+        indexed = 0
+        while True:
+            batch = list(users.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            ids = [user.pk for user in batch]
+            visibility = dict(Profile.objects.filter(user_id__in=ids).values_list('user_id', 'privacy_setting'))
+            with transaction.atomic():
+                # Delete + insert so the FTS triggers see every row exactly once
+                UserSearchIndex.objects.filter(user_id__in=ids).delete()
+                UserSearchIndex.objects.bulk_create(
+                    [user_search_entry(user, search_visibility(visibility.get(user.pk))) for user in batch]
+                )
+            indexed += len(batch)
+            last_pk = ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f'Reindexed {indexed} users'))
+        self.rebuild_post_index()
+
+    def rebuild_post_index(self):
+        # The triggers keep the post index current; this only repairs rows
+        # written while they were missing (e.g. raw imports)
+        table = connection.ops.quote_name(Post._meta.db_table)
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f"INSERT INTO {POST_FTS_TABLE}({POST_FTS_TABLE}) VALUES ('rebuild')")
+            elif connection.vendor == 'postgresql':
+                cursor.execute(
+                    f"UPDATE {table} SET search_vector = "
+                    f"setweight(to_tsvector(%s::regconfig, coalesce(title, '')), 'A') || "
+                    f"setweight(to_tsvector(%s::regconfig, coalesce(content, '')), 'B')",
+                    [POST_SEARCH_CONFIG, POST_SEARCH_CONFIG],
+                )
+            else:
+                return
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the post search index ({Post.objects.count()} posts)'))
@@ -0,0 +1,53 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from blog.rankings import refresh_rankings
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Recompute the trending scores used by the home page sidebar'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of posts to score per batch',
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Rescore every post in the ranking window, not just those with new activity',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running: an incremental refresh every RANKING_REFRESH_INTERVAL seconds '
+                 'and a full one every RANKING_FULL_REFRESH_INTERVAL seconds',
+        )
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            count = refresh_rankings(batch_size=options['batch_size'], full=options['full'])
+            self.stdout.write(self.style.SUCCESS(f'Refreshed rankings for {count} posts'))
+            return
+
+        interval = settings.RANKING_REFRESH_INTERVAL
+        full_interval = settings.RANKING_FULL_REFRESH_INTERVAL
+        next_full = time.monotonic() if options['full'] else time.monotonic() + full_interval
+        while True:
+            full = time.monotonic() >= next_full
+            if full:
+                next_full = time.monotonic() + full_interval
+            close_old_connections()
+            try:
+                refresh_rankings(batch_size=options['batch_size'], full=full)
+            except Exception as e:
+                # Keep the scheduler alive; the next pass retries
+                logger.error(f"Error refreshing post rankings: {str(e)}", exc_info=True)
+            time.sleep(interval)
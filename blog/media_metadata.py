@@ -0,0 +1,419 @@
+"""
+Media metadata recorded on Post at upload time.
+
+Post.save() calls refresh_media_metadata() when one of the media fields
+changed and the media the feed shows (the video, else the audio, else the
+image; see get_media_type) differs from the file the `media_*` columns
+describe. Existing rows are filled in by `manage.py extract_media_metadata`.
+A fresh upload is read from the local upload file before it reaches
+storage. Files attached by name, such as chunked uploads, are opened from
+storage once. Rendering then uses the columns and never asks storage for
+sizes or types.
+
+Durations and video dimensions come from container headers, read with
+the small parsers below for the formats Post accepts:
+- MP4: mvhd and tkhd boxes
+- WebM: EBML Info and Tracks
+- Ogg: Vorbis, Opus and Theora headers, plus the last page's granule
+- WAV: fmt and data chunks
+- MP3: Xing/VBRI header, or the bitrate for CBR files
+Image dimensions come from Pillow, which reads only the header. A file
+that can't be parsed still gets its size and a MIME type guessed from the
+name.
+"""
+import io
+import logging
+import mimetypes
+import struct
+from contextlib import nullcontext
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# The file fields primary_media() picks from
+MEDIA_FIELDS = ('image', 'video', 'audio')
+MEDIA_METADATA_FIELDS = (
+    'media_type', 'media_name', 'media_mime_type', 'media_size', 'media_width', 'media_height', 'media_duration',
+)
+# moov boxes beyond this are skipped rather than read into memory
+MAX_BOX_SIZE = 16 * 1024 * 1024
+OGG_TAIL_SIZE = 64 * 1024
+
+EXIF_ORIENTATION = 0x0112
+
+
+class MediaInfo:
+    """What the header of one media file says"""
+
+    def __init__(self, mime_type=None, width=None, height=None, duration=None):
+        self.mime_type = mime_type
+        self.width = width
+        self.height = height
+        self.duration = duration
+
+
+def _read_exact(f, size):
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError('Unexpected end of file')
+    return data
+
+
+# MP4 / QuickTime
+
+def _mp4_boxes(f, end):
+    """(type, payload start, payload end) for each box from the current position up to `end`"""
+    while f.tell() + 8 <= end:
+        start = f.tell()
+        size, box_type = struct.unpack('>I4s', _read_exact(f, 8))
+        header = 8
+        if size == 1:
+            size = struct.unpack('>Q', _read_exact(f, 8))[0]
+            header = 16
+        elif size == 0:
+            size = end - start
+        if size < header:
+            raise ValueError('Corrupt MP4 box')
+        yield box_type, start + header, start + size
+        f.seek(start + size)
+
+
+def _mp4_info(f, file_size):
+    info = MediaInfo('video/mp4')
+    for box_type, start, end in _mp4_boxes(f, file_size):
+        if box_type == b'ftyp':
+            brand = _read_exact(f, 4)
+            if brand in (b'M4A ', b'M4B '):
+                info.mime_type = 'audio/mp4'
+        elif box_type == b'moov' and end - start <= MAX_BOX_SIZE:
+            moov = io.BytesIO(_read_exact(f, end - start))
+            _mp4_moov(moov, end - start, info)
+            break
+    return info
+
+
+def _mp4_moov(moov, size, info):
+    for box_type, start, end in _mp4_boxes(moov, size):
+        if box_type == b'mvhd':
+            version = _read_exact(moov, 1)[0]
+            moov.seek(3, io.SEEK_CUR)
+            if version == 1:
+                moov.seek(16, io.SEEK_CUR)
+                timescale, duration = struct.unpack('>IQ', _read_exact(moov, 12))
+            else:
+                moov.seek(8, io.SEEK_CUR)
+                timescale, duration = struct.unpack('>II', _read_exact(moov, 8))
+            if timescale:
+                info.duration = duration / timescale
+        elif box_type == b'trak' and info.width is None:
+            moov.seek(start)
+            for child_type, child_start, child_end in _mp4_boxes(moov, end):
+                if child_type != b'tkhd':
+                    continue
+                version = _read_exact(moov, 1)[0]
+                # flags, then the times, ids and duration before the fixed part
+                moov.seek(3 + (32 if version == 1 else 20) + 52, io.SEEK_CUR)
+                width, height = struct.unpack('>II', _read_exact(moov, 8))
+                # 16.16 fixed point; audio tracks report 0x0
+                if width and height:
+                    info.width, info.height = width >> 16, height >> 16
+                break
+
+
+# Matroska / WebM
+
+EBML_SEGMENT = 0x18538067
+EBML_INFO = 0x1549A966
+EBML_TIMECODE_SCALE = 0x2AD7B1
+EBML_DURATION = 0x4489
+EBML_TRACKS = 0x1654AE6B
+EBML_TRACK_ENTRY = 0xAE
+EBML_VIDEO = 0xE0
+EBML_PIXEL_WIDTH = 0xB0
+EBML_PIXEL_HEIGHT = 0xBA
+EBML_CLUSTER = 0x1F43B675
+
+
+def _ebml_vint(f, keep_marker):
+    first = _read_exact(f, 1)[0]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not first & mask:
+        mask >>= 1
+        length += 1
+    if length > 8:
+        raise ValueError('Corrupt EBML number')
+    value = first if keep_marker else first & (mask - 1)
+    all_ones = (first & (mask - 1)) == mask - 1
+    for byte in _read_exact(f, length - 1):
+        value = (value << 8) | byte
+        all_ones = all_ones and byte == 0xFF
+    return value, (None if all_ones and not keep_marker else value)
+
+
+def _ebml_elements(f, end):
+    """(id, data start, data end) for each element up to `end`; unknown sizes run to `end`"""
+    while f.tell() < end:
+        element_id, _ = _ebml_vint(f, keep_marker=True)
+        _, size = _ebml_vint(f, keep_marker=False)
+        start = f.tell()
+        stop = end if size is None else min(start + size, end)
+        yield element_id, start, stop
+        f.seek(stop)
+
+
+def _ebml_uint(f, start, end):
+    f.seek(start)
+    return int.from_bytes(_read_exact(f, end - start), 'big')
+
+
+def _webm_info(f, file_size):
+    info = MediaInfo('video/webm')
+    scale = 1000000
+    duration = None
+    for element_id, start, end in _ebml_elements(f, file_size):
+        if element_id != EBML_SEGMENT:
+            continue
+        seen_tracks = False
+        for child_id, child_start, child_end in _ebml_elements(f, end):
+            if child_id == EBML_INFO:
+                for info_id, info_start, info_end in _ebml_elements(f, child_end):
+                    if info_id == EBML_TIMECODE_SCALE:
+                        scale = _ebml_uint(f, info_start, info_end)
+                    elif info_id == EBML_DURATION:
+                        f.seek(info_start)
+                        raw = _read_exact(f, info_end - info_start)
+                        duration = struct.unpack('>f' if len(raw) == 4 else '>d', raw)[0]
+            elif child_id == EBML_TRACKS:
+                seen_tracks = True
+                _webm_tracks(f, child_end, info)
+            elif child_id == EBML_CLUSTER:
+                # Headers come before the media data
+                break
+        if seen_tracks and info.width is None:
+            info.mime_type = 'audio/webm'
+        break
+    if duration is not None:
+        info.duration = duration * scale / 1e9
+    return info
+
+
+def _webm_tracks(f, end, info):
+    for entry_id, entry_start, entry_end in _ebml_elements(f, end):
+        if entry_id != EBML_TRACK_ENTRY:
+            continue
+        for track_id, track_start, track_end in _ebml_elements(f, entry_end):
+            if track_id != EBML_VIDEO or info.width is not None:
+                continue
+            for video_id, video_start, video_end in _ebml_elements(f, track_end):
+                if video_id == EBML_PIXEL_WIDTH:
+                    info.width = _ebml_uint(f, video_start, video_end)
+                elif video_id == EBML_PIXEL_HEIGHT:
+                    info.height = _ebml_uint(f, video_start, video_end)
+
+
+# Ogg
+
+def _ogg_info(f, file_size):
+    header = f.read(4096)
+    # The first page's packet follows the 27 byte header and its segment table
+    packet = header[27 + header[26]:]
+    if packet.startswith(b'\x80theora'):
+        info = MediaInfo('video/ogg')
+        # Picture size, 24 bits each, after the version and macroblock counts
+        info.width = int.from_bytes(packet[14:17], 'big')
+        info.height = int.from_bytes(packet[17:20], 'big')
+        # Theora granules encode keyframe positions; leave the duration unknown
+        return info
+
+    info = MediaInfo('audio/ogg')
+    if packet.startswith(b'\x01vorbis'):
+        rate, pre_skip = struct.unpack('<I', packet[12:16])[0], 0
+    elif packet.startswith(b'OpusHead'):
+        # Opus granules always count 48kHz samples
+        rate, pre_skip = 48000, struct.unpack('<H', packet[10:12])[0]
+    else:
+        return info
+
+    f.seek(max(file_size - OGG_TAIL_SIZE, 0))
+    tail = f.read()
+    last_page = tail.rfind(b'OggS')
+    if last_page != -1 and rate and len(tail) >= last_page + 14:
+        granule = struct.unpack('<q', tail[last_page + 6:last_page + 14])[0]
+        if granule > 0:
+            info.duration = max(granule - pre_skip, 0) / rate
+    return info
+
+
+# WAV
+
+def _wav_info(f, file_size):
+    info = MediaInfo('audio/wav')
+    f.seek(12)
+    byte_rate = None
+    while f.tell() + 8 <= file_size:
+        chunk_id, size = struct.unpack('<4sI', _read_exact(f, 8))
+        start = f.tell()
+        if chunk_id == b'fmt ':
+            byte_rate = struct.unpack('<I', _read_exact(f, 12)[8:12])[0]
+        elif chunk_id == b'data':
+            if byte_rate:
+                info.duration = min(size, file_size - start) / byte_rate
+            break
+        # Chunks are padded to an even length
+        f.seek(start + size + (size & 1))
+    return info
+
+
+# MP3
+
+MP3_BITRATES = {
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+MP3_SAMPLE_RATES = {1: [44100, 48000, 32000], 2: [22050, 24000, 16000], 25: [11025, 12000, 8000]}
+
+
+def _mp3_info(f, file_size):
+    info = MediaInfo('audio/mpeg')
+    start = 0
+    head = f.read(10)
+    if head[:3] == b'ID3' and len(head) == 10:
+        # Syncsafe tag size, plus the footer if there is one
+        tag_size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+        start = 10 + tag_size + (10 if head[5] & 0x10 else 0)
+
+    f.seek(start)
+    data = f.read(64 * 1024)
+    for offset in range(len(data) - 4):
+        if data[offset] != 0xFF or data[offset + 1] & 0xE0 != 0xE0:
+            continue
+        header = struct.unpack('>I', data[offset:offset + 4])[0]
+        version_bits = (header >> 19) & 3
+        layer_bits = (header >> 17) & 3
+        bitrate_index = (header >> 12) & 0xF
+        rate_index = (header >> 10) & 3
+        if version_bits == 1 or layer_bits != 1 or bitrate_index in (0, 15) or rate_index == 3:
+            # Reserved values, or not Layer III
+            continue
+        version = {3: 1, 2: 2, 0: 25}[version_bits]
+        bitrate = MP3_BITRATES[1 if version == 1 else 2][bitrate_index] * 1000
+        sample_rate = MP3_SAMPLE_RATES[version][rate_index]
+        samples_per_frame = 1152 if version == 1 else 576
+        mono = ((header >> 6) & 3) == 3
+        side_info = (17 if mono else 32) if version == 1 else (9 if mono else 17)
+
+        frames = None
+        xing = data[offset + 4 + side_info:offset + 4 + side_info + 12]
+        if xing[:4] in (b'Xing', b'Info') and struct.unpack('>I', xing[4:8])[0] & 1:
+            frames = struct.unpack('>I', xing[8:12])[0]
+        elif data[offset + 36:offset + 40] == b'VBRI':
+            frames = struct.unpack('>I', data[offset + 50:offset + 54])[0]
+        if frames:
+            info.duration = frames * samples_per_frame / sample_rate
+        else:
+            info.duration = (file_size - start - offset) * 8 / bitrate
+        break
+    return info
+
+
+def _image_info(f):
+    with Image.open(f) as image:
+        width, height = image.size
+        mime_type = Image.MIME.get(image.format)
+        try:
+            orientation = image.getexif().get(EXIF_ORIENTATION)
+        except Exception:
+            orientation = None
+    if orientation in (5, 6, 7, 8):
+        # Displayed rotated by 90 degrees
+        width, height = height, width
+    return MediaInfo(mime_type, width, height)
+
+
+def probe(f, file_size, name, kind):
+    """MediaInfo for an open, seekable file of `kind` ('image', 'video' or 'audio')"""
+    f.seek(0)
+    if kind == 'image':
+        return _image_info(f)
+    magic = f.read(12)
+    f.seek(0)
+    if magic[4:8] == b'ftyp':
+        info = _mp4_info(f, file_size)
+    elif magic[:4] == b'\x1a\x45\xdf\xa3':
+        info = _webm_info(f, file_size)
+    elif magic[:4] == b'OggS':
+        info = _ogg_info(f, file_size)
+    elif magic[:4] == b'RIFF' and magic[8:12] == b'WAVE':
+        info = _wav_info(f, file_size)
+    elif magic[:3] == b'ID3' or (magic[:1] == b'\xff' and magic[1] & 0xE0 == 0xE0):
+        info = _mp3_info(f, file_size)
+    else:
+        info = MediaInfo(mimetypes.guess_type(name)[0])
+    return info
+
+
+def primary_media(post):
+    """(kind, field file) for the media the feed shows, or ('text', None)"""
+    for kind in ('video', 'audio', 'image'):
+        field_file = getattr(post, kind)
+        if field_file:
+            return kind, field_file
+    return 'text', None
+
+
+def media_metadata_is_current(post):
+    kind, field_file = primary_media(post)
+    if field_file is not None and not field_file._committed:
+        # A new upload, even if it reuses the old name
+        return False
+    return post.media_type == kind and post.media_name == (field_file.name if field_file else '')
+
+
+def refresh_media_metadata(post):
+    """
+    Fill in the post's media_* columns for its current media. Returns
+    True if they changed. Only reads the file when the media changed.
+    """
+    if media_metadata_is_current(post):
+        return False
+    kind, field_file = primary_media(post)
+    post.media_type = kind
+    post.media_name = field_file.name if field_file else ''
+    post.media_mime_type = post.media_size = post.media_width = post.media_height = post.media_duration = None
+    if field_file is None:
+        return True
+
+    post.media_mime_type = mimetypes.guess_type(field_file.name)[0]
+    info = None
+    try:
+        if field_file._committed:
+            # Attached by name (e.g. a finished chunked upload): read it from storage once
+            source = field_file.storage.open(field_file.name, 'rb')
+        else:
+            source = nullcontext(field_file.file)
+        with source as f:
+            size = getattr(f, 'size', None)
+            if size is None:
+                size = f.seek(0, io.SEEK_END)
+            post.media_size = size
+            info = probe(f, size, field_file.name, kind)
+            f.seek(0)
+    except Exception as e:
+        logger.warning(f"Could not read {kind} metadata from {field_file.name}: {str(e)}")
+
+    if not field_file._committed:
+        # Store the upload now, as FileField.pre_save would, so media_name
+        # is the name storage actually chose
+        field_file.save(field_file.name, field_file.file, save=False)
+        post.media_name = field_file.name
+    if info is None:
+        return True
+
+    post.media_mime_type = info.mime_type or post.media_mime_type
+    post.media_width = info.width
+    post.media_height = info.height
+    if info.duration is not None:
+        post.media_duration = round(info.duration, 3)
+    return True
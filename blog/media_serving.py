@@ -0,0 +1,190 @@
+"""
+Serving uploaded media with Range support and cache validators.
+
+django.views.static.serve always sends the whole file through a Python
+worker, so every seek in a video or audio player restarts the download
+from byte 0. media_response() instead:
+
+- answers `Range: bytes=...` with 206 Partial Content (honouring
+  If-Range), and 416 when the range can't be satisfied,
+- sends a strong ETag and Last-Modified built from the file's size and
+  mtime, and answers conditional requests with 304,
+- marks the content-addressed image derivatives (a 12 hex digit hash
+  before the extension, under DERIVATIVE_PREFIX) immutable for a year, and
+  everything else cacheable for MEDIA_CACHE_MAX_AGE with revalidation.
+  Uploads keep the name the user gave them, so a hash-like name there
+  proves nothing.
+
+With MEDIA_SENDFILE set to 'x-accel-redirect' (nginx) or 'x-sendfile'
+(Apache mod_xsendfile, lighttpd) the response only names the file, percent-
+encoded since header values can't carry non-ASCII names, and the front-end
+server sends the bytes, ranges included.
+"""
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+
+from .images import DERIVATIVE_PREFIX
+
+CONTENT_ADDRESSED_NAME = re.compile(r'\.[0-9a-f]{12}\.[A-Za-z0-9]+$')
+RANGE_HEADER = re.compile(r'^bytes=(\d*)-(\d*)$')
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+def _resolve(path):
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        # Outside MEDIA_ROOT
+        raise Http404('Media file not found')
+    try:
+        stat_result = os.stat(fullpath)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404('Media file not found')
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise Http404('Media file not found')
+    return fullpath, stat_result
+
+
+def file_etag(stat_result):
+    return f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single `bytes=` range, None if the header
+    should be ignored (absent, malformed or multiple ranges, which get the
+    whole file), or False if it can't be satisfied.
+    """
+    match = RANGE_HEADER.match((header or '').strip())
+    if not match or size == 0:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # Suffix range: the final N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    if start >= size:
+        return False
+    end = int(last) if last else size - 1
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def _range_applies(request, etag, mtime):
+    """If-Range: only send a partial response if the file is still the same"""
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        # Needs a strong match
+        return if_range == etag
+    parsed = parse_http_date_safe(if_range)
+    return parsed is not None and parsed == int(mtime)
+
+
+def is_immutable(name):
+    """True for image derivatives, whose names change whenever their content does"""
+    return name.startswith(DERIVATIVE_PREFIX) and CONTENT_ADDRESSED_NAME.search(name) is not None
+
+
+def _cache_headers(response, name, etag, mtime):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(mtime)
+    response['Accept-Ranges'] = 'bytes'
+    if is_immutable(name):
+        patch_cache_control(
+            response, public=True, max_age=getattr(settings, 'MEDIA_IMMUTABLE_MAX_AGE', 31536000), immutable=True
+        )
+    else:
+        patch_cache_control(response, public=True, max_age=getattr(settings, 'MEDIA_CACHE_MAX_AGE', 3600))
+    return response
+
+
+def _read_range(fullpath, start, length):
+    with open(fullpath, 'rb') as media_file:
+        media_file.seek(start)
+        remaining = length
+        while remaining > 0:
+            block = media_file.read(min(STREAM_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+
+
+def _offloaded(fullpath, name, content_type):
+    response = HttpResponse(content_type=content_type)
+    mode = settings.MEDIA_SENDFILE
+    if mode == 'x-accel-redirect':
+        # An `internal` nginx location aliased to MEDIA_ROOT; nginx decodes the URI
+        prefix = getattr(settings, 'MEDIA_SENDFILE_PREFIX', '/protected-media/')
+        response['X-Accel-Redirect'] = quote(prefix.rstrip('/') + '/' + name)
+    elif mode == 'x-sendfile':
+        # mod_xsendfile (XSendFileUnescape) and lighttpd unescape the path
+        response['X-Sendfile'] = quote(fullpath)
+    else:
+        raise ValueError(f'Unknown MEDIA_SENDFILE mode {mode!r}')
+    return response
+
+
+def media_response(request, path):
+    """The response for GET/HEAD of media file `path` under MEDIA_ROOT"""
+    fullpath, stat_result = _resolve(path)
+    # The storage name, with any '..' or '//' in the URL resolved
+    name = os.path.relpath(fullpath, os.path.abspath(settings.MEDIA_ROOT)).replace(os.sep, '/')
+    size = stat_result.st_size
+    mtime = stat_result.st_mtime
+    etag = file_etag(stat_result)
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    content_type = content_type or 'application/octet-stream'
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(mtime))
+    if not_modified is not None:
+        return _cache_headers(not_modified, name, etag, mtime)
+
+    if getattr(settings, 'MEDIA_SENDFILE', ''):
+        # The front-end server handles Range and sends the bytes
+        return _cache_headers(_offloaded(fullpath, name, content_type), name, etag, mtime)
+
+    byte_range = parse_range(request.headers.get('Range'), size)
+    if byte_range is not None and not _range_applies(request, etag, mtime):
+        byte_range = None
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return _cache_headers(response, name, etag, mtime)
+
+    if byte_range is None:
+        if request.method == 'HEAD':
+            response = HttpResponse(content_type=content_type)
+        else:
+            # FileResponse lets the WSGI server use wsgi.file_wrapper (sendfile)
+            response = FileResponse(open(fullpath, 'rb'), content_type=content_type)
+        response['Content-Length'] = size
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        body = () if request.method == 'HEAD' else _read_range(fullpath, start, length)
+        response = StreamingHttpResponse(body, status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = length
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return _cache_headers(response, name, etag, mtime)
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:54
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    Like = apps.get_model('blog', 'Like')
+    Comment = apps.get_model('blog', 'Comment')
+
+    def count_of(queryset):
+        subquery = queryset.filter(post=OuterRef('pk')).order_by().values('post').annotate(n=Count('id')).values('n')
+        return Coalesce(Subquery(subquery, output_field=IntegerField()), 0)
+
+    Post.objects.update(
+        like_count=count_of(Like.objects.filter(is_like=True)),
+        dislike_count=count_of(Like.objects.filter(is_like=False)),
+        comment_count=count_of(Comment.objects.all()),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_post_featured'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='dislike_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0010_post_like_count_post_dislike_count_post_comment_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostRanking',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ranking', serialize=False, to='blog.post')),
+                ('score', models.FloatField(default=0)),
+                ('featured', models.BooleanField(default=False)),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['-featured', '-score'],
+                'indexes': [models.Index(fields=['-featured', '-score'], name='blog_ranking_top_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:04
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_follow_counts(apps, schema_editor):
+    Profile = apps.get_model('blog', 'Profile')
+    Follow = apps.get_model('blog', 'Follow')
+
+    def count_by(field):
+        subquery = Follow.objects.filter(**{field: OuterRef('user_id')}).order_by().values(field).annotate(n=Count('id')).values('n')
+        return Coalesce(Subquery(subquery, output_field=IntegerField()), 0)
+
+    Profile.objects.update(
+        followers_count=count_by('following'),
+        following_count=count_by('follower'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0013_comment_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_follow_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0014_profile_followers_count_profile_following_count'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='follow',
+            name='blog_follow_followers_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='follow',
+            name='blog_follow_following_idx',
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['following', '-created_at', '-id'], name='blog_follow_followers_ks_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['follower', '-created_at', '-id'], name='blog_follow_following_ks_idx'),
+        ),
+    ]
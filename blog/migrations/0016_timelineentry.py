@@ -0,0 +1,51 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_timelines(apps, schema_editor):
+    Follow = apps.get_model('blog', 'Follow')
+    Post = apps.get_model('blog', 'Post')
+    TimelineEntry = apps.get_model('blog', 'TimelineEntry')
+    limit = getattr(settings, 'TIMELINE_FANOUT_LIMIT', 10000)
+    backfill_size = getattr(settings, 'TIMELINE_BACKFILL_SIZE', 50)
+
+    # Large accounts are merged at read time and never stored
+    follows = Follow.objects.filter(following__profile__followers_count__lt=limit).values_list('follower_id', 'following_id')
+    for follower_id, following_id in follows.iterator():
+        posts = Post.objects.filter(author_id=following_id).order_by('-created_at', '-id').values_list('pk', 'created_at')[:backfill_size]
+        TimelineEntry.objects.bulk_create(
+            [
+                TimelineEntry(user_id=follower_id, post_id=post_id, author_id=following_id, created_at=created_at)
+                for post_id, created_at in posts
+            ],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('blog', '0015_follow_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='blog.post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-created_at', '-post'], name='blog_timeline_feed_idx'), models.Index(fields=['user', 'author'], name='blog_timeline_author_idx')],
+                'unique_together': {('user', 'post')},
+            },
+        ),
+        migrations.RunPython(backfill_timelines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,113 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:19
+
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+import django.db.models.deletion
+
+SQLITE_FORWARDS = [
+    # External-content FTS5 table over blog_usersearchindex; the triggers
+    # below keep it in step with every ORM write to the plain table
+    """CREATE VIRTUAL TABLE blog_usersearch_fts USING fts5(
+        username, full_name, email,
+        content='blog_usersearchindex', content_rowid='user_id',
+        tokenize='unicode61', prefix='2 3'
+    )""",
+    """CREATE TRIGGER blog_usersearch_ai AFTER INSERT ON blog_usersearchindex BEGIN
+        INSERT INTO blog_usersearch_fts(rowid, username, full_name, email)
+        VALUES (new.user_id, new.username, new.full_name, new.email);
+    END""",
+    """CREATE TRIGGER blog_usersearch_ad AFTER DELETE ON blog_usersearchindex BEGIN
+        INSERT INTO blog_usersearch_fts(blog_usersearch_fts, rowid, username, full_name, email)
+        VALUES ('delete', old.user_id, old.username, old.full_name, old.email);
+    END""",
+    """CREATE TRIGGER blog_usersearch_au AFTER UPDATE OF username, full_name, email ON blog_usersearchindex BEGIN
+        INSERT INTO blog_usersearch_fts(blog_usersearch_fts, rowid, username, full_name, email)
+        VALUES ('delete', old.user_id, old.username, old.full_name, old.email);
+        INSERT INTO blog_usersearch_fts(rowid, username, full_name, email)
+        VALUES (new.user_id, new.username, new.full_name, new.email);
+    END""",
+]
+SQLITE_BACKWARDS = [
+    'DROP TRIGGER IF EXISTS blog_usersearch_au',
+    'DROP TRIGGER IF EXISTS blog_usersearch_ad',
+    'DROP TRIGGER IF EXISTS blog_usersearch_ai',
+    'DROP TABLE IF EXISTS blog_usersearch_fts',
+]
+POSTGRES_FORWARDS = [
+    # Substring matches over the whole document, as the old icontains did
+    """CREATE INDEX blog_usersearch_trgm_idx ON blog_usersearchindex
+        USING gin ((username || ' ' || full_name || ' ' || email) gin_trgm_ops)""",
+]
+POSTGRES_BACKWARDS = [
+    'DROP INDEX IF EXISTS blog_usersearch_trgm_idx',
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_search_structures(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _run(schema_editor, SQLITE_FORWARDS)
+    elif vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_FORWARDS)
+
+
+def drop_search_structures(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _run(schema_editor, SQLITE_BACKWARDS)
+    elif vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_BACKWARDS)
+
+
+def backfill_user_search(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Profile = apps.get_model('blog', 'Profile')
+    UserSearchIndex = apps.get_model('blog', 'UserSearchIndex')
+
+    visibility = dict(Profile.objects.values_list('user_id', 'privacy_setting'))
+    entries = [
+        UserSearchIndex(
+            user_id=pk,
+            username=username.lower(),
+            full_name=f'{first_name} {last_name}'.strip().lower(),
+            email=email.lower(),
+            visibility=visibility.get(pk, 'public'),
+        )
+        for pk, username, first_name, last_name, email in User.objects.values_list(
+            'pk', 'username', 'first_name', 'last_name', 'email'
+        ).iterator()
+    ]
+    UserSearchIndex.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('blog', '0016_timelineentry'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.CreateModel(
+            name='UserSearchIndex',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_index', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('username', models.CharField(max_length=150)),
+                ('full_name', models.CharField(blank=True, max_length=301)),
+                ('email', models.CharField(blank=True, max_length=254)),
+                ('visibility', models.CharField(default='public', max_length=20)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['visibility', 'username'], name='blog_usersearch_vis_idx', opclasses=['varchar_pattern_ops', 'varchar_pattern_ops'])],
+            },
+        ),
+        migrations.RunPython(create_search_structures, drop_search_structures),
+        migrations.RunPython(backfill_user_search, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,96 @@
+from django.db import migrations
+
+SQLITE_FORWARDS = [
+    # External-content FTS5 table over blog_post. The porter tokenizer
+    # stems English words the way the PostgreSQL 'english' config does.
+    """CREATE VIRTUAL TABLE blog_post_fts USING fts5(
+        title, content,
+        content='blog_post', content_rowid='id',
+        tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER blog_post_fts_ai AFTER INSERT ON blog_post BEGIN
+        INSERT INTO blog_post_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+    """CREATE TRIGGER blog_post_fts_ad AFTER DELETE ON blog_post BEGIN
+        INSERT INTO blog_post_fts(blog_post_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END""",
+    # Post.save() writes every column, so only reindex when the text changed
+    """CREATE TRIGGER blog_post_fts_au AFTER UPDATE OF title, content ON blog_post
+    WHEN old.title IS NOT new.title OR old.content IS NOT new.content BEGIN
+        INSERT INTO blog_post_fts(blog_post_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO blog_post_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+    "INSERT INTO blog_post_fts(blog_post_fts) VALUES ('rebuild')",
+]
+SQLITE_BACKWARDS = [
+    'DROP TRIGGER IF EXISTS blog_post_fts_au',
+    'DROP TRIGGER IF EXISTS blog_post_fts_ad',
+    'DROP TRIGGER IF EXISTS blog_post_fts_ai',
+    'DROP TABLE IF EXISTS blog_post_fts',
+]
+POSTGRES_FORWARDS = [
+    'ALTER TABLE blog_post ADD COLUMN search_vector tsvector',
+    # A trigger rather than a generated column: generated columns are
+    # recomputed on every UPDATE, including the view and vote counter ones
+    """CREATE FUNCTION blog_post_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'UPDATE' AND NEW.title IS NOT DISTINCT FROM OLD.title
+                AND NEW.content IS NOT DISTINCT FROM OLD.content THEN
+            RETURN NEW;
+        END IF;
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(NEW.content, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql""",
+    """CREATE TRIGGER blog_post_search_vector BEFORE INSERT OR UPDATE OF title, content ON blog_post
+        FOR EACH ROW EXECUTE FUNCTION blog_post_search_vector_update()""",
+    """UPDATE blog_post SET search_vector =
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(content, '')), 'B')""",
+    'CREATE INDEX blog_post_search_idx ON blog_post USING gin (search_vector)',
+]
+POSTGRES_BACKWARDS = [
+    'DROP INDEX IF EXISTS blog_post_search_idx',
+    'DROP TRIGGER IF EXISTS blog_post_search_vector ON blog_post',
+    'DROP FUNCTION IF EXISTS blog_post_search_vector_update()',
+    'ALTER TABLE blog_post DROP COLUMN IF EXISTS search_vector',
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_post_search(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _run(schema_editor, SQLITE_FORWARDS)
+    elif vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_FORWARDS)
+
+
+def drop_post_search(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _run(schema_editor, SQLITE_BACKWARDS)
+    elif vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_BACKWARDS)
+
+
+class Migration(migrations.Migration):
+    # The triggers live on blog_post itself. On SQLite, a later migration
+    # that rebuilds the table (most AlterField/non-null AddField changes)
+    # drops them, so such migrations must recreate SQLITE_FORWARDS[1:4].
+
+    dependencies = [
+        ('blog', '0017_usersearchindex'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_post_search, drop_post_search),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0018_post_search'),
+    ]
+
+    # Nullable with no default, so SQLite adds the columns with ALTER TABLE
+    # instead of remaking blog_post, which would drop the FTS triggers
+    # created in 0018_post_search
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='picture_derivatives',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0020_chunkedupload'),
+    ]
+
+    # Nullable with no default, so SQLite adds the columns with ALTER TABLE
+    # instead of remaking blog_post, which would drop the FTS triggers
+    # created in 0018_post_search. Existing posts are filled in by
+    # `manage.py extract_media_metadata`.
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='media_duration',
+            field=models.FloatField(blank=True, editable=False, help_text='Seconds', null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='media_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='media_mime_type',
+            field=models.CharField(blank=True, editable=False, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='media_name',
+            field=models.CharField(blank=True, editable=False, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='media_size',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='media_type',
+            field=models.CharField(blank=True, editable=False, max_length=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='media_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0021_post_media_metadata'),
+    ]
+
+    # Nullable with no default so SQLite adds the column with ALTER TABLE and
+    # keeps the blog_post FTS triggers from 0018_post_search
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='activity_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='postranking',
+            name='scored_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['activity_at'], name='blog_post_activity_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def flag_read_merged_authors(apps, schema_editor):
+    # These authors' posts were never fanned out; keep merging them at read time
+    Profile = apps.get_model('blog', 'Profile')
+    limit = getattr(settings, 'TIMELINE_FANOUT_LIMIT', 10000)
+    Profile.objects.filter(followers_count__gte=limit).update(timeline_read_merged=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0022_ranking_activity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='timeline_read_merged',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(flag_read_merged_authors, migrations.RunPython.noop),
+    ]
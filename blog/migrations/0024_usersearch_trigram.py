@@ -0,0 +1,45 @@
+from django.db import migrations
+
+# The unicode61 tokenizer only matched the start of words ("lic" didn't find
+# "alice"); trigrams match substrings anywhere, as icontains did
+SQLITE_RECREATE = """CREATE VIRTUAL TABLE blog_usersearch_fts USING fts5(
+    username, full_name, email,
+    content='blog_usersearchindex', content_rowid='user_id',
+    {options}
+)"""
+SQLITE_REBUILD = "INSERT INTO blog_usersearch_fts(blog_usersearch_fts) VALUES ('rebuild')"
+
+
+def _retokenize(schema_editor, options):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    # The triggers write to the table by name, so they survive the swap
+    schema_editor.execute('DROP TABLE blog_usersearch_fts')
+    schema_editor.execute(SQLITE_RECREATE.format(options=options))
+    schema_editor.execute(SQLITE_REBUILD)
+
+
+def use_trigrams(apps, schema_editor):
+    _retokenize(schema_editor, "tokenize='trigram'")
+
+
+def use_word_prefixes(apps, schema_editor):
+    _retokenize(schema_editor, "tokenize='unicode61', prefix='2 3'")
+
+
+def index_empty_privacy_as_public(apps, schema_editor):
+    # Legacy profiles without a setting are public on the profile page
+    UserSearchIndex = apps.get_model('blog', 'UserSearchIndex')
+    UserSearchIndex.objects.filter(visibility='').update(visibility='public')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0023_profile_timeline_read_merged'),
+    ]
+
+    operations = [
+        migrations.RunPython(use_trigrams, use_word_prefixes),
+        migrations.RunPython(index_empty_privacy_as_public, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0024_usersearch_trigram'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='chunkedupload',
+            name='status',
+            field=models.CharField(choices=[('uploading', 'Uploading'), ('storing', 'Storing'), ('complete', 'Complete')], default='uploading', max_length=10),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:42
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0025_chunkedupload_storing'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='postranking',
+            name='computed_at',
+            field=models.DateTimeField(blank=True, default=django.utils.timezone.now, null=True),
+        ),
+    ]
@@ -1,14 +1,17 @@
 import logging
+import mimetypes
 import os
+import uuid
 from django.db import models
+from django.db.models.fields.files import FieldFile
 from django.contrib.auth.models import User
 from django.urls import reverse
 from django.utils import timezone
 from django.conf import settings
 from django.db.models.signals import pre_save
 from django.dispatch import receiver
-from django.conf import settings
 from django.core.validators import FileExtensionValidator
+from .media_metadata import MEDIA_FIELDS, MEDIA_METADATA_FIELDS, refresh_media_metadata
 
 # Only import Cloudinary if it's configured
 try:
@@ -22,7 +25,28 @@ except ImportError:
 logger = logging.getLogger(__name__)
 
 
-class Post(models.Model):
+class DenormalizedCountersMixin:
+    """
+    Leave counter columns out of full-row saves of existing instances.
+    The counters are maintained with atomic F() updates, so a stale copy
+    loaded before those updates must not write its old values back.
+    `worker_fields` are treated the same way: background jobs write them
+    with update() while request code may hold an older copy.
+    """
+    counter_fields = ()
+    worker_fields = ()
+
+    def save(self, *args, **kwargs):
+        skipped = (*self.counter_fields, *self.worker_fields)
+        if skipped and self.pk and not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in skipped
+            ]
+        super().save(*args, **kwargs)
+
+
+class Post(DenormalizedCountersMixin, models.Model):
     title = models.CharField(max_length=200)
     content = models.TextField()
     author = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -34,6 +58,8 @@ class Post(models.Model):
         null=True,
         help_text='Upload a featured image for the post'
     )
+    # Resized copies of `image`, written by blog.images after upload
+    image_derivatives = models.JSONField(null=True, blank=True, editable=False)
     video = models.FileField(
         upload_to='post_videos/',
         blank=True,
@@ -58,35 +84,117 @@ class Post(models.Model):
             )
         ]
     )
+    # What the feed shows (video, else audio, else image), read from the
+    # file's headers when it is uploaded (see blog/media_metadata.py).
+    # `media_name` is the file they describe.
+    media_type = models.CharField(max_length=10, null=True, blank=True, editable=False)
+    media_name = models.CharField(max_length=255, null=True, blank=True, editable=False)
+    media_mime_type = models.CharField(max_length=100, null=True, blank=True, editable=False)
+    media_size = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
+    media_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    media_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    media_duration = models.FloatField(null=True, blank=True, editable=False, help_text='Seconds')
     view_count = models.PositiveIntegerField(default=0)
+    # Denormalized counters, kept in sync by the Like/Comment signals in
+    # blog.signals. Use `manage.py rebuild_post_counters` if they drift.
+    like_count = models.PositiveIntegerField(default=0)
+    dislike_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    # When any counter last changed; blog.rankings rescores only posts
+    # whose activity is newer than their ranking
+    activity_at = models.DateTimeField(null=True, blank=True, editable=False)
     featured = models.BooleanField(
         default=False,
         help_text='Designates whether this post should be featured on the homepage.'
     )
 
+    counter_fields = ('view_count', 'like_count', 'dislike_count', 'comment_count', 'activity_at')
+    worker_fields = ('image_derivatives',)
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Home feed keyset pagination on (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='blog_post_created_idx'),
+            # Per-author listings in profile_view
+            models.Index(fields=['author', '-created_at'], name='blog_post_author_created_idx'),
+            # Incremental ranking refreshes
+            models.Index(fields=['activity_at'], name='blog_post_activity_idx'),
+        ]
 
     def __str__(self):
         return self.title
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Media file names as loaded, for media_changed()
+        instance._loaded_media = {
+            name: value or '' for name, value in zip(field_names, values) if name in MEDIA_FIELDS
+        }
+        return instance
+
+    def media_changed(self):
+        """Whether image, video or audio changed since the post was loaded (always for new or hand-built posts)"""
+        loaded = getattr(self, '_loaded_media', None)
+        if self._state.adding or loaded is None:
+            return True
+        for name in MEDIA_FIELDS:
+            if name not in loaded and name not in self.__dict__:
+                # Deferred and never assigned
+                continue
+            field_file = getattr(self, name)
+            if field_file and not field_file._committed:
+                # A new upload, even if it reuses the old name
+                return True
+            if (field_file.name or '') != loaded.get(name):
+                return True
+        return False
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        # Refreshing reads the file (from storage for uploads attached by
+        # name), so only do it when the media itself changed
+        if (update_fields is None or set(MEDIA_FIELDS) & set(update_fields)) and self.media_changed():
+            if refresh_media_metadata(self) and update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, *MEDIA_METADATA_FIELDS}
+        super().save(*args, **kwargs)
+        self._loaded_media = {name: getattr(self, name).name or '' for name in MEDIA_FIELDS}
     
     def get_like_count(self):
-        return self.likes.filter(is_like=True).count()
+        return self.like_count
     
     def get_dislike_count(self):
-        return self.likes.filter(is_like=False).count()
+        return self.dislike_count
     
     def get_user_vote(self, user):
         if user.is_authenticated:
+            # Use the vote attached by attach_user_votes() when available
+            if hasattr(self, 'user_vote'):
+                return self.user_vote
             try:
                 like = self.likes.get(user=user)
                 return like.is_like
             except:
                 return None
         return None
+
+    @classmethod
+    def attach_user_votes(cls, posts, user):
+        """
+        Set `user_vote` (True, False or None) on each post using one query.
+        Returns the posts so it can wrap a page or list inline.
+        """
+        posts = list(posts)
+        votes = Like.get_user_votes(user, [post.pk for post in posts])
+        for post in posts:
+            post.user_vote = votes.get(post.pk)
+        return posts
         
     def get_media_type(self):
         """Return the type of media in the post"""
+        if self.media_type:
+            return self.media_type
         if self.video:
             return 'video'
         elif self.audio:
@@ -95,10 +203,76 @@ class Post(models.Model):
             return 'image'
         return 'text'
 
+    def _mime_type_of(self, kind):
+        field_file = getattr(self, kind)
+        if not field_file:
+            return None
+        if self.media_type == kind and self.media_name == field_file.name and self.media_mime_type:
+            return self.media_mime_type
+        # Not the recorded media: go by the extension
+        guessed = mimetypes.guess_type(field_file.name)[0] or ''
+        subtype = guessed.partition('/')[2] or os.path.splitext(field_file.name)[1][1:].lower()
+        return f'{kind}/{subtype}'
+
+    @property
+    def video_mime_type(self):
+        return self._mime_type_of('video')
+
+    @property
+    def audio_mime_type(self):
+        return self._mime_type_of('audio')
+
+    @property
+    def media_duration_display(self):
+        """media_duration as m:ss (h:mm:ss past an hour), or '' if unknown"""
+        if self.media_duration is None:
+            return ''
+        minutes, seconds = divmod(int(round(self.media_duration)), 60)
+        hours, minutes = divmod(minutes, 60)
+        if hours:
+            return f'{hours}:{minutes:02d}:{seconds:02d}'
+        return f'{minutes}:{seconds:02d}'
+
+    def responsive_image(self, rendition):
+        from .images import responsive_image
+        return responsive_image(self.image, self.image_derivatives, rendition)
+
+    @property
+    def card_image(self):
+        return self.responsive_image('card')
+
+    @property
+    def detail_image(self):
+        return self.responsive_image('detail')
+
     def get_absolute_url(self):
         return reverse('post_detail', kwargs={'pk': self.pk})
 
 
+class PostRanking(models.Model):
+    """
+    Materialized trending score for a post, refreshed by blog.rankings.
+    The home sidebar reads the top rows with a single indexed query.
+    """
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name='ranking')
+    score = models.FloatField(default=0)
+    featured = models.BooleanField(default=False)
+    # NULL until blog.rankings first scores the row (see sync_ranking_featured_flag)
+    computed_at = models.DateTimeField(default=timezone.now, null=True, blank=True)
+    # The time the score's decay was evaluated at. Every row shares it
+    # until the next full refresh, so incremental rescores stay comparable
+    scored_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-featured', '-score']
+        indexes = [
+            models.Index(fields=['-featured', '-score'], name='blog_ranking_top_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.post.title} ({self.score:.3f})'
+
+
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
     author = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -107,6 +281,10 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Per-post comment pages, keyset paginated on (created_at, id)
+            models.Index(fields=['post', '-created_at', '-id'], name='blog_comment_post_keyset_idx'),
+        ]
 
     def __str__(self):
         return f'Comment by {self.author.username} on {self.post.title}'
@@ -120,6 +298,24 @@ class Like(models.Model):
 
     class Meta:
         unique_together = ('user', 'post')  # One vote per user per post
+        indexes = [
+            # Covers per-post like/dislike counts without touching the table
+            models.Index(fields=['post', 'is_like'], name='blog_like_post_vote_idx'),
+        ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Remember the loaded vote so the counter signals can detect a flip
+        self._original_is_like = self.__dict__.get('is_like')
+
+    @classmethod
+    def get_user_votes(cls, user, post_ids):
+        """Return {post_id: is_like} for the user's votes on the given posts"""
+        if not user.is_authenticated or not post_ids:
+            return {}
+        return dict(
+            cls.objects.filter(user=user, post_id__in=post_ids).values_list('post_id', 'is_like')
+        )
 
     def __str__(self):
         vote_type = "liked" if self.is_like else "disliked"
@@ -134,12 +330,39 @@ class Follow(models.Model):
     class Meta:
         unique_together = ('follower', 'following')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['following', '-created_at', '-id'], name='blog_follow_followers_ks_idx'),
+            models.Index(fields=['follower', '-created_at', '-id'], name='blog_follow_following_ks_idx'),
+        ]
 
     def __str__(self):
         return f"{self.follower} follows {self.following}"
 
 
-class Profile(models.Model):
+class TimelineEntry(models.Model):
+    """
+    One post in one reader's following timeline, written when the post is
+    published (fan-out-on-write; see blog/timeline.py). created_at copies the
+    post's timestamp so timelines page on the same key as posts.
+    """
+    user = models.ForeignKey(User, related_name='timeline_entries', on_delete=models.CASCADE)
+    post = models.ForeignKey(Post, related_name='timeline_entries', on_delete=models.CASCADE)
+    # Copied from the post so an unfollow can trim entries without a join
+    author = models.ForeignKey(User, related_name='+', on_delete=models.CASCADE)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-post'], name='blog_timeline_feed_idx'),
+            models.Index(fields=['user', 'author'], name='blog_timeline_author_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.post} in {self.user}'s timeline"
+
+
+class Profile(DenormalizedCountersMixin, models.Model):
     PRIVACY_CHOICES = [
         ('public', 'Public - Anyone can view my profile'),
         ('private', 'Private - Only I can view my profile'),
@@ -149,6 +372,8 @@ class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     bio = models.TextField(max_length=500, blank=True)
     profile_picture = models.ImageField(upload_to='profile_pics/', default='default-avatar.png')
+    # Square avatar sizes of `profile_picture`, written by blog.images after upload
+    picture_derivatives = models.JSONField(null=True, blank=True, editable=False)
     location = models.CharField(max_length=100, blank=True)
     birth_date = models.DateField(null=True, blank=True)
     website = models.URLField(blank=True)
@@ -165,8 +390,18 @@ class Profile(models.Model):
         default='public',
         help_text='Control who can view your profile'
     )
+    # Denormalized follow counts, kept in sync by the Follow signals in
+    # blog.signals. Use `manage.py rebuild_follow_counters` if they drift.
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+    # Set once the user's posts stop being fanned out (see blog/timeline.py);
+    # it stays set so posts published meanwhile keep being read-merged
+    timeline_read_merged = models.BooleanField(default=False, editable=False)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
+
+    counter_fields = ('followers_count', 'following_count')
+    worker_fields = ('picture_derivatives', 'timeline_read_merged')
     
     def can_view_profile(self, requesting_user):
         """Check if the requesting user can view this profile"""
@@ -183,40 +418,82 @@ class Profile(models.Model):
     def __str__(self):
         return f"{self.user.username}'s Profile"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Snapshot of the row as loaded, for changed_fields()
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def _tracked_value(self, field):
+        value = getattr(self, field.attname)
+        if isinstance(value, FieldFile):
+            # A new upload is a change even if it reuses the old file name
+            return value.name if value._committed else object()
+        return value
+
+    def _snapshot(self):
+        self._loaded_values = {
+            field.attname: self._tracked_value(field) for field in self._meta.concrete_fields
+        }
+
+    def changed_fields(self):
+        """Names of fields changed since the profile was loaded (all of them if it never was)"""
+        fields = [field for field in self._meta.concrete_fields if not field.primary_key]
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return {field.name for field in fields}
+        return {
+            field.name for field in fields
+            if field.attname in loaded and self._tracked_value(field) != loaded[field.attname]
+        }
+
+    def has_changes(self):
+        return bool(self.changed_fields())
+
+    def _old_picture_name(self):
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is not None and 'profile_picture' in loaded:
+            return loaded['profile_picture']
+        # Built by hand rather than loaded: read the stored name
+        return Profile.objects.filter(pk=self.pk).values_list('profile_picture', flat=True).first()
+
     def save(self, *args, **kwargs):
         try:
+            # Storage calls (remote with Cloudinary) only happen when the
+            # picture itself changed, not on every profile or login save
+            picture_changed = self._state.adding or 'profile_picture' in self.changed_fields()
+            
             # If this is an existing instance
-            if self.pk:
-                old_instance = Profile.objects.get(pk=self.pk)
+            if picture_changed and self.pk and not self._state.adding:
+                old_name = self._old_picture_name()
                 
-                # Check if profile picture is being changed
-                if old_instance.profile_picture and old_instance.profile_picture != self.profile_picture:
+                # Only delete if it's not the default avatar
+                if old_name and 'default-avatar' not in old_name:
                     logger.info(f"Profile picture changed for user {self.user.username}")
-                    logger.info(f"Old picture: {old_instance.profile_picture}")
+                    logger.info(f"Old picture: {old_name}")
                     logger.info(f"New picture: {self.profile_picture}")
-                    
-                    # Only delete if it's not the default avatar
-                    if hasattr(old_instance.profile_picture, 'url') and 'default-avatar' not in old_instance.profile_picture.url:
-                        try:
-                            logger.info(f"Attempting to delete old profile picture: {old_instance.profile_picture}")
-                            storage = old_instance.profile_picture.storage
+                    try:
+                        logger.info(f"Attempting to delete old profile picture: {old_name}")
+                        storage = self.profile_picture.storage
+                        
+                        # Check if the file exists before trying to delete
+                        if storage.exists(old_name):
+                            storage.delete(old_name)
+                            logger.info("Successfully deleted old profile picture")
+                        else:
+                            logger.warning(f"Profile picture file not found: {old_name}")
                             
-                            # Check if the file exists before trying to delete
-                            if storage.exists(old_instance.profile_picture.name):
-                                storage.delete(old_instance.profile_picture.name)
-                                logger.info("Successfully deleted old profile picture")
-                            else:
-                                logger.warning(f"Profile picture file not found: {old_instance.profile_picture.name}")
-                                
-                        except Exception as e:
-                            logger.error(f"Error deleting old profile picture: {str(e)}", exc_info=True)
-                            # Continue with save even if deletion fails
+                    except Exception as e:
+                        logger.error(f"Error deleting old profile picture: {str(e)}", exc_info=True)
+                        # Continue with save even if deletion fails
             
             # Save the instance
             super().save(*args, **kwargs)
+            self._snapshot()
             
             # If this is a new profile picture, verify it was saved correctly
-            if self.profile_picture:
+            if picture_changed and self.profile_picture and 'default-avatar' not in self.profile_picture.name:
                 try:
                     if hasattr(self.profile_picture, 'url'):
                         # Verify the file exists in storage
@@ -245,19 +522,16 @@ class Profile(models.Model):
             # If no profile picture is set, return default
             if not self.profile_picture:
                 return '/static/images/default-avatar.png'
-                
-            # Try to get Cloudinary URL if available
-            if hasattr(self.profile_picture, 'url') and self.profile_picture.url:
+            
+            # Resolve the URL once; the storage layer memoizes it across requests
+            url = self.profile_picture.url
+            if url:
                 # If using Cloudinary, the URL will be a full URL
-                if self.profile_picture.url.startswith(('http://', 'https://')):
-                    return self.profile_picture.url
+                if url.startswith(('http://', 'https://')):
+                    return url
                 # If it's a local path, prepend MEDIA_URL
                 return f"{settings.MEDIA_URL}{self.profile_picture}"
-                
-            # Fallback to the file path
-            if hasattr(self.profile_picture, 'path') and os.path.exists(self.profile_picture.path):
-                return self.profile_picture.url
-                
+            
             # If we're here, the file might be missing but the reference exists
             logger.warning(f"Profile picture file missing for user {self.user.username}")
             return '/static/images/default-avatar.png'
@@ -265,3 +539,79 @@ class Profile(models.Model):
         except Exception as e:
             logger.error(f"Error in get_profile_picture_url for user {getattr(self.user, 'username', 'unknown')}: {str(e)}")
             return '/static/images/default-avatar.png'
+
+    @property
+    def avatar(self):
+        """ResponsiveImage for the picture, or None for the default avatar"""
+        from .images import responsive_image
+        if not self.profile_picture or 'default-avatar' in self.profile_picture.name:
+            return None
+        return responsive_image(self.profile_picture, self.picture_derivatives, 'avatar')
+
+
+class UserSearchIndex(models.Model):
+    """
+    One denormalized search row per user (see blog/search.py).
+    Text is stored lowercased, and the profile's privacy setting is copied
+    here so visibility is filtered in the same index lookup as the match.
+    """
+    user = models.OneToOneField(User, primary_key=True, related_name='search_index', on_delete=models.CASCADE)
+    username = models.CharField(max_length=150)
+    full_name = models.CharField(max_length=301, blank=True)
+    email = models.CharField(max_length=254, blank=True)
+    visibility = models.CharField(max_length=20, default='public')
+
+    class Meta:
+        indexes = [
+            # Pattern opclasses let PostgreSQL serve username LIKE 'prefix%';
+            # other backends ignore them
+            models.Index(
+                fields=['visibility', 'username'],
+                name='blog_usersearch_vis_idx',
+                opclasses=['varchar_pattern_ops', 'varchar_pattern_ops'],
+            ),
+        ]
+
+    def __str__(self):
+        return f"Search entry for {self.username}"
+
+
+class ChunkedUpload(models.Model):
+    """
+    A video or audio file being uploaded in chunks (see blog/uploads.py).
+    Bytes collect in a temp file until `offset` reaches `size`; completing
+    the upload moves them into media storage under `file_name`, ready for
+    PostForm to attach.
+    """
+    KIND_CHOICES = [
+        ('video', 'Video'),
+        ('audio', 'Audio'),
+    ]
+    STATUS_CHOICES = [
+        ('uploading', 'Uploading'),
+        # Being copied into media storage by one finish request
+        ('storing', 'Storing'),
+        ('complete', 'Complete'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, related_name='chunked_uploads', on_delete=models.CASCADE)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    # Bytes received so far; chunks must start here
+    offset = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='uploading')
+    # Storage name once complete
+    file_name = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Expiry sweeps in purge_chunked_uploads
+            models.Index(fields=['updated_at'], name='blog_chunkedupload_upd_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} upload {self.filename} by {self.user_id} ({self.offset}/{self.size})"
@@ -0,0 +1,114 @@
+"""
+Versioned page cache for anonymous traffic.
+
+Cached pages are keyed on a set of version counters (a global feed version,
+one per post and one per profile) that are bumped from model signals, so a
+write invalidates every page that shows it without having to enumerate keys.
+Only anonymous GET requests are served from or stored into the cache.
+"""
+import hashlib
+import logging
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY_PREFIX = 'blog:version:'
+PAGE_KEY_PREFIX = 'blog:page:'
+
+
+def feed_version_key():
+    return 'feed'
+
+
+def post_version_key(post_id):
+    return f'post:{post_id}'
+
+
+def profile_version_key(username):
+    return f'profile:{username}'
+
+
+def suggestions_version_key(user_id):
+    return f'suggestions:{user_id}'
+
+
+def get_versions(*names):
+    """Return {name: version} for the given version counters, in one cache round trip"""
+    keys = {f'{VERSION_KEY_PREFIX}{name}': name for name in names}
+    found = cache.get_many(list(keys))
+    return {name: found.get(key, 0) for key, name in keys.items()}
+
+
+def bump_version(*names):
+    """Invalidate everything cached under the given version counters"""
+    for name in names:
+        key = f'{VERSION_KEY_PREFIX}{name}'
+        # Versions never expire; a missing key simply starts again from 1
+        if not cache.add(key, 1, timeout=None):
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, 1, timeout=None)
+
+
+def attach_post_versions(posts):
+    """Set `cache_version` on each post for use in template fragment cache keys"""
+    versions = get_versions(*[post_version_key(post.pk) for post in posts])
+    for post in posts:
+        post.cache_version = versions[post_version_key(post.pk)]
+    return posts
+
+
+def _is_cacheable_request(request):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if request.user.is_authenticated:
+        return False
+    # Pages carrying one-off flash messages must be rendered fresh
+    return len(get_messages(request)) == 0
+
+
+def _page_key(request, version_names):
+    versions = get_versions(*version_names)
+    version_part = ':'.join(f'{name}={versions[name]}' for name in version_names)
+    path_hash = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'{PAGE_KEY_PREFIX}{version_part}:{path_hash}'
+
+
+def get_cached_page(request, version_names):
+    """Return the cached response for an anonymous request, or None"""
+    if not _is_cacheable_request(request):
+        return None
+    cached = cache.get(_page_key(request, version_names))
+    if cached is None:
+        return None
+    content, content_type = cached
+    response = HttpResponse(content, content_type=content_type)
+    response['X-Page-Cache'] = 'hit'
+    patch_vary_headers(response, ['Cookie'])
+    return response
+
+
+def store_cached_page(request, version_names, response):
+    """Cache a freshly rendered response if it is safe to share between anonymous visitors"""
+    patch_vary_headers(response, ['Cookie'])
+    if not _is_cacheable_request(request) or response.status_code != 200:
+        return response
+    # A rendered CSRF token or a new cookie is specific to this visitor
+    if request.META.get('CSRF_COOKIE_NEEDS_UPDATE') or response.cookies:
+        return response
+    timeout = getattr(settings, 'PAGE_CACHE_TIMEOUT', 60)
+    if timeout <= 0:
+        return response
+    cache.set(
+        _page_key(request, version_names),
+        (response.content, response['Content-Type']),
+        timeout,
+    )
+    response['X-Page-Cache'] = 'miss'
+    return response
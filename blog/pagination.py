@@ -0,0 +1,142 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.db.models import Q
+
+
+class InvalidCursor(Exception):
+    """Raised when a cursor token cannot be decoded"""
+
+
+def encode_cursor(created_at, pk, direction):
+    """Build an opaque, URL-safe token for a (created_at, id) position"""
+    payload = json.dumps([direction, created_at.isoformat(), pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return (direction, created_at, pk) for a token made by encode_cursor"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        direction, created_at, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if direction not in ('next', 'prev'):
+            raise ValueError(direction)
+        return direction, datetime.fromisoformat(created_at), int(pk)
+    except (binascii.Error, ValueError, TypeError, UnicodeDecodeError) as e:
+        raise InvalidCursor(str(e))
+
+
+def encode_score_cursor(score, pk):
+    """Build a token for a (score, id) position in relevance-ordered results"""
+    payload = json.dumps([score, pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_score_cursor(token):
+    """Return (score, pk) for a token made by encode_score_cursor"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        score, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return float(score), int(pk)
+    except (binascii.Error, ValueError, TypeError, UnicodeDecodeError) as e:
+        raise InvalidCursor(str(e))
+
+
+class CursorPage:
+    """
+    A page of results from KeysetPaginator.
+    Exposes the parts of django.core.paginator.Page the templates rely on,
+    minus anything that needs a total count.
+    """
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset newest-first on (created_at, id) without COUNT or OFFSET.
+    Every page is a single indexed range scan, so deep pages cost the same
+    as the first one. `pk_field` names the tiebreaker column, for tables
+    whose rows are positioned by another model's id.
+    """
+
+    def __init__(self, queryset, per_page, field='created_at', pk_field='id'):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.field = field
+        self.pk_field = pk_field
+
+    def window(self, token=None):
+        """
+        Return (queryset, direction, value) for the page starting at `token`.
+        The queryset is filtered and ordered but not yet sliced.
+        """
+        direction, value, pk = ('next', None, None)
+        if token:
+            direction, value, pk = decode_cursor(token)
+
+        qs = self.queryset
+        if value is None:
+            qs = qs.order_by(f'-{self.field}', f'-{self.pk_field}')
+        elif direction == 'next':
+            # The redundant range on the leading column keeps this an index
+            # range seek instead of a scan that filters the OR row by row
+            qs = qs.filter(**{f'{self.field}__lte': value}).filter(
+                Q(**{f'{self.field}__lt': value}) | Q(**{f'{self.pk_field}__lt': pk})
+            ).order_by(f'-{self.field}', f'-{self.pk_field}')
+        else:
+            qs = qs.filter(**{f'{self.field}__gte': value}).filter(
+                Q(**{f'{self.field}__gt': value}) | Q(**{f'{self.pk_field}__gt': pk})
+            ).order_by(self.field, self.pk_field)
+        return qs, direction, value
+
+    def page(self, token=None):
+        qs, direction, value = self.window(token)
+        return self.build_page(list(qs[:self.per_page + 1]), direction, value)
+
+    def build_page(self, rows, direction, value):
+        """
+        Turn up to per_page + 1 rows fetched in window order into a CursorPage.
+        Rows only need the `field` and `pk_field` attributes, so callers that
+        merge several windows can pass their own objects.
+        """
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if direction == 'prev':
+            rows.reverse()
+            has_newer, has_older = has_more, True
+        else:
+            has_newer, has_older = value is not None, has_more
+
+        next_cursor = previous_cursor = None
+        if rows and has_older:
+            last = rows[-1]
+            next_cursor = encode_cursor(getattr(last, self.field), getattr(last, self.pk_field), 'next')
+        if rows and has_newer:
+            first = rows[0]
+            previous_cursor = encode_cursor(getattr(first, self.field), getattr(first, self.pk_field), 'prev')
+        return CursorPage(rows, next_cursor, previous_cursor)
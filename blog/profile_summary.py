@@ -0,0 +1,104 @@
+"""
+Data for profile_view in one query plus a cached presentation part.
+
+load_profile_summary reads the user, their profile (including the
+denormalized follow counts) and their post totals in a single query. The
+parts that only change with the profile itself, the avatar URLs (which can
+cost storage calls) and the social links, are assembled once and cached
+under the profile's page-cache version, which the Profile and Follow
+signals already bump. Only the viewer's `is_following` bit is left to be
+computed per request.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Follow, Post, Profile
+from .page_cache import get_versions, profile_version_key
+
+# Bumped when the cached dict changes shape (v2 added 'avatar')
+CACHE_KEY_PREFIX = 'blog:profile-summary:v2:'
+DEFAULT_AVATAR_URL = '/static/images/default-avatar.png'
+
+
+def load_profile_summary(username):
+    """
+    The user named `username` with `profile` loaded and `post_total` and
+    `image_post_total` annotated, or None if there is no such user.
+    """
+    posts = Post.objects.filter(author=OuterRef('pk')).order_by().values('author')
+    post_total = posts.annotate(total=Count('pk')).values('total')
+    # Visitors only see the posts with an image
+    image_post_total = posts.exclude(image__isnull=True).exclude(image='').annotate(
+        total=Count('pk')
+    ).values('total')
+    user = get_user_model().objects.select_related('profile').annotate(
+        post_total=Coalesce(Subquery(post_total), 0),
+        image_post_total=Coalesce(Subquery(image_post_total), 0),
+    ).filter(username=username).first()
+    if user is None:
+        return None
+
+    try:
+        user.profile
+    except Profile.DoesNotExist:
+        # Accounts created before profiles existed
+        user.profile, _ = Profile.objects.get_or_create(user=user, defaults={'privacy_setting': 'public', 'bio': ''})
+    if not user.profile.privacy_setting:
+        user.profile.privacy_setting = 'public'
+    return user
+
+
+def viewer_is_following(request, user_id):
+    """
+    Whether the requesting user follows `user_id`. Memoized on the request,
+    since profile_validators asks the same question before the view does.
+    """
+    if not request.user.is_authenticated or request.user.pk == user_id:
+        return False
+    memo = request.__dict__.setdefault('_following_memo', {})
+    if user_id not in memo:
+        memo[user_id] = Follow.objects.filter(follower=request.user, following_id=user_id).exists()
+    return memo[user_id]
+
+
+def social_links(profile):
+    """{label: url} for the social accounts filled in on the profile"""
+    links = {}
+    if profile.website:
+        links['Website'] = profile.website
+    if profile.twitter_handle:
+        links['Twitter'] = f'https://twitter.com/{profile.twitter_handle}'
+    if profile.github_username:
+        links['GitHub'] = f'https://github.com/{profile.github_username}'
+    if profile.facebook_url:
+        links['Facebook'] = profile.facebook_url
+    if profile.instagram_username:
+        links['Instagram'] = f'https://instagram.com/{profile.instagram_username}'
+    if profile.tiktok_username:
+        links['TikTok'] = f'https://tiktok.com/@{profile.tiktok_username}'
+    if profile.snapchat_username:
+        links['Snapchat'] = f'https://snapchat.com/add/{profile.snapchat_username}'
+    return links
+
+
+def profile_presentation(user):
+    """
+    {'profile_picture_url': ..., 'avatar': ..., 'social_links': {...}}
+    for `user`'s profile, cached until the profile or its follows change.
+    """
+    version_name = profile_version_key(user.username)
+    key = f'{CACHE_KEY_PREFIX}{user.pk}:{get_versions(version_name)[version_name]}'
+    presentation = cache.get(key)
+    if presentation is None:
+        profile = user.profile
+        presentation = {
+            'profile_picture_url': profile.get_profile_picture_url() or DEFAULT_AVATAR_URL,
+            # Sized copies for srcset, once blog.images has built them
+            'avatar': profile.avatar,
+            'social_links': social_links(profile),
+        }
+        cache.set(key, presentation, getattr(settings, 'PROFILE_SUMMARY_CACHE_TIMEOUT', 3600))
+    return presentation
@@ -0,0 +1,76 @@
+"""
+The hot queries behind the main views and a check of their EXPLAIN plans.
+
+Every query here must be answered from an index: no full table scan and
+no sort the index doesn't already satisfy. blog.tests.test_query_plans
+asserts this on SQLite, and `manage.py check_query_plans` runs the same
+check against a real database.
+"""
+import re
+from datetime import datetime, timezone
+
+from django.db import connection
+
+from .models import Post, Comment, Like, Follow, PostRanking, TimelineEntry
+from .pagination import KeysetPaginator, encode_cursor
+
+# Placeholder values; EXPLAIN only needs the shape of the query
+SAMPLE_ID = 1
+SAMPLE_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+SQLITE_BAD_PATTERNS = [
+    re.compile(r'\bSCAN \w+$'),            # full table scan, no index used
+    re.compile(r'USE TEMP B-TREE'),         # sort that the index doesn't satisfy
+]
+POSTGRES_BAD_PATTERNS = [
+    re.compile(r'Seq Scan'),
+    re.compile(r'(^|->\s*)Sort\b'),
+]
+
+
+def hot_queries():
+    """The access paths the views rely on, keyed by a short description"""
+    feed = KeysetPaginator(Post.objects.all(), 5)
+    comments = KeysetPaginator(Comment.objects.filter(post_id=SAMPLE_ID), 20)
+    followers = KeysetPaginator(Follow.objects.filter(following_id=SAMPLE_ID), 20)
+    following = KeysetPaginator(Follow.objects.filter(follower_id=SAMPLE_ID), 20)
+    timeline = KeysetPaginator(TimelineEntry.objects.filter(user_id=SAMPLE_ID), 10, pk_field='post_id')
+    return {
+        'home feed, first page': feed.window()[0][:6],
+        'home feed, older page': feed.window(encode_cursor(SAMPLE_TIME, SAMPLE_ID, 'next'))[0][:6],
+        'home feed, newer page': feed.window(encode_cursor(SAMPLE_TIME, SAMPLE_ID, 'prev'))[0][:6],
+        'home sidebar ranking': PostRanking.objects.order_by('-featured', '-score')[:2],
+        'profile posts': Post.objects.filter(author_id=SAMPLE_ID).order_by('-created_at')[:5],
+        'post comments, first page': comments.window()[0][:21],
+        'post comments, older page': comments.window(encode_cursor(SAMPLE_TIME, SAMPLE_ID, 'next'))[0][:21],
+        'vote counts': Like.objects.filter(post_id=SAMPLE_ID, is_like=True).values('is_like'),
+        'user votes for a page': Like.objects.filter(
+            user_id=SAMPLE_ID, post_id__in=[SAMPLE_ID, SAMPLE_ID + 1]
+        ).values_list('post_id', 'is_like'),
+        'followers list, first page': followers.window()[0][:21],
+        'followers list, older page': followers.window(encode_cursor(SAMPLE_TIME, SAMPLE_ID, 'next'))[0][:21],
+        'following list, first page': following.window()[0][:21],
+        'following list, older page': following.window(encode_cursor(SAMPLE_TIME, SAMPLE_ID, 'next'))[0][:21],
+        'following timeline, first page': timeline.window()[0][:11],
+        'following timeline, older page': timeline.window(encode_cursor(SAMPLE_TIME, SAMPLE_ID, 'next'))[0][:11],
+        'timeline trim on unfollow': TimelineEntry.objects.filter(user_id=SAMPLE_ID, author_id=SAMPLE_ID + 1),
+    }
+
+
+def bad_patterns():
+    """The plan lines that mean a full scan or a filesort, or None for an unknown backend"""
+    if connection.vendor == 'sqlite':
+        return SQLITE_BAD_PATTERNS
+    if connection.vendor == 'postgresql':
+        return POSTGRES_BAD_PATTERNS
+    return None
+
+
+def plan_problems(queryset, patterns):
+    """EXPLAIN `queryset` and return (plan, the lines matching `patterns`)"""
+    plan = queryset.explain()
+    problems = [
+        line.strip() for line in plan.splitlines()
+        if any(pattern.search(line.strip()) for pattern in patterns)
+    ]
+    return plan, problems
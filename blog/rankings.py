@@ -0,0 +1,114 @@
+"""
+Trending ranking for the home sidebar.
+
+Scores are a time-decayed blend of views, votes and comments read from the
+denormalized counters on Post and stored in PostRanking. Only posts inside
+RANKING_WINDOW_DAYS (plus editorially featured posts) are scored, so each
+refresh touches a bounded set of rows. Featured posts always sort first.
+
+`manage.py refresh_rankings --loop` keeps the table fresh: every
+RANKING_REFRESH_INTERVAL it rescores only the posts with new activity, and
+every RANKING_FULL_REFRESH_INTERVAL it rescores the whole window so that
+decay catches up with quiet posts.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max, Q
+from django.utils import timezone
+
+from .models import Post, PostRanking
+from .page_cache import bump_version, feed_version_key
+
+logger = logging.getLogger(__name__)
+
+VIEW_WEIGHT = 1.0
+LIKE_WEIGHT = 4.0
+DISLIKE_WEIGHT = -2.0
+COMMENT_WEIGHT = 6.0
+GRAVITY = 1.5
+
+
+def compute_score(view_count, like_count, dislike_count, comment_count, created_at, now=None):
+    """Engagement divided by (age in hours + 2) ** GRAVITY"""
+    now = now or timezone.now()
+    engagement = (
+        VIEW_WEIGHT * view_count
+        + LIKE_WEIGHT * like_count
+        + DISLIKE_WEIGHT * dislike_count
+        + COMMENT_WEIGHT * comment_count
+    )
+    age_hours = max((now - created_at).total_seconds() / 3600, 0)
+    return max(engagement, 0) / (age_hours + 2) ** GRAVITY
+
+
+def refresh_rankings(batch_size=500, full=False):
+    """
+    Rescore the posts whose counters changed since their ranking was
+    computed, plus new posts without a scored ranking. Returns the number
+    of rankings written.
+
+    Scores keep the decay reference time of the last full refresh so that
+    rescored and untouched rows stay comparable. A full refresh
+    (`full=True`, or when nothing has been scored yet) rescores the whole
+    window against the current time and drops posts that aged out of it.
+    """
+    now = timezone.now()
+    window_start = now - timedelta(days=getattr(settings, 'RANKING_WINDOW_DAYS', 30))
+    candidates = Post.objects.filter(Q(created_at__gte=window_start) | Q(featured=True)).order_by('pk')
+
+    reference = None if full else PostRanking.objects.aggregate(latest=Max('scored_at'))['latest']
+    if reference is None:
+        full = True
+        reference = now
+    else:
+        candidates = candidates.filter(
+            Q(ranking__isnull=True)
+            | Q(ranking__computed_at__isnull=True)
+            | Q(activity_at__gt=F('ranking__computed_at'))
+        )
+    fields = ('pk', 'view_count', 'like_count', 'dislike_count', 'comment_count', 'created_at', 'featured')
+
+    written = 0
+    last_pk = 0
+    while True:
+        rows = list(candidates.filter(pk__gt=last_pk).values_list(*fields)[:batch_size])
+        if not rows:
+            break
+        rankings = [
+            PostRanking(
+                post_id=pk,
+                score=compute_score(views, likes, dislikes, comments, created_at, reference),
+                featured=featured,
+                computed_at=now,
+                scored_at=reference,
+            )
+            for pk, views, likes, dislikes, comments, created_at, featured in rows
+        ]
+        with transaction.atomic():
+            PostRanking.objects.bulk_create(
+                rankings,
+                update_conflicts=True,
+                unique_fields=['post'],
+                update_fields=['score', 'featured', 'computed_at', 'scored_at'],
+            )
+        written += len(rankings)
+        last_pk = rows[-1][0]
+
+    removed = 0
+    if full:
+        # Anything not touched in this pass has aged out of the window
+        removed, _ = PostRanking.objects.filter(computed_at__lt=now).delete()
+    if written or removed:
+        # The sidebar is part of the cached home page
+        bump_version(feed_version_key())
+    logger.info(f"Refreshed {written} post rankings ({'full' if full else 'incremental'})")
+    return written
+
+
+def top_posts(limit=2):
+    """Top ranked posts, featured first, read from the materialized table"""
+    rankings = PostRanking.objects.select_related('post__author').order_by('-featured', '-score')[:limit]
+    return [ranking.post for ranking in rankings]
@@ -0,0 +1,406 @@
+"""
+Indexed search.
+
+User search reads UserSearchIndex, a denormalized row per user holding the
+lowercased username, full name and email plus the profile's privacy setting.
+The backend-specific index lives next to it (migration 0017):
+
+* SQLite: an external-content FTS5 table with the trigram tokenizer, kept
+  in sync by triggers (migration 0024). Queries are substring matches, as
+  the old icontains search was; visibility is checked on the matching rows
+  through their primary key rather than by joining Profile.
+* PostgreSQL: a pg_trgm GIN index over the concatenated text for substring
+  matches.
+
+Username prefixes are looked up separately on the (visibility, username)
+index, so exact and prefix username matches always rank first.
+
+Trigrams need at least MIN_TRIGRAM_LENGTH characters, so on both backends
+shorter words only match as username prefixes.
+
+Other backends fall back to icontains on the denormalized table.
+
+Profiles with an empty privacy setting (from before the setting existed)
+are indexed as public, as the profile page treats them.
+
+Rows are written from the User and Profile signals; run
+`manage.py rebuild_search_index` after bulk imports that skip signals.
+
+Post search reads a full-text index over title and content (migration
+0018): FTS5 on SQLite and a weighted tsvector column with a GIN index on
+PostgreSQL, both maintained by database triggers whenever a post's text is
+saved. The newest POST_SEARCH_RANK_CANDIDATES matches are ranked (bm25 /
+ts_rank, title weighted above content) and paged with a (score, id) keyset
+cursor. Scores depend on corpus statistics, so a page fetched after new
+posts arrive can repeat or skip a borderline result.
+"""
+import re
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+from django.utils.text import Truncator
+
+from .models import Post, Profile, UserSearchIndex
+from .pagination import CursorPage, decode_score_cursor, encode_score_cursor
+
+MAX_USER_RESULTS = 200
+# Text matches scored for relevance; broad queries are ranked within these
+RANK_CANDIDATES = 500
+# Below this length trigrams can't use the index, so only username prefixes match
+MIN_TRIGRAM_LENGTH = 3
+
+SEARCHABLE_USER_FIELDS = {'username', 'first_name', 'last_name', 'email'}
+
+USER_FTS_TABLE = 'blog_usersearch_fts'
+
+POST_FTS_TABLE = 'blog_post_fts'
+# bm25 weights for title, content
+POST_FTS_WEIGHTS = '10.0, 1.0'
+# Must match the config the migration's trigger builds search_vector with
+POST_SEARCH_CONFIG = 'english'
+SNIPPET_WORDS = 30
+# Private-use characters mark highlights, so snippets can be escaped first
+HIGHLIGHT_START = '\ue000'
+HIGHLIGHT_END = '\ue001'
+
+
+def search_visibility(privacy_setting):
+    """The visibility indexed for a profile's privacy setting"""
+    return privacy_setting or 'public'
+
+
+def user_search_entry(user, visibility):
+    return UserSearchIndex(
+        user_id=user.pk,
+        username=user.username.lower(),
+        full_name=user.get_full_name().lower(),
+        email=(user.email or '').lower(),
+        visibility=visibility,
+    )
+
+
+def sync_user_search_entry(user):
+    """Write the user's search row from the current User and Profile"""
+    visibility = Profile.objects.filter(user_id=user.pk).values_list('privacy_setting', flat=True).first()
+    entry = user_search_entry(user, search_visibility(visibility))
+    UserSearchIndex.objects.update_or_create(
+        user_id=user.pk,
+        defaults={
+            'username': entry.username,
+            'full_name': entry.full_name,
+            'email': entry.email,
+            'visibility': entry.visibility,
+        },
+    )
+
+
+def update_user_visibility(user_id, visibility):
+    """Copy a profile's privacy setting onto its search row, if it changed"""
+    visibility = search_visibility(visibility)
+    UserSearchIndex.objects.filter(user_id=user_id).exclude(visibility=visibility).update(visibility=visibility)
+
+
+def visible_settings(viewer):
+    """
+    Privacy settings whose profiles `viewer` may find, or None for all.
+    Viewers always find themselves; search_users handles that separately.
+    """
+    if not viewer.is_authenticated:
+        return ['public']
+    if viewer.is_superuser:
+        return None
+    return ['public', 'registered']
+
+
+def query_tokens(query):
+    return re.findall(r'\w+', query.lower())
+
+
+def _like_escape(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _prefix_upper_bound(prefix):
+    """Smallest string greater than every string starting with `prefix`"""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _fts_match(tokens):
+    # Every token must occur somewhere in the row; quoted, so user input
+    # can't use FTS5 operators
+    return ' '.join('"{}"'.format(token.replace('"', '""')) for token in tokens)
+
+
+def _fetch_ids(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _fetch_rows(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _visibility_sql(visibilities, viewer_id):
+    """WHERE fragment for the plain search table, and its params"""
+    if visibilities is None:
+        return '', []
+    placeholders = ', '.join(['%s'] * len(visibilities))
+    return f'AND (s.visibility IN ({placeholders}) OR s.user_id = %s)', [*visibilities, viewer_id or 0]
+
+
+def _username_matches_sqlite(query, visibilities, viewer_id, limit):
+    # A range instead of LIKE so the (visibility, username) index is used;
+    # the exact match sorts first because it is the smallest string in range
+    table = connection.ops.quote_name(UserSearchIndex._meta.db_table)
+    visibility_sql, visibility_params = _visibility_sql(visibilities, viewer_id)
+    return _fetch_ids(
+        f'SELECT user_id FROM {table} s WHERE username >= %s AND username < %s {visibility_sql} '
+        f'ORDER BY username LIMIT %s',
+        [query, _prefix_upper_bound(query), *visibility_params, limit],
+    )
+
+
+def _text_matches_sqlite(tokens, visibilities, viewer_id, limit):
+    # Shorter words have no trigrams to look up
+    tokens = [token for token in tokens if len(token) >= MIN_TRIGRAM_LENGTH]
+    if not tokens:
+        return []
+    # Visibility is checked on the plain table through the rowid join, so
+    # only matching rows are looked at; CROSS JOIN keeps the planner from
+    # putting the plain table in the outer loop. Ranking is by which column
+    # matched rather than bm25(), whose per-query statistics cost O(matches).
+    table = connection.ops.quote_name(UserSearchIndex._meta.db_table)
+    visibility_sql, visibility_params = _visibility_sql(visibilities, viewer_id)
+    return _fetch_ids(
+        f'SELECT user_id FROM ('
+        f'SELECT s.user_id, s.username, s.full_name FROM {USER_FTS_TABLE} '
+        f'CROSS JOIN {table} s ON s.user_id = {USER_FTS_TABLE}.rowid '
+        f'WHERE {USER_FTS_TABLE} MATCH %s {visibility_sql} LIMIT %s'
+        f') ORDER BY instr(username, %s) = 0, instr(full_name, %s) = 0, username LIMIT %s',
+        [_fts_match(tokens), *visibility_params, RANK_CANDIDATES, tokens[0], tokens[0], limit],
+    )
+
+
+def _username_matches_postgresql(query, visibilities, viewer_id, limit):
+    table = connection.ops.quote_name(UserSearchIndex._meta.db_table)
+    visibility_sql, visibility_params = _visibility_sql(visibilities, viewer_id)
+    return _fetch_ids(
+        f'SELECT user_id FROM {table} s WHERE username LIKE %s {visibility_sql} '
+        f'ORDER BY username <> %s, username LIMIT %s',
+        [_like_escape(query) + '%', *visibility_params, query, limit],
+    )
+
+
+def _text_matches_postgresql(query, visibilities, viewer_id, limit):
+    if len(query) < MIN_TRIGRAM_LENGTH:
+        return []
+    table = connection.ops.quote_name(UserSearchIndex._meta.db_table)
+    visibility_sql, visibility_params = _visibility_sql(visibilities, viewer_id)
+    return _fetch_ids(
+        f'SELECT user_id FROM ('
+        f"SELECT user_id, similarity(username || ' ' || full_name, %s) AS score FROM {table} s "
+        f"WHERE (username || ' ' || full_name || ' ' || email) LIKE %s {visibility_sql} LIMIT %s"
+        f') AS candidates ORDER BY score DESC LIMIT %s',
+        [query, '%' + _like_escape(query) + '%', *visibility_params, RANK_CANDIDATES, limit],
+    )
+
+
+def _search_users_generic(query, visibilities, viewer_id, limit):
+    entries = UserSearchIndex.objects.filter(
+        Q(username__contains=query) | Q(full_name__contains=query) | Q(email__contains=query)
+    )
+    if visibilities is not None:
+        entries = entries.filter(Q(visibility__in=visibilities) | Q(user_id=viewer_id))
+    entries = entries.annotate(
+        match_rank=Case(
+            When(username=query, then=Value(0)),
+            When(username__startswith=query, then=Value(1)),
+            default=Value(2),
+            output_field=IntegerField(),
+        )
+    ).order_by('match_rank', 'username')
+    return list(entries.values_list('user_id', flat=True)[:limit])
+
+
+def search_users(query, viewer, limit=MAX_USER_RESULTS):
+    """
+    Ids of users matching `query` that `viewer` may see, best match first:
+    the exact username, other usernames starting with the query, then
+    name/email matches by text relevance.
+    """
+    query = query.strip().lower()
+    tokens = query_tokens(query)
+    if not tokens:
+        return []
+    visibilities = visible_settings(viewer)
+    viewer_id = viewer.pk if viewer.is_authenticated else None
+
+    if connection.vendor == 'sqlite':
+        username_ids = _username_matches_sqlite(query, visibilities, viewer_id, limit)
+        text_ids = _text_matches_sqlite(tokens, visibilities, viewer_id, limit)
+    elif connection.vendor == 'postgresql':
+        username_ids = _username_matches_postgresql(query, visibilities, viewer_id, limit)
+        text_ids = _text_matches_postgresql(query, visibilities, viewer_id, limit)
+    else:
+        return _search_users_generic(query, visibilities, viewer_id, limit)
+
+    seen = set(username_ids)
+    return (username_ids + [pk for pk in text_ids if pk not in seen])[:limit]
+
+
+def users_in_order(user_ids):
+    """Load users for a page of search results, keeping the ranked order"""
+    users = get_user_model().objects.select_related('profile').in_bulk(user_ids)
+    return [users[pk] for pk in user_ids if pk in users]
+
+
+def post_rank_candidates():
+    return getattr(settings, 'POST_SEARCH_RANK_CANDIDATES', 1000)
+
+
+def _post_fts_match(query):
+    # Every word or "quoted phrase" must match, as with websearch_to_tsquery
+    # on PostgreSQL. Each becomes an FTS5 phrase of bare word tokens, so
+    # user input can't use FTS5 operators
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"?|([^\s"]+)', query):
+        tokens = query_tokens(phrase or word)
+        if tokens:
+            terms.append('"{}"'.format(' '.join(tokens)))
+    return ' '.join(terms)
+
+
+def _after_sql(after, score_column, id_column):
+    if after is None:
+        return '', []
+    score, pk = after
+    return (
+        f'WHERE {score_column} < %s OR ({score_column} = %s AND {id_column} < %s)',
+        [score, score, pk],
+    )
+
+
+def _ranked_posts_sqlite(query, after, limit):
+    # bm25() is lower-is-better; negate it so every backend sorts descending
+    after_sql, after_params = _after_sql(after, 'score', 'post_id')
+    return _fetch_rows(
+        f'SELECT post_id, score FROM ('
+        f'SELECT rowid AS post_id, -bm25({POST_FTS_TABLE}, {POST_FTS_WEIGHTS}) AS score '
+        f'FROM {POST_FTS_TABLE} WHERE {POST_FTS_TABLE} MATCH %s ORDER BY rowid DESC LIMIT %s'
+        f') {after_sql} ORDER BY score DESC, post_id DESC LIMIT %s',
+        [_post_fts_match(query), post_rank_candidates(), *after_params, limit],
+    )
+
+
+def _post_highlights_sqlite(query, post_ids):
+    placeholders = ', '.join(['%s'] * len(post_ids))
+    return _fetch_rows(
+        f'SELECT rowid, highlight({POST_FTS_TABLE}, 0, %s, %s), '
+        f"snippet({POST_FTS_TABLE}, 1, %s, %s, '…', %s) "
+        f'FROM {POST_FTS_TABLE} WHERE {POST_FTS_TABLE} MATCH %s AND rowid IN ({placeholders})',
+        [
+            HIGHLIGHT_START, HIGHLIGHT_END, HIGHLIGHT_START, HIGHLIGHT_END, SNIPPET_WORDS,
+            _post_fts_match(query), *post_ids,
+        ],
+    )
+
+
+def _ranked_posts_postgresql(query, after, limit):
+    table = connection.ops.quote_name(Post._meta.db_table)
+    after_sql, after_params = _after_sql(after, 'score', 'post_id')
+    # ts_rank is only evaluated for the rows that survive the LIMIT
+    return _fetch_rows(
+        f'SELECT post_id, score FROM ('
+        f'SELECT p.id AS post_id, ts_rank(p.search_vector, q) AS score '
+        f'FROM {table} p, websearch_to_tsquery(%s::regconfig, %s) q '
+        f'WHERE p.search_vector @@ q ORDER BY p.id DESC LIMIT %s'
+        f') AS candidates {after_sql} ORDER BY score DESC, post_id DESC LIMIT %s',
+        [POST_SEARCH_CONFIG, query, post_rank_candidates(), *after_params, limit],
+    )
+
+
+def _post_highlights_postgresql(query, post_ids):
+    table = connection.ops.quote_name(Post._meta.db_table)
+    selectors = f'StartSel="{HIGHLIGHT_START}", StopSel="{HIGHLIGHT_END}"'
+    # ts_headline reparses the document, so it only runs for the page's rows
+    return _fetch_rows(
+        f'SELECT p.id, ts_headline(%s::regconfig, p.title, q, %s), '
+        f'ts_headline(%s::regconfig, p.content, q, %s) '
+        f'FROM {table} p, websearch_to_tsquery(%s::regconfig, %s) q WHERE p.id = ANY(%s)',
+        [
+            POST_SEARCH_CONFIG, f'HighlightAll=true, {selectors}',
+            POST_SEARCH_CONFIG, f'MaxWords={SNIPPET_WORDS}, MinWords={SNIPPET_WORDS // 2}, {selectors}',
+            POST_SEARCH_CONFIG, query, list(post_ids),
+        ],
+    )
+
+
+def _ranked_posts_generic(query, after, limit):
+    posts = Post.objects.filter(Q(title__icontains=query) | Q(content__icontains=query)).annotate(
+        score=Case(When(title__icontains=query, then=Value(2)), default=Value(1), output_field=IntegerField())
+    )
+    if after is not None:
+        score, pk = after
+        posts = posts.filter(Q(score__lt=score) | Q(score=score, pk__lt=pk))
+    return list(posts.order_by('-score', '-pk').values_list('pk', 'score')[:limit])
+
+
+def _highlighted(text):
+    return mark_safe(escape(text).replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>'))
+
+
+def search_posts(query, token=None, per_page=10):
+    """
+    One CursorPage of posts matching `query`, most relevant first. Every
+    word must match and "quoted phrases" match as a whole.
+    Each post gets `search_rank` plus HTML-safe `title_highlight` and
+    `snippet` attributes with the matched terms in <mark> tags.
+    Raises InvalidCursor for a malformed token.
+    """
+    after = decode_score_cursor(token) if token else None
+    query = query.strip()
+    if not query_tokens(query):
+        # Nothing searchable, e.g. only punctuation
+        return CursorPage([], None, None)
+
+    if connection.vendor == 'sqlite':
+        rows = _ranked_posts_sqlite(query, after, per_page + 1)
+    elif connection.vendor == 'postgresql':
+        rows = _ranked_posts_postgresql(query, after, per_page + 1)
+    else:
+        rows = _ranked_posts_generic(query, after, per_page + 1)
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    post_ids = [pk for pk, _ in rows]
+    posts = Post.objects.select_related('author', 'author__profile').in_bulk(post_ids)
+
+    highlights = {}
+    if post_ids and connection.vendor == 'sqlite':
+        highlights = {pk: (title, snippet) for pk, title, snippet in _post_highlights_sqlite(query, post_ids)}
+    elif post_ids and connection.vendor == 'postgresql':
+        highlights = {pk: (title, snippet) for pk, title, snippet in _post_highlights_postgresql(query, post_ids)}
+
+    results = []
+    for pk, score in rows:
+        post = posts.get(pk)
+        if post is None:
+            continue
+        title, snippet = highlights.get(pk, (post.title, Truncator(post.content).words(SNIPPET_WORDS)))
+        post.search_rank = score
+        post.title_highlight = _highlighted(title)
+        post.snippet = _highlighted(snippet)
+        results.append(post)
+
+    next_cursor = None
+    if has_more:
+        last_pk, last_score = rows[-1]
+        next_cursor = encode_score_cursor(last_score, last_pk)
+    return CursorPage(results, next_cursor, None)
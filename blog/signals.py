@@ -1,7 +1,21 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_save, post_delete
 from django.contrib.auth.models import User
 from django.dispatch import receiver
-from .models import Profile
+from django.utils import timezone
+from .models import Profile, Post, Comment, Like, PostRanking, Follow
+from .page_cache import (
+    bump_version, feed_version_key, post_version_key, profile_version_key, suggestions_version_key,
+)
+from .timeline import fan_out_post, backfill_timeline, trim_timeline
+from .search import SEARCHABLE_USER_FIELDS, search_visibility, sync_user_search_entry, update_user_visibility
+from .autocomplete import record_user_change
+from .images import (
+    delete_derivatives, derivatives_are_current, generate_post_derivatives, generate_profile_derivatives,
+    schedule_derivatives,
+)
 
 
 @receiver(post_save, sender=User)
@@ -12,9 +26,222 @@ def create_user_profile(sender, instance, created, **kwargs):
 
 
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    """Save the Profile instance when the User is saved"""
-    if hasattr(instance, 'profile'):
-        instance.profile.save()
+def save_user_profile(sender, instance, created, **kwargs):
+    """
+    Save the Profile along with the User if it was edited through it.
+    Only an already-loaded profile can have been, so a plain User save
+    (e.g. the last_login update on each login) touches no profile at all.
+    """
+    if created:
+        return
+    profile = sender.profile.related.get_cached_value(instance, None)
+    if profile is not None and profile.has_changes():
+        profile.save()
+
+
+@receiver(post_save, sender=User)
+def index_user_for_search(sender, instance, update_fields=None, **kwargs):
+    """Keep the user's search row in step; logins only touch last_login"""
+    if update_fields is not None and not SEARCHABLE_USER_FIELDS & set(update_fields):
+        return
+    sync_user_search_entry(instance)
+
+
+@receiver(post_save, sender=Profile)
+def index_profile_visibility(sender, instance, **kwargs):
+    update_user_visibility(instance.user_id, instance.privacy_setting)
+
+
+@receiver(post_save, sender=User)
+def refresh_autocomplete_user(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not {'username', 'first_name', 'last_name'} & set(update_fields):
+        return
+    record_user_change(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def remove_autocomplete_user(sender, instance, **kwargs):
+    record_user_change(instance.pk)
+
+
+@receiver(post_save, sender=Profile)
+def refresh_autocomplete_visibility(sender, instance, created, **kwargs):
+    # Most profile saves don't touch the privacy setting; only log real changes.
+    # A new profile is only news if it isn't public, which the user's own
+    # entry already assumed
+    if created:
+        changed = search_visibility(instance.privacy_setting) != 'public'
     else:
-        Profile.objects.create(user=instance)
+        changed = 'privacy_setting' in instance.changed_fields()
+    if changed:
+        record_user_change(instance.user_id)
+
+
+def _apply_counter_deltas(queryset, deltas, **values):
+    """
+    Apply counter deltas to the matching rows with one UPDATE, which also
+    sets any `values` given. Decrements are clamped at zero so a drifted
+    counter never violates the PositiveIntegerField constraint.
+    """
+    updates = {}
+    for field, delta in deltas.items():
+        if delta > 0:
+            updates[field] = F(field) + delta
+        elif delta < 0:
+            updates[field] = Greatest(F(field) - (-delta), 0)
+    if updates:
+        queryset.update(**updates, **values)
+
+
+def adjust_post_counters(post_id, **deltas):
+    """Apply counter deltas to a single Post row and mark it for rescoring"""
+    _apply_counter_deltas(Post.objects.filter(pk=post_id), deltas, activity_at=timezone.now())
+
+
+def adjust_profile_counters(user_id, **deltas):
+    """Apply counter deltas to a single user's Profile row"""
+    _apply_counter_deltas(Profile.objects.filter(user_id=user_id), deltas)
+
+
+def _vote_field(is_like):
+    return 'like_count' if is_like else 'dislike_count'
+
+
+@receiver(post_save, sender=Like)
+def update_counters_on_vote_save(sender, instance, created, **kwargs):
+    """Keep Post.like_count/dislike_count in step with new or flipped votes"""
+    if created:
+        adjust_post_counters(instance.post_id, **{_vote_field(instance.is_like): 1})
+    elif instance._original_is_like is not None and instance._original_is_like != instance.is_like:
+        adjust_post_counters(instance.post_id, **{
+            _vote_field(instance.is_like): 1,
+            _vote_field(instance._original_is_like): -1,
+        })
+    instance._original_is_like = instance.is_like
+
+
+@receiver(post_delete, sender=Like)
+def update_counters_on_vote_delete(sender, instance, **kwargs):
+    """Decrement the matching vote counter when a Like is removed"""
+    adjust_post_counters(instance.post_id, **{_vote_field(instance.is_like): -1})
+
+
+@receiver(post_save, sender=Comment)
+def update_counters_on_comment_save(sender, instance, created, **kwargs):
+    """Increment Post.comment_count for new comments"""
+    if created:
+        adjust_post_counters(instance.post_id, comment_count=1)
+
+
+@receiver(post_delete, sender=Comment)
+def update_counters_on_comment_delete(sender, instance, **kwargs):
+    """Decrement Post.comment_count when a comment is removed"""
+    adjust_post_counters(instance.post_id, comment_count=-1)
+
+
+@receiver(post_save, sender=Follow)
+def update_counters_on_follow(sender, instance, created, **kwargs):
+    """Count a new follow on both ends"""
+    if created:
+        adjust_profile_counters(instance.following_id, followers_count=1)
+        adjust_profile_counters(instance.follower_id, following_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def update_counters_on_unfollow(sender, instance, **kwargs):
+    """Uncount a removed follow on both ends"""
+    adjust_profile_counters(instance.following_id, followers_count=-1)
+    adjust_profile_counters(instance.follower_id, following_count=-1)
+
+
+@receiver(post_save, sender=Post)
+def sync_ranking_featured_flag(sender, instance, created, **kwargs):
+    """Reflect editorial featuring in the ranking table without waiting for a refresh"""
+    if created:
+        if instance.featured:
+            # Unscored, so the next incremental refresh picks it up
+            PostRanking.objects.create(post=instance, featured=True, computed_at=None)
+        return
+    PostRanking.objects.filter(post_id=instance.pk).exclude(
+        featured=instance.featured
+    ).update(featured=instance.featured)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, **kwargs):
+    """Copy a new post into followers' timelines once it is committed"""
+    if created:
+        transaction.on_commit(lambda: fan_out_post(instance))
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline_on_follow(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: backfill_timeline(instance.follower_id, instance.following_id))
+
+
+@receiver(post_delete, sender=Follow)
+def trim_timeline_on_unfollow(sender, instance, **kwargs):
+    trim_timeline(instance.follower_id, instance.following_id)
+
+
+def bump_versions_on_commit(*names):
+    """Invalidate cached pages once the write is visible to other requests"""
+    transaction.on_commit(lambda: bump_version(*names))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, **kwargs):
+    bump_versions_on_commit(
+        feed_version_key(),
+        post_version_key(instance.pk),
+        profile_version_key(instance.author.username),
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Like)
+@receiver(post_delete, sender=Like)
+def invalidate_pages_for_post_activity(sender, instance, **kwargs):
+    # Feed cards show the vote and comment counters too
+    bump_versions_on_commit(feed_version_key(), post_version_key(instance.post_id))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_profile_pages_on_follow(sender, instance, **kwargs):
+    bump_versions_on_commit(
+        profile_version_key(instance.follower.username),
+        profile_version_key(instance.following.username),
+        # The follower's own suggestions exclude whoever they follow
+        suggestions_version_key(instance.follower_id),
+    )
+
+
+@receiver(post_save, sender=Profile)
+def invalidate_profile_page(sender, instance, **kwargs):
+    bump_versions_on_commit(profile_version_key(instance.user.username))
+
+
+@receiver(post_save, sender=Post)
+def build_post_image_derivatives(sender, instance, **kwargs):
+    if instance.image and not derivatives_are_current(instance.image, instance.image_derivatives):
+        schedule_derivatives(generate_post_derivatives, instance.pk)
+
+
+@receiver(post_save, sender=Profile)
+def build_profile_picture_derivatives(sender, instance, **kwargs):
+    picture = instance.profile_picture
+    if picture and 'default-avatar' not in picture.name and not derivatives_are_current(
+        picture, instance.picture_derivatives
+    ):
+        schedule_derivatives(generate_profile_derivatives, instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def delete_post_image_derivatives(sender, instance, **kwargs):
+    if instance.image_derivatives:
+        storage, derivatives = instance.image.storage, instance.image_derivatives
+        transaction.on_commit(lambda: delete_derivatives(storage, derivatives))
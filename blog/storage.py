@@ -0,0 +1,153 @@
+"""
+Memoizing wrapper around the media storage backend.
+
+Templates resolve `.url` for every image, video, audio file and avatar on
+a page, and Profile code checks `exists()`. With Cloudinary, url() builds
+the URL in Python on every call and exists() is an HTTP HEAD request.
+CachedURLStorage sits in front of the real backend (MEDIA_STORAGE_BACKEND)
+and keeps both answers in a per-process LRU with a TTL.
+
+Entries for a name are dropped when this process saves or deletes it.
+Other processes notice within MEDIA_URL_CACHE_TIMEOUT, which only matters
+for exists(): a URL is a pure function of the name. Saving never consults
+the cached exists(), so free names are always checked against the backend.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.files.storage import Storage
+from django.utils.deconstruct import deconstructible
+from django.utils.module_loading import import_string
+
+_MISSING = object()
+
+
+class LRUCache:
+    """A small thread-safe LRU mapping whose entries also expire after `timeout` seconds"""
+
+    def __init__(self, max_entries, timeout, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            expires_at, value = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self.clock() + self.timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+@deconstructible
+class CachedURLStorage(Storage):
+    """
+    Delegate to `backend` (a storage instance or dotted class path) and
+    memoize its url() and exists().
+    """
+
+    def __init__(self, backend=None, max_entries=None, timeout=None):
+        backend = backend or getattr(
+            settings, 'MEDIA_STORAGE_BACKEND', 'django.core.files.storage.FileSystemStorage'
+        )
+        self.backend = import_string(backend)() if isinstance(backend, str) else backend
+        if max_entries is None:
+            max_entries = getattr(settings, 'MEDIA_URL_CACHE_SIZE', 10000)
+        if timeout is None:
+            timeout = getattr(settings, 'MEDIA_URL_CACHE_TIMEOUT', 300)
+        self.memo = LRUCache(max_entries, timeout)
+
+    def _memoized(self, kind, name, compute):
+        key = (kind, name)
+        value = self.memo.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute(name)
+            self.memo.set(key, value)
+        return value
+
+    def invalidate(self, name):
+        self.memo.delete(('url', name), ('exists', name))
+
+    def url(self, name):
+        return self._memoized('url', name, self.backend.url)
+
+    def exists(self, name):
+        return self._memoized('exists', name, self.backend.exists)
+
+    def save(self, name, content, max_length=None):
+        # The backend picks a free name with its own, uncached exists()
+        name = self.backend.save(name, content, max_length=max_length)
+        self.invalidate(name)
+        return name
+
+    def delete(self, name):
+        self.backend.delete(name)
+        self.invalidate(name)
+
+    def open(self, name, mode='rb'):
+        return self.backend.open(name, mode)
+
+    def generate_filename(self, filename):
+        return self.backend.generate_filename(filename)
+
+    def get_valid_name(self, name):
+        return self.backend.get_valid_name(name)
+
+    def get_alternative_name(self, file_root, file_ext):
+        return self.backend.get_alternative_name(file_root, file_ext)
+
+    def get_available_name(self, name, max_length=None):
+        return self.backend.get_available_name(name, max_length=max_length)
+
+    def path(self, name):
+        return self.backend.path(name)
+
+    def size(self, name):
+        return self.backend.size(name)
+
+    def listdir(self, path):
+        return self.backend.listdir(path)
+
+    def get_accessed_time(self, name):
+        return self.backend.get_accessed_time(name)
+
+    def get_created_time(self, name):
+        return self.backend.get_created_time(name)
+
+    def get_modified_time(self, name):
+        return self.backend.get_modified_time(name)
+
+    def __getattr__(self, name):
+        # Backend-specific extras (e.g. Cloudinary's helpers)
+        if name in ('backend', 'memo'):
+            raise AttributeError(name)
+        return getattr(self.backend, name)
@@ -0,0 +1,153 @@
+"""
+"People you may know": friends-of-friends ranked by mutual follows.
+
+A candidate's score is the number of accounts the reader follows that also
+follow the candidate. Rather than one self-join of Follow against itself,
+which grows with (following x their following), the reader's most recent
+follows are used as seeds and their outgoing follows are counted in small
+GROUP BY batches. Accounts the reader already follows are excluded in SQL
+(NOT EXISTS on the follow index) and each batch returns only its
+BATCH_CANDIDATE_LIMIT best candidates, so neither the reader's following
+set nor a batch's full result is loaded into memory.
+
+Counting stops when SUGGESTIONS_TIME_BUDGET runs out, and on PostgreSQL
+each batch query also gets the remaining budget as its statement timeout
+(the caller's own timeout is restored when it runs inside a transaction),
+so one heavy batch can't overrun it. Someone following thousands of
+accounts gets suggestions from the seeds reached in time instead of a slow
+page.
+
+Results are cached per reader and invalidated when they follow or unfollow
+someone; changes further out in the graph are picked up when the cache
+entry expires.
+"""
+import logging
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import OperationalError, connection, transaction
+from django.db.models import Count, Exists, OuterRef
+
+from .models import Follow
+from .page_cache import get_versions, suggestions_version_key
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = 'blog:suggestions:'
+SEED_BATCH_SIZE = 50
+BATCH_CANDIDATE_LIMIT = 100
+
+
+def _count_batch(user_id, seeds, deadline):
+    """
+    The best candidates followed by `seeds` as [(candidate_id, mutual), ...],
+    or None if the deadline passed before the query finished.
+    """
+    already_followed = Follow.objects.filter(follower_id=user_id, following_id=OuterRef('following_id'))
+    rows = (
+        Follow.objects.filter(follower_id__in=seeds)
+        .exclude(following_id=user_id)
+        .filter(~Exists(already_followed))
+        .order_by()
+        .values('following_id')
+        .annotate(mutual=Count('id'))
+        .order_by('-mutual', 'following_id')
+        .values_list('following_id', 'mutual')[:BATCH_CANDIDATE_LIMIT]
+    )
+    if connection.vendor != 'postgresql':
+        return list(rows)
+    remaining_ms = int((deadline - time.monotonic()) * 1000)
+    if remaining_ms <= 0:
+        return None
+    previous = None
+    if connection.in_atomic_block:
+        # SET LOCAL lasts until the outer transaction ends, not just our
+        # savepoint, so put the caller's timeout back afterwards
+        with connection.cursor() as cursor:
+            cursor.execute('SHOW statement_timeout')
+            previous = cursor.fetchone()[0]
+    try:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL statement_timeout = %s', [remaining_ms])
+            return list(rows)
+    except OperationalError:
+        # Cancelled by the statement timeout
+        return None
+    finally:
+        if previous is not None:
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL statement_timeout = %s', [previous])
+
+
+def compute_suggestions(user_id, limit=5, seed_limit=None, time_budget=None):
+    """
+    Return [(candidate_id, mutual_count), ...] best first, and whether the
+    time budget cut the count short. Counts are summed over the batches'
+    top candidates, so a candidate outside a batch's top
+    BATCH_CANDIDATE_LIMIT can be undercounted.
+    """
+    seed_limit = seed_limit or getattr(settings, 'SUGGESTIONS_SEED_LIMIT', 500)
+    time_budget = time_budget if time_budget is not None else getattr(settings, 'SUGGESTIONS_TIME_BUDGET', 0.2)
+    deadline = time.monotonic() + time_budget
+
+    # Only the newest follows seed the search: they reflect current
+    # interests and bound the work
+    seeds = list(
+        Follow.objects.filter(follower_id=user_id)
+        .order_by('-created_at', '-id')
+        .values_list('following_id', flat=True)[:seed_limit]
+    )
+
+    mutuals = Counter()
+    truncated = False
+    for start in range(0, len(seeds), SEED_BATCH_SIZE):
+        rows = None
+        if time.monotonic() < deadline:
+            rows = _count_batch(user_id, seeds[start:start + SEED_BATCH_SIZE], deadline)
+        if rows is None:
+            truncated = True
+            break
+        for candidate_id, mutual in rows:
+            mutuals[candidate_id] += mutual
+
+    ranked = sorted(mutuals.items(), key=lambda item: (-item[1], item[0]))
+    # Keep a few spares for candidates dropped by the privacy filter later
+    return ranked[:limit * 3], truncated
+
+
+def _cache_key(user_id):
+    version = get_versions(suggestions_version_key(user_id))[suggestions_version_key(user_id)]
+    return f'{CACHE_KEY_PREFIX}{user_id}:{version}'
+
+
+def suggested_users(user, limit=5):
+    """
+    Users `user` may want to follow, each with a `mutual_count` attribute.
+    Private profiles are never suggested.
+    """
+    key = _cache_key(user.pk)
+    ranked = cache.get(key)
+    if ranked is None:
+        started = time.monotonic()
+        ranked, truncated = compute_suggestions(user.pk, limit=limit)
+        if truncated:
+            logger.info(
+                f"Suggestions for user {user.pk} hit the time budget after "
+                f"{time.monotonic() - started:.3f}s; using partial counts"
+            )
+        cache.set(key, ranked, getattr(settings, 'SUGGESTIONS_CACHE_TIMEOUT', 3600))
+
+    if not ranked:
+        return []
+    mutual_counts = dict(ranked)
+    users = get_user_model().objects.filter(pk__in=mutual_counts).exclude(
+        profile__privacy_setting='private'
+    ).select_related('profile')
+    users = sorted(users, key=lambda u: (-mutual_counts[u.pk], u.pk))[:limit]
+    for suggested in users:
+        suggested.mutual_count = mutual_counts[suggested.pk]
+    return users
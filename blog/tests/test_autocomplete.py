@@ -0,0 +1,115 @@
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.test import TestCase
+
+from blog.autocomplete import CHANGE_KEY_PREFIX, VERSION_KEY, PrefixIndex, record_user_change
+
+
+class AutocompleteTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def user(self, username, first_name='', last_name='', privacy='public'):
+        user = User.objects.create_user(username, password='pw', first_name=first_name, last_name=last_name)
+        if privacy != 'public':
+            user.profile.privacy_setting = privacy
+            user.profile.save()
+        return user
+
+    def loaded_index(self):
+        index = PrefixIndex(refresh_interval=0)
+        index.ensure_fresh()
+        return index
+
+    def usernames(self, index, prefix, viewer=None):
+        return [username for _, username, _ in index.lookup(prefix, viewer or AnonymousUser())]
+
+
+class PrefixMatchTests(AutocompleteTestCase):
+    def test_username_prefixes_match_first(self):
+        self.user('annabel')
+        self.user('zed', first_name='Anna', last_name='Smith')
+        self.user('bob')
+        self.assertEqual(self.usernames(self.loaded_index(), 'Ann'), ['annabel', 'zed'])
+
+    def test_any_word_of_the_display_name_matches(self):
+        self.user('zed', first_name='Anna', last_name='Smith')
+        index = self.loaded_index()
+        self.assertEqual(self.usernames(index, 'smi'), ['zed'])
+        self.assertEqual(self.usernames(index, 'anna sm'), ['zed'])
+        self.assertEqual(self.usernames(index, 'x'), [])
+
+    def test_limit(self):
+        for number in range(5):
+            self.user(f'user{number}')
+        self.assertEqual(len(self.loaded_index().lookup('user', AnonymousUser(), limit=3)), 3)
+
+
+class PrivacyTests(AutocompleteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user('pubby')
+        self.user('regina', privacy='registered')
+        self.private = self.user('prisha', privacy='private')
+        self.member = self.user('member')
+        self.index = self.loaded_index()
+
+    def test_anonymous_visitors_only_see_public_profiles(self):
+        self.assertEqual(self.usernames(self.index, 'p'), ['pubby'])
+        self.assertEqual(self.usernames(self.index, 'r'), [])
+
+    def test_members_see_registered_profiles(self):
+        self.assertEqual(self.usernames(self.index, 'r', self.member), ['regina'])
+        self.assertEqual(self.usernames(self.index, 'p', self.member), ['pubby'])
+
+    def test_private_profiles_are_only_found_by_their_owner(self):
+        self.assertEqual(self.usernames(self.index, 'p', self.private), ['prisha', 'pubby'])
+
+
+class ChangeLogTests(AutocompleteTestCase):
+    def test_other_workers_replay_logged_changes(self):
+        user = self.user('walter')
+        other_worker = self.loaded_index()
+        self.assertEqual(self.usernames(other_worker, 'wal'), ['walter'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user.profile.privacy_setting = 'private'
+            user.profile.save()
+        self.assertEqual(self.usernames(other_worker, 'wal'), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user.username = 'wanda'
+            user.save()
+        self.assertEqual(self.usernames(other_worker, 'wan', user), ['wanda'])
+        self.assertEqual(self.usernames(other_worker, 'wal', user), [])
+
+    def test_missing_log_entries_force_a_rebuild(self):
+        self.user('walter')
+        other_worker = self.loaded_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            record_user_change(12345)
+        cache.delete(f'{CHANGE_KEY_PREFIX}{cache.get(VERSION_KEY)}')
+        with mock.patch.object(other_worker, '_start_background_reload') as rebuild:
+            other_worker.ensure_fresh()
+        rebuild.assert_called_once_with()
+
+    def test_profile_saves_that_keep_the_privacy_setting_log_nothing(self):
+        user = self.user('walter')
+        profile = User.objects.get(pk=user.pk).profile
+        version = cache.get(VERSION_KEY, 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.bio = 'New bio'
+            profile.save()
+        self.assertEqual(cache.get(VERSION_KEY, 0), version)
+
+    def test_privacy_changes_are_logged(self):
+        user = self.user('walter')
+        profile = User.objects.get(pk=user.pk).profile
+        version = cache.get(VERSION_KEY, 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.privacy_setting = 'registered'
+            profile.save()
+        self.assertEqual(cache.get(VERSION_KEY, 0), version + 1)
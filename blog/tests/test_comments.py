@@ -0,0 +1,35 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from blog.models import Comment, Post
+
+
+class AddCommentTests(TestCase):
+    """The AJAX comment endpoint returns the rendered comment and the new count"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader', password='pw')
+        cls.post = Post.objects.create(title='Discussed', content='Body', author=cls.user)
+
+    def test_comment_is_created_and_rendered(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('add_comment', args=[self.post.pk]), {'content': 'Nice post'})
+        data = response.json()
+        self.assertTrue(data['success'])
+        self.assertEqual(data['comment_count'], 1)
+        self.assertIn('Nice post', data['html'])
+        self.assertEqual(Comment.objects.get().author, self.user)
+
+    def test_invalid_comment_returns_errors(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('add_comment', args=[self.post.pk]), {'content': ''})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('content', response.json()['errors'])
+        self.assertFalse(Comment.objects.exists())
+
+    def test_login_required(self):
+        response = self.client.post(reverse('add_comment', args=[self.post.pk]), {'content': 'Hi'})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Comment.objects.exists())
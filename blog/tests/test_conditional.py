@@ -0,0 +1,111 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from blog.models import Follow, Like, Post
+from blog.rankings import refresh_rankings
+from blog.view_counter import view_counter
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    PAGE_CACHE_TIMEOUT=0,
+)
+class ConditionalGetTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        # Views are buffered; keep them out of the counters these tests watch
+        patcher = mock.patch.object(view_counter, 'record')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.author = User.objects.create_user('author', password='pw')
+        self.reader = User.objects.create_user('reader', password='pw')
+        self.post = Post.objects.create(author=self.author, title='Post', content='Body')
+
+    def etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def revalidate(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code
+
+
+class ETagTests(ConditionalGetTestCase):
+    def test_matching_etag_is_not_modified(self):
+        urls = [reverse('home'), reverse('post_detail', args=[self.post.pk]), reverse('profile_view', args=['author'])]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.revalidate(url, self.etag(url)), 304)
+
+    def test_vote_changes_the_post_and_feed(self):
+        urls = [reverse('home'), reverse('post_detail', args=[self.post.pk])]
+        etags = [self.etag(url) for url in urls]
+        Like.objects.create(user=self.reader, post=self.post, is_like=True)
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                self.assertEqual(self.revalidate(url, etag), 200)
+
+    def test_flushed_views_change_the_post(self):
+        url = reverse('post_detail', args=[self.post.pk])
+        etag = self.etag(url)
+        Post.objects.filter(pk=self.post.pk).update(view_count=5)
+        self.assertEqual(self.revalidate(url, etag), 200)
+
+    def test_follow_changes_the_profile(self):
+        url = reverse('profile_view', args=['author'])
+        etag = self.etag(url)
+        Follow.objects.create(follower=self.reader, following=self.author)
+        self.assertEqual(self.revalidate(url, etag), 200)
+
+    def test_featured_sidebar_changes_the_feed(self):
+        url = reverse('home')
+        etag = self.etag(url)
+        Post.objects.filter(pk=self.post.pk).update(view_count=50)
+        refresh_rankings(full=True)
+        self.assertEqual(self.revalidate(url, etag), 200)
+
+    def test_each_viewer_gets_their_own_etag(self):
+        url = reverse('profile_view', args=['author'])
+        anonymous_etag = self.etag(url)
+        self.client.login(username='reader', password='pw')
+        self.assertNotEqual(self.etag(url), anonymous_etag)
+        self.assertEqual(self.revalidate(url, anonymous_etag), 200)
+
+    def test_csrf_cookie_does_not_change_the_etag(self):
+        url = reverse('home')
+        etag = self.etag(url)
+        self.client.cookies['csrftoken'] = 'a' * 32
+        self.assertEqual(self.revalidate(url, etag), 304)
+
+
+class LastModifiedTests(ConditionalGetTestCase):
+    def last_modified(self, url):
+        return self.client.get(url)['Last-Modified']
+
+    def test_unchanged_post_is_not_modified(self):
+        url = reverse('post_detail', args=[self.post.pk])
+        since = self.last_modified(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=since).status_code, 304)
+
+    def test_counter_activity_counts_as_a_modification(self):
+        url = reverse('post_detail', args=[self.post.pk])
+        since = self.last_modified(url)
+        later = timezone.now() + timedelta(minutes=5)
+        Post.objects.filter(pk=self.post.pk).update(like_count=1, activity_at=later)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Last-Modified'], http_date(later.timestamp()))
+
+    def test_counter_activity_modifies_the_profile(self):
+        url = reverse('profile_view', args=['author'])
+        since = self.last_modified(url)
+        Post.objects.filter(pk=self.post.pk).update(activity_at=timezone.now() + timedelta(minutes=5))
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=since).status_code, 200)
@@ -0,0 +1,80 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from blog.models import Comment, Like, Post
+
+
+class PostCounterTests(TestCase):
+    """The denormalized counters on Post follow Like and Comment writes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', password='pw')
+        cls.voters = [User.objects.create_user(f'voter{i}', password='pw') for i in range(3)]
+
+    def setUp(self):
+        self.post = Post.objects.create(title='Counted', content='Body', author=self.author)
+
+    def counters(self):
+        return Post.objects.filter(pk=self.post.pk).values_list(
+            'like_count', 'dislike_count', 'comment_count'
+        ).get()
+
+    def test_votes_are_counted(self):
+        Like.objects.create(user=self.voters[0], post=self.post, is_like=True)
+        Like.objects.create(user=self.voters[1], post=self.post, is_like=True)
+        Like.objects.create(user=self.voters[2], post=self.post, is_like=False)
+        self.assertEqual(self.counters(), (2, 1, 0))
+
+    def test_flipped_vote_moves_between_counters(self):
+        like = Like.objects.create(user=self.voters[0], post=self.post, is_like=True)
+        like.is_like = False
+        like.save()
+        self.assertEqual(self.counters(), (0, 1, 0))
+
+    def test_resaving_an_unchanged_vote_counts_nothing(self):
+        like = Like.objects.create(user=self.voters[0], post=self.post, is_like=True)
+        like.save()
+        Like.objects.get(pk=like.pk).save()
+        self.assertEqual(self.counters(), (1, 0, 0))
+
+    def test_deleted_vote_is_uncounted(self):
+        like = Like.objects.create(user=self.voters[0], post=self.post, is_like=False)
+        like.delete()
+        self.assertEqual(self.counters(), (0, 0, 0))
+
+    def test_comments_are_counted(self):
+        first = Comment.objects.create(post=self.post, author=self.voters[0], content='One')
+        Comment.objects.create(post=self.post, author=self.voters[1], content='Two')
+        first.delete()
+        self.assertEqual(self.counters(), (0, 0, 1))
+
+    def test_decrement_never_goes_below_zero(self):
+        like = Like.objects.create(user=self.voters[0], post=self.post, is_like=True)
+        Post.objects.filter(pk=self.post.pk).update(like_count=0)
+        like.delete()
+        self.assertEqual(self.counters(), (0, 0, 0))
+
+    def test_stale_copy_does_not_overwrite_counters(self):
+        stale = Post.objects.get(pk=self.post.pk)
+        Like.objects.create(user=self.voters[0], post=self.post, is_like=True)
+        Comment.objects.create(post=self.post, author=self.voters[1], content='Hi')
+        stale.title = 'Edited'
+        stale.save()
+        self.assertEqual(self.counters(), (1, 0, 1))
+        self.assertEqual(Post.objects.get(pk=self.post.pk).title, 'Edited')
+
+    def test_counter_writes_record_activity(self):
+        self.assertIsNone(Post.objects.get(pk=self.post.pk).activity_at)
+        Comment.objects.create(post=self.post, author=self.voters[0], content='Hi')
+        self.assertIsNotNone(Post.objects.get(pk=self.post.pk).activity_at)
+
+    def test_rebuild_command_repairs_drift(self):
+        Like.objects.create(user=self.voters[0], post=self.post, is_like=True)
+        Comment.objects.create(post=self.post, author=self.voters[1], content='Hi')
+        Post.objects.filter(pk=self.post.pk).update(like_count=7, dislike_count=3, comment_count=0)
+        call_command('rebuild_post_counters', stdout=StringIO())
+        self.assertEqual(self.counters(), (1, 0, 1))
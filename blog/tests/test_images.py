@@ -0,0 +1,144 @@
+import re
+from io import BytesIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from blog.images import (
+    AVATAR_SIZES, DERIVATIVE_PREFIX, POST_IMAGE_SIZES, build_derivatives, responsive_image,
+)
+from blog.management.commands.benchmark_storage_calls import png_bytes
+from blog.models import Post, Profile
+from blog.tests.test_profile_changes import RecordingStorage
+
+CONTENT_ADDRESSED = re.compile(r'\.[0-9a-f]{12}\.(webp|jpg|png)$')
+
+
+def rgba_png_bytes(size):
+    buffer = BytesIO()
+    Image.new('RGBA', size, (0, 0, 0, 0)).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class BuildDerivativesTests(TestCase):
+    def setUp(self):
+        self.storage = RecordingStorage()
+
+    def source(self, data, name='blog_images/photo.png'):
+        # Replace rather than rename, as a re-upload under the same name would
+        self.storage.delete(name)
+        name = self.storage.save(name, ContentFile(data))
+        field_file = mock.Mock(storage=self.storage)
+        field_file.name = name
+        field_file.open = lambda mode: self.storage.open(name, mode)
+        return field_file
+
+    def test_every_width_is_written_as_webp_and_fallback(self):
+        derivatives = build_derivatives(self.source(png_bytes((2000, 1000))), POST_IMAGE_SIZES)
+        self.assertEqual(derivatives['source'], 'blog_images/photo.png')
+        self.assertEqual([variant['width'] for variant in derivatives['card']], [480, 960])
+        card = derivatives['card'][0]
+        self.assertEqual(card['height'], 240)
+        self.assertTrue(card['webp'].endswith('.webp'))
+        self.assertTrue(card['fallback'].endswith('.jpg'))
+        for name in (card['webp'], card['fallback']):
+            self.assertTrue(self.storage.exists(name))
+
+    def test_names_are_content_addressed_under_the_derivative_prefix(self):
+        derivatives = build_derivatives(self.source(png_bytes((1000, 500))), POST_IMAGE_SIZES)
+        names = [variant[kind] for variant in derivatives['card'] for kind in ('webp', 'fallback')]
+        for name in names:
+            self.assertTrue(name.startswith(f'{DERIVATIVE_PREFIX}blog_images/photo-card-'))
+            self.assertRegex(name, CONTENT_ADDRESSED)
+
+        # A different upload under the same name gets different names
+        other = build_derivatives(self.source(png_bytes((1000, 400))), POST_IMAGE_SIZES)
+        self.assertEqual(other['source'], derivatives['source'])
+        self.assertNotEqual(other['card'][0]['webp'], derivatives['card'][0]['webp'])
+
+    def test_small_sources_are_not_upscaled(self):
+        derivatives = build_derivatives(self.source(png_bytes((300, 200))), POST_IMAGE_SIZES)
+        self.assertEqual([variant['width'] for variant in derivatives['card']], [300])
+
+    def test_transparency_keeps_a_png_fallback(self):
+        derivatives = build_derivatives(self.source(rgba_png_bytes((600, 600))), POST_IMAGE_SIZES)
+        self.assertTrue(derivatives['card'][0]['fallback'].endswith('.png'))
+
+    def test_avatars_are_square(self):
+        derivatives = build_derivatives(self.source(png_bytes((400, 300))), AVATAR_SIZES, square=True)
+        self.assertEqual(
+            [(variant['width'], variant['height']) for variant in derivatives['avatar']],
+            [(48, 48), (96, 96), (200, 200)],
+        )
+
+
+@override_settings(IMAGE_DERIVATIVE_WORKERS=0)
+class DerivativeLifecycleTests(TestCase):
+    def setUp(self):
+        self.storage = RecordingStorage()
+        for model, field in ((Post, 'image'), (Profile, 'profile_picture')):
+            patcher = mock.patch.object(model._meta.get_field(field), 'storage', self.storage)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user('owner', password='pw')
+
+    def derivative_names(self, derivatives):
+        return [
+            variant[kind]
+            for key, variants in derivatives.items() if key != 'source'
+            for variant in variants for kind in ('webp', 'fallback')
+        ]
+
+    def set_picture(self, name):
+        profile = Profile.objects.get(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.profile_picture = SimpleUploadedFile(name, png_bytes((300, 300)))
+            profile.save()
+        return Profile.objects.get(pk=profile.pk)
+
+    def test_saved_post_image_gets_derivatives(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(
+                author=self.user, title='Photo', content='Body',
+                image=SimpleUploadedFile('photo.png', png_bytes((1000, 500))),
+            )
+        post.refresh_from_db()
+        self.assertEqual(post.image_derivatives['source'], post.image.name)
+        card = responsive_image(post.image, post.image_derivatives, 'card')
+        self.assertIn('480w', card.webp_srcset)
+
+    def test_replacing_a_picture_deletes_the_old_derivatives(self):
+        old = self.set_picture('first.png')
+        old_names = self.derivative_names(old.picture_derivatives)
+        self.assertTrue(old_names)
+
+        new = self.set_picture('second.png')
+        self.assertEqual(new.picture_derivatives['source'], new.profile_picture.name)
+        for name in old_names:
+            self.assertFalse(self.storage.exists(name), name)
+        for name in self.derivative_names(new.picture_derivatives):
+            self.assertTrue(self.storage.exists(name), name)
+
+    def test_stale_derivatives_are_not_used(self):
+        old = self.set_picture('first.png')
+        old.profile_picture.name = 'profile_pics/other.png'
+        self.assertEqual(
+            responsive_image(old.profile_picture, old.picture_derivatives, 'avatar').srcset, ''
+        )
+
+    def test_deleting_a_post_deletes_its_derivatives(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(
+                author=self.user, title='Photo', content='Body',
+                image=SimpleUploadedFile('photo.png', png_bytes((600, 400))),
+            )
+        post.refresh_from_db()
+        names = self.derivative_names(post.image_derivatives)
+        with self.captureOnCommitCallbacks(execute=True):
+            post.delete()
+        for name in names:
+            self.assertFalse(self.storage.exists(name), name)
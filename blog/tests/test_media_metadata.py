@@ -0,0 +1,98 @@
+import shutil
+import struct
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from blog.models import Post
+
+
+def wav_bytes(seconds=1, byte_rate=8000):
+    data = b'\x00' * (seconds * byte_rate)
+    fmt = struct.pack('<HHIIHH', 1, 1, byte_rate, byte_rate, 1, 8)
+    return (
+        b'RIFF' + struct.pack('<I', 36 + len(data)) + b'WAVE'
+        + b'fmt ' + struct.pack('<I', len(fmt)) + fmt
+        + b'data' + struct.pack('<I', len(data)) + data
+    )
+
+
+class PostMediaMetadataTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.author = User.objects.create_user('author', password='pw')
+        self.storage = Post._meta.get_field('audio').storage
+
+    def create_post(self):
+        return Post.objects.create(
+            author=self.author, title='Song', content='Listen',
+            audio=SimpleUploadedFile('song.wav', wav_bytes(seconds=2)),
+        )
+
+    def count_storage_calls(self):
+        opened = mock.patch.object(self.storage, 'open', wraps=self.storage.open)
+        saved = mock.patch.object(self.storage, 'save', wraps=self.storage.save)
+        self.addCleanup(opened.stop)
+        self.addCleanup(saved.stop)
+        return opened.start(), saved.start()
+
+    def test_upload_fills_in_metadata(self):
+        post = Post.objects.get(pk=self.create_post().pk)
+        self.assertEqual(post.media_type, 'audio')
+        self.assertEqual(post.media_name, post.audio.name)
+        self.assertEqual(post.media_mime_type, 'audio/wav')
+        self.assertEqual(post.media_duration, 2)
+
+    def test_saves_that_leave_the_media_alone_touch_no_storage(self):
+        post = Post.objects.get(pk=self.create_post().pk)
+        opened, saved = self.count_storage_calls()
+        post.title = 'Renamed'
+        post.save()
+        post.featured = True
+        post.save(update_fields=['featured'])
+        self.assertEqual(opened.call_count, 0)
+        self.assertEqual(saved.call_count, 0)
+
+    def test_rows_without_metadata_are_left_to_the_backfill(self):
+        pk = self.create_post().pk
+        Post.objects.filter(pk=pk).update(media_type=None, media_name=None)
+        post = Post.objects.get(pk=pk)
+        opened, saved = self.count_storage_calls()
+        post.title = 'Renamed'
+        post.save()
+        self.assertEqual(opened.call_count, 0)
+        self.assertIsNone(post.media_name)
+
+    def test_saving_a_new_upload_twice_stores_it_once(self):
+        post = self.create_post()
+        opened, saved = self.count_storage_calls()
+        post.title = 'Renamed'
+        post.save()
+        self.assertEqual(opened.call_count, 0)
+        self.assertEqual(saved.call_count, 0)
+
+    def test_file_attached_by_name_is_read_once(self):
+        post = Post.objects.get(pk=self.create_post().pk)
+        name = self.storage.save('post_audio/other.wav', ContentFile(wav_bytes(seconds=3)))
+        opened, saved = self.count_storage_calls()
+        post.audio.name = name
+        post.save()
+        self.assertEqual(opened.call_count, 1)
+        self.assertEqual(post.media_name, name)
+        self.assertEqual(post.media_duration, 3)
+
+    def test_removing_the_media_clears_the_metadata(self):
+        post = Post.objects.get(pk=self.create_post().pk)
+        post.audio = None
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.media_type, 'text')
+        self.assertIsNone(post.media_duration)
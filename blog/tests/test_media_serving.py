@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+
+class MediaServingTestCase(SimpleTestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            MEDIA_SENDFILE='',
+            STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def write(self, name, data=b'0123456789'):
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as media_file:
+            media_file.write(data)
+
+    def get(self, name, **headers):
+        return self.client.get(reverse('serve_media', args=[name]), **headers)
+
+
+class RangeTests(MediaServingTestCase):
+    def test_whole_file(self):
+        self.write('post_videos/clip.mp4')
+        response = self.get('post_videos/clip.mp4')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_partial_content(self):
+        self.write('post_videos/clip.mp4')
+        response = self.get('post_videos/clip.mp4', HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+
+    def test_suffix_and_open_ended_ranges(self):
+        self.write('post_videos/clip.mp4')
+        self.assertEqual(self.get('post_videos/clip.mp4', HTTP_RANGE='bytes=-3')['Content-Range'], 'bytes 7-9/10')
+        self.assertEqual(self.get('post_videos/clip.mp4', HTTP_RANGE='bytes=8-')['Content-Range'], 'bytes 8-9/10')
+
+    def test_unsatisfiable_range(self):
+        self.write('post_videos/clip.mp4')
+        response = self.get('post_videos/clip.mp4', HTTP_RANGE='bytes=10-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+    def test_stale_if_range_gets_the_whole_file(self):
+        self.write('post_videos/clip.mp4')
+        response = self.get('post_videos/clip.mp4', HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_revalidation(self):
+        self.write('post_videos/clip.mp4')
+        etag = self.get('post_videos/clip.mp4')['ETag']
+        self.assertEqual(self.get('post_videos/clip.mp4', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_outside_media_root_is_not_found(self):
+        self.assertEqual(self.get('../etc/passwd').status_code, 404)
+
+
+class CachingTests(MediaServingTestCase):
+    def test_derivatives_are_immutable(self):
+        self.write('derivatives/blog_images/cat-card-480.0123456789ab.webp')
+        response = self.get('derivatives/blog_images/cat-card-480.0123456789ab.webp')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_uploads_with_hash_like_names_are_not_immutable(self):
+        self.write('post_videos/x.0123456789ab.mp4')
+        response = self.get('post_videos/x.0123456789ab.mp4')
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+    def test_dot_segments_cannot_borrow_the_derivative_rule(self):
+        self.write('post_videos/x.0123456789ab.mp4')
+        response = self.get('derivatives/../post_videos/x.0123456789ab.mp4')
+        self.assertNotIn('immutable', response.get('Cache-Control', ''))
+
+
+class SendfileTests(MediaServingTestCase):
+    def test_x_accel_redirect_is_percent_encoded(self):
+        self.write('post_videos/café.mp4')
+        with override_settings(MEDIA_SENDFILE='x-accel-redirect', MEDIA_SENDFILE_PREFIX='/protected-media/'):
+            response = self.get('post_videos/café.mp4')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/post_videos/caf%C3%A9.mp4')
+
+    def test_x_sendfile_is_percent_encoded(self):
+        self.write('post_videos/café.mp4')
+        with override_settings(MEDIA_SENDFILE='x-sendfile'):
+            response = self.get('post_videos/café.mp4')
+        self.assertTrue(response['X-Sendfile'].endswith('/post_videos/caf%C3%A9.mp4'))
+        self.assertTrue(response['X-Sendfile'].isascii())
@@ -0,0 +1,115 @@
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.messages import add_message, INFO
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.contrib.sessions.backends.cache import SessionStore
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from blog.models import Comment, Follow, Like, Post
+from blog.page_cache import feed_version_key, get_cached_page, get_versions, store_cached_page
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    PAGE_CACHE_TIMEOUT=60,
+    VIEW_COUNT_FLUSH_INTERVAL=0,
+)
+class PageCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.author = User.objects.create_user('author', password='pw')
+        self.reader = User.objects.create_user('reader', password='pw')
+        self.post = Post.objects.create(author=self.author, title='Post', content='Body')
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.get('X-Page-Cache')
+
+    def assertRebuiltAfter(self, url, write):
+        self.get(url)
+        self.assertEqual(self.get(url), 'hit')
+        with self.captureOnCommitCallbacks(execute=True):
+            write()
+        self.assertEqual(self.get(url), 'miss')
+        self.assertEqual(self.get(url), 'hit')
+
+
+class VersionedPageTests(PageCacheTestCase):
+    def test_second_anonymous_get_is_served_from_the_cache(self):
+        self.assertEqual(self.get(reverse('home')), 'miss')
+        self.assertEqual(self.get(reverse('home')), 'hit')
+
+    def test_signed_in_readers_are_not_served_from_the_cache(self):
+        self.get(reverse('home'))
+        self.client.login(username='reader', password='pw')
+        self.assertIsNone(self.get(reverse('home')))
+
+    def test_like_rebuilds_the_feed(self):
+        self.assertRebuiltAfter(
+            reverse('home'), lambda: Like.objects.create(user=self.reader, post=self.post, is_like=True)
+        )
+
+    def test_comment_rebuilds_the_feed(self):
+        self.assertRebuiltAfter(
+            reverse('home'), lambda: Comment.objects.create(author=self.reader, post=self.post, content='Hi')
+        )
+
+    def test_follow_rebuilds_the_profile(self):
+        self.assertRebuiltAfter(
+            reverse('profile_view', args=['author']),
+            lambda: Follow.objects.create(follower=self.reader, following=self.author),
+        )
+
+    def test_writes_elsewhere_keep_the_cached_profile(self):
+        url = reverse('profile_view', args=['author'])
+        self.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Like.objects.create(user=self.reader, post=self.post, is_like=True)
+        self.assertEqual(self.get(url), 'hit')
+
+
+class StoreCachedPageTests(PageCacheTestCase):
+    def request(self):
+        request = RequestFactory().get('/somewhere/')
+        request.user = AnonymousUser()
+        request.session = SessionStore()
+        request._messages = FallbackStorage(request)
+        return request
+
+    def test_plain_page_is_stored(self):
+        store_cached_page(self.request(), [feed_version_key()], HttpResponse('page'))
+        self.assertIsNotNone(get_cached_page(self.request(), [feed_version_key()]))
+
+    def test_page_that_rendered_a_csrf_token_is_not_stored(self):
+        request = self.request()
+        request.META['CSRF_COOKIE_NEEDS_UPDATE'] = True
+        store_cached_page(request, [feed_version_key()], HttpResponse('page'))
+        self.assertIsNone(get_cached_page(self.request(), [feed_version_key()]))
+
+    def test_page_that_sets_a_cookie_is_not_stored(self):
+        response = HttpResponse('page')
+        response.set_cookie('seen', '1')
+        store_cached_page(self.request(), [feed_version_key()], response)
+        self.assertIsNone(get_cached_page(self.request(), [feed_version_key()]))
+
+    def test_page_with_messages_is_neither_stored_nor_served(self):
+        store_cached_page(self.request(), [feed_version_key()], HttpResponse('page'))
+        request = self.request()
+        add_message(request, INFO, 'Welcome back')
+        self.assertIsNone(get_cached_page(request, [feed_version_key()]))
+
+        cache.clear()
+        store_cached_page(request, [feed_version_key()], HttpResponse('page with a message'))
+        self.assertIsNone(get_cached_page(self.request(), [feed_version_key()]))
+
+    def test_bumped_version_misses(self):
+        store_cached_page(self.request(), [feed_version_key()], HttpResponse('page'))
+        version = get_versions(feed_version_key())[feed_version_key()]
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(author=self.author, title='New', content='Body')
+        self.assertEqual(get_versions(feed_version_key())[feed_version_key()], version + 1)
+        self.assertIsNone(get_cached_page(self.request(), [feed_version_key()]))
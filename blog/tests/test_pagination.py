@@ -0,0 +1,98 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from blog.models import Post
+from blog.pagination import InvalidCursor, KeysetPaginator, decode_cursor, encode_cursor
+
+
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user('author', password='pw')
+        now = timezone.now()
+        # Pairs of posts share a timestamp so the id tiebreaker matters
+        cls.posts = [
+            Post.objects.create(
+                title=f'Post {i}', content='Body', author=author, created_at=now - timedelta(minutes=i // 2)
+            )
+            for i in range(11)
+        ]
+        cls.newest_first = sorted(cls.posts, key=lambda post: (post.created_at, post.pk), reverse=True)
+
+    def paginator(self):
+        return KeysetPaginator(Post.objects.all(), 4)
+
+    def test_cursor_round_trip(self):
+        post = self.posts[0]
+        self.assertEqual(
+            decode_cursor(encode_cursor(post.created_at, post.pk, 'next')), ('next', post.created_at, post.pk)
+        )
+
+    def test_invalid_cursor_raises(self):
+        for token in ('garbage', encode_cursor(timezone.now(), 1, 'next')[:-3]):
+            with self.subTest(token=token):
+                with self.assertRaises(InvalidCursor):
+                    self.paginator().page(token)
+
+    def test_walking_older_pages_visits_every_post_once(self):
+        seen = []
+        page = self.paginator().page()
+        self.assertFalse(page.has_previous())
+        while True:
+            seen.extend(page)
+            if not page.has_next():
+                break
+            page = self.paginator().page(page.next_cursor)
+        self.assertEqual([post.pk for post in seen], [post.pk for post in self.newest_first])
+
+    def test_previous_cursor_returns_to_the_newer_page(self):
+        first = self.paginator().page()
+        second = self.paginator().page(first.next_cursor)
+        self.assertTrue(second.has_previous())
+        back = self.paginator().page(second.previous_cursor)
+        self.assertEqual([post.pk for post in back], [post.pk for post in first])
+        self.assertFalse(back.has_previous())
+
+    def test_page_queries_use_no_offset_or_count(self):
+        first = self.paginator().page()
+        with self.assertNumQueries(1) as context:
+            self.paginator().page(first.next_cursor)
+        sql = context.captured_queries[0]['sql'].upper()
+        self.assertNotIn('OFFSET', sql)
+        self.assertNotIn('COUNT(', sql)
+
+
+# The manifest storage needs collectstatic; pages aren't cached between tests
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    PAGE_CACHE_TIMEOUT=0,
+)
+class HomeFeedPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user('author', password='pw')
+        now = timezone.now()
+        for i in range(7):
+            Post.objects.create(title=f'Post {i}', content='Body', author=author, created_at=now - timedelta(hours=i))
+
+    def test_cursor_pages(self):
+        first = self.client.get(reverse('home'))
+        self.assertEqual([post.title for post in first.context['posts']], [f'Post {i}' for i in range(5)])
+        self.assertTrue(first.context['cursor_mode'])
+        second = self.client.get(reverse('home'), {'cursor': first.context['page_obj'].next_cursor})
+        self.assertEqual([post.title for post in second.context['posts']], ['Post 5', 'Post 6'])
+        self.assertFalse(second.context['page_obj'].has_next())
+
+    def test_bad_cursor_falls_back_to_the_first_page(self):
+        response = self.client.get(reverse('home'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['posts'][0].title, 'Post 0')
+
+    def test_legacy_page_numbers_still_work(self):
+        response = self.client.get(reverse('home'), {'page': 2})
+        self.assertFalse(response.context['cursor_mode'])
+        self.assertEqual([post.title for post in response.context['posts']], ['Post 5', 'Post 6'])
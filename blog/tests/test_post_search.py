@@ -0,0 +1,112 @@
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from blog.models import Post
+from blog.pagination import InvalidCursor
+from blog.search import search_posts
+
+
+def titles(page):
+    return [post.title for post in page.object_list]
+
+
+class PostSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', password='pw')
+
+    def post(self, title, content='Nothing to see here'):
+        return Post.objects.create(author=self.author, title=title, content=content)
+
+    def test_new_posts_are_found(self):
+        self.post('Gardening notes', 'Tomatoes need sun')
+        self.post('Cooking notes', 'Pasta needs salt')
+        self.assertEqual(titles(search_posts('tomatoes')), ['Gardening notes'])
+
+    def test_edits_are_reflected(self):
+        post = self.post('Gardening notes', 'Tomatoes need sun')
+        post.content = 'Peppers need sun'
+        post.save()
+        self.assertEqual(titles(search_posts('tomatoes')), [])
+        self.assertEqual(titles(search_posts('peppers')), ['Gardening notes'])
+
+    def test_deleted_posts_are_not_found(self):
+        self.post('Gardening notes', 'Tomatoes need sun').delete()
+        self.assertEqual(titles(search_posts('tomatoes')), [])
+
+    def test_every_word_must_match(self):
+        self.post('Sunny garden', 'Tomatoes grow fast')
+        self.post('Shady garden', 'Ferns grow slowly')
+        self.assertEqual(titles(search_posts('garden tomatoes')), ['Sunny garden'])
+
+    def test_title_matches_rank_first(self):
+        self.post('Notes', 'A word about tomatoes')
+        self.post('Tomatoes', 'A word about notes')
+        self.assertEqual(titles(search_posts('tomatoes')), ['Tomatoes', 'Notes'])
+
+    def test_quoted_phrase_matches_words_in_order(self):
+        self.post('In order', 'The quick brown fox')
+        self.post('Apart', 'Brown bread, quick breakfast')
+        self.assertEqual(titles(search_posts('"quick brown"')), ['In order'])
+        self.assertEqual(sorted(titles(search_posts('quick brown'))), ['Apart', 'In order'])
+
+    def test_query_operators_are_not_interpreted(self):
+        self.post('Plain', 'Tomatoes need sun')
+        self.assertEqual(titles(search_posts('tomatoes OR NOT "')), [])
+        self.assertEqual(titles(search_posts('tomatoes*')), ['Plain'])
+
+    def test_queries_without_words_return_nothing(self):
+        self.post('Plain', 'Tomatoes need sun')
+        with self.assertNumQueries(0):
+            page = search_posts(' ?! ')
+        self.assertEqual(page.object_list, [])
+        self.assertFalse(page.has_next())
+
+    def test_bad_cursor_is_rejected(self):
+        with self.assertRaises(InvalidCursor):
+            search_posts('tomatoes', token='not-a-cursor')
+
+    def test_cursor_pages_have_no_duplicates_or_gaps_when_scores_tie(self):
+        expected = {self.post('Same', 'Identical tomatoes').pk for _ in range(7)}
+        seen = []
+        page = search_posts('tomatoes', per_page=3)
+        scores = {post.search_rank for post in page.object_list}
+        while True:
+            seen.extend(post.pk for post in page.object_list)
+            if not page.has_next():
+                break
+            page = search_posts('tomatoes', token=page.next_cursor, per_page=3)
+        self.assertEqual(len(scores), 1)
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(set(seen), expected)
+
+    def test_matches_are_marked_and_html_is_escaped(self):
+        self.post('Tomatoes <script>', '<b>Tomatoes</b> need sun')
+        post, = search_posts('tomatoes').object_list
+        self.assertIn('<mark>Tomatoes</mark>', post.title_highlight)
+        self.assertIn('&lt;script&gt;', post.title_highlight)
+        self.assertIn('&lt;b&gt;<mark>Tomatoes</mark>&lt;/b&gt;', post.snippet)
+        self.assertNotIn('<b>', post.snippet)
+
+    @skipUnless(connection.vendor == 'sqlite', 'FTS5 triggers are SQLite only')
+    def test_fts_triggers_survive_migrations(self):
+        # SQLite table rebuilds drop triggers; a later migration that
+        # rebuilds blog_post must recreate them
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'blog_post'")
+            triggers = {name for name, in cursor.fetchall()}
+        self.assertEqual(triggers, {'blog_post_fts_ai', 'blog_post_fts_ad', 'blog_post_fts_au'})
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class PostSearchViewTests(TestCase):
+    def test_bad_cursor_shows_the_first_page(self):
+        author = User.objects.create_user('author', password='pw')
+        Post.objects.create(author=author, title='Gardening notes', content='Tomatoes need sun')
+        response = self.client.get(reverse('post_search'), {'query': 'tomatoes', 'cursor': '!!!'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(titles(response.context['page_obj']), ['Gardening notes'])
@@ -0,0 +1,94 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from blog.management.commands.benchmark_storage_calls import png_bytes
+from blog.models import Profile
+from blog.tests.test_storage import CountingStorage
+
+
+class RecordingStorage(CountingStorage):
+    """CountingStorage that also counts reads, writes and deletes"""
+
+    def _open(self, name, mode='rb'):
+        self.calls['open'] += 1
+        return super()._open(name, mode)
+
+    def _save(self, name, content):
+        self.calls['save'] += 1
+        return super()._save(name, content)
+
+    def delete(self, name):
+        self.calls['delete'] += 1
+        return super().delete(name)
+
+
+@override_settings(IMAGE_DERIVATIVE_WORKERS=0)
+class ProfileChangeTests(TestCase):
+    def setUp(self):
+        self.storage = RecordingStorage()
+        patcher = mock.patch.object(Profile._meta.get_field('profile_picture'), 'storage', self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user('owner', password='pw')
+
+    def load(self):
+        return Profile.objects.get(user=self.user)
+
+    def set_picture(self, profile, name='me.png'):
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.profile_picture = SimpleUploadedFile(name, png_bytes((300, 300)))
+            profile.save()
+        return profile
+
+    def test_loaded_profile_has_no_changes(self):
+        self.assertEqual(self.load().changed_fields(), set())
+
+    def test_changed_fields_lists_edits(self):
+        profile = self.load()
+        profile.bio = 'Hello'
+        profile.privacy_setting = 'private'
+        self.assertEqual(profile.changed_fields(), {'bio', 'privacy_setting'})
+
+    def test_new_upload_is_a_change_even_with_the_same_name(self):
+        profile = self.set_picture(self.load())
+        profile = self.load()
+        profile.profile_picture = SimpleUploadedFile(profile.profile_picture.name, png_bytes())
+        self.assertIn('profile_picture', profile.changed_fields())
+
+    def test_hand_built_profile_counts_every_field_as_changed(self):
+        self.assertIn('bio', Profile(user=self.user).changed_fields())
+
+    def test_bio_only_save_makes_no_storage_calls(self):
+        self.set_picture(self.load())
+        profile = self.load()
+        self.storage.calls.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.bio = 'New bio'
+            profile.save()
+        self.assertEqual(sum(self.storage.calls.values()), 0)
+
+    def test_saving_again_after_a_save_is_clean(self):
+        profile = self.load()
+        profile.bio = 'New bio'
+        profile.save()
+        self.assertEqual(profile.changed_fields(), set())
+
+    def test_user_save_leaves_an_unchanged_profile_alone(self):
+        user = User.objects.select_related('profile').get(pk=self.user.pk)
+        with mock.patch.object(Profile, 'save') as save:
+            user.save()
+        save.assert_not_called()
+
+    def test_user_save_saves_an_edited_profile(self):
+        user = User.objects.select_related('profile').get(pk=self.user.pk)
+        user.profile.bio = 'Edited through the user'
+        user.save()
+        self.assertEqual(self.load().bio, 'Edited through the user')
+
+    def test_replacing_the_picture_deletes_the_old_file(self):
+        old_name = self.set_picture(self.load()).profile_picture.name
+        self.set_picture(self.load(), 'new.png')
+        self.assertFalse(self.storage.exists(old_name))
@@ -0,0 +1,34 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from blog.models import Post
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    PAGE_CACHE_TIMEOUT=0,
+)
+class ProfilePostCountTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', password='pw')
+        Post.objects.create(author=self.owner, title='Text', content='Body')
+        Post.objects.create(author=self.owner, title='Another', content='Body')
+        Post.objects.create(author=self.owner, title='Photo', content='Body', image='blog_images/photo.jpg')
+        self.url = reverse('profile_view', args=['owner'])
+
+    def test_visitors_count_the_image_posts_they_are_shown(self):
+        User.objects.create_user('visitor', password='pw')
+        self.client.login(username='visitor', password='pw')
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['post_count'], 1)
+        self.assertEqual(len(response.context['user_posts']), 1)
+
+    def test_anonymous_visitors_count_the_image_posts(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['post_count'], 1)
+
+    def test_owner_counts_every_post(self):
+        self.client.login(username='owner', password='pw')
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['post_count'], 3)
@@ -0,0 +1,17 @@
+from django.db import connection
+from django.test import TestCase
+
+from blog.query_plans import bad_patterns, hot_queries, plan_problems
+
+
+class HotQueryPlanTests(TestCase):
+    """Every hot query must be served by an index, without a full scan or a filesort"""
+
+    def test_hot_queries_use_an_index(self):
+        patterns = bad_patterns()
+        if patterns is None:
+            self.skipTest(f'No plan rules for the {connection.vendor} backend')
+        for name, queryset in hot_queries().items():
+            with self.subTest(query=name):
+                plan, problems = plan_problems(queryset, patterns)
+                self.assertEqual(problems, [], f'{name} is not using an index:\n{plan}')
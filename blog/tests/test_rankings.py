@@ -0,0 +1,44 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from blog.models import Post, PostRanking
+from blog.rankings import refresh_rankings, top_posts
+
+
+class RefreshRankingsTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author', password='pw')
+
+    def post(self, title, **fields):
+        return Post.objects.create(author=self.author, title=title, content='Body', **fields)
+
+    def test_new_posts_are_scored_incrementally(self):
+        self.post('Old', view_count=1)
+        refresh_rankings(full=True)
+        new = self.post('New', view_count=10)
+        refresh_rankings()
+        self.assertGreater(PostRanking.objects.get(post=new).score, 0)
+
+    def test_post_created_featured_is_scored_by_the_next_incremental_refresh(self):
+        self.post('Old', view_count=1)
+        refresh_rankings(full=True)
+        featured = self.post('Featured', view_count=10, featured=True)
+        ranking = PostRanking.objects.get(post=featured)
+        self.assertTrue(ranking.featured)
+        self.assertIsNone(ranking.computed_at)
+
+        refresh_rankings()
+        ranking.refresh_from_db()
+        self.assertGreater(ranking.score, 0)
+        self.assertIsNotNone(ranking.computed_at)
+
+    def test_untouched_posts_are_not_rescored(self):
+        self.post('Quiet', view_count=1)
+        refresh_rankings(full=True)
+        self.assertEqual(refresh_rankings(), 0)
+
+    def test_featured_posts_sort_first(self):
+        popular = self.post('Popular', view_count=100)
+        featured = self.post('Featured', view_count=1, featured=True)
+        refresh_rankings(full=True)
+        self.assertEqual(top_posts(), [featured, popular])
@@ -0,0 +1,97 @@
+from collections import Counter
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import InMemoryStorage
+from django.test import SimpleTestCase
+
+from blog.storage import CachedURLStorage, LRUCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingStorage(InMemoryStorage):
+    """In-memory stand-in for the media backend that counts url()/exists() calls"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, base_url='/media/', **kwargs)
+        self.calls = Counter()
+
+    def url(self, name):
+        self.calls['url'] += 1
+        return super().url(name)
+
+    def exists(self, name):
+        self.calls['exists'] += 1
+        return super().exists(name)
+
+
+class LRUCacheTests(SimpleTestCase):
+    def test_entries_expire_after_the_timeout(self):
+        clock = FakeClock()
+        cache = LRUCache(10, timeout=30, clock=clock)
+        cache.set('a', 1)
+        clock.now = 29
+        self.assertEqual(cache.get('a'), 1)
+        clock.now = 30
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = LRUCache(2, timeout=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual((cache.get('a'), cache.get('b'), cache.get('c')), (1, None, 3))
+
+    def test_zero_size_disables_caching(self):
+        cache = LRUCache(0, timeout=60)
+        cache.set('a', 1)
+        self.assertIsNone(cache.get('a'))
+
+
+class CachedURLStorageTests(SimpleTestCase):
+    def setUp(self):
+        self.backend = CountingStorage()
+        self.storage = CachedURLStorage(backend=self.backend, max_entries=100, timeout=60)
+        self.clock = FakeClock()
+        self.storage.memo.clock = self.clock
+        self.name = self.storage.save('pics/cat.png', ContentFile(b'meow'))
+        self.backend.calls.clear()
+
+    def test_url_and_exists_are_memoized(self):
+        for _ in range(3):
+            self.assertEqual(self.storage.url(self.name), '/media/pics/cat.png')
+            self.assertTrue(self.storage.exists(self.name))
+        self.assertEqual(self.backend.calls, Counter(url=1, exists=1))
+
+    def test_entries_are_refreshed_after_the_timeout(self):
+        self.storage.url(self.name)
+        self.clock.now = 61
+        self.storage.url(self.name)
+        self.assertEqual(self.backend.calls['url'], 2)
+
+    def test_delete_invalidates_the_name(self):
+        self.assertTrue(self.storage.exists(self.name))
+        self.storage.delete(self.name)
+        self.assertFalse(self.storage.exists(self.name))
+        self.assertEqual(self.backend.calls['exists'], 2)
+
+    def test_save_invalidates_the_name(self):
+        self.assertFalse(self.storage.exists('pics/dog.png'))
+        name = self.storage.save('pics/dog.png', ContentFile(b'woof'))
+        self.assertEqual(name, 'pics/dog.png')
+        self.assertTrue(self.storage.exists(name))
+
+    def test_saving_never_uses_the_cached_exists(self):
+        # A stale "missing" answer must not let a save overwrite the file
+        self.storage.memo.set(('exists', self.name), False)
+        name = self.storage.save(self.name, ContentFile(b'other'))
+        self.assertNotEqual(name, self.name)
+        self.assertEqual(self.storage.open(self.name).read(), b'meow')
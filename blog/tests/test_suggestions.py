@@ -0,0 +1,54 @@
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+
+from blog.models import Follow
+from blog.suggestions import compute_suggestions
+
+
+class ComputeSuggestionsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        names = ['reader', 'friend1', 'friend2', 'friend3', 'popular', 'niche', 'known']
+        cls.users = {name: User.objects.create_user(name, password='pw') for name in names}
+        for friend in ('friend1', 'friend2', 'friend3', 'known'):
+            cls.follow('reader', friend)
+        for friend in ('friend1', 'friend2', 'friend3'):
+            cls.follow(friend, 'popular')
+            # Already followed and the reader themselves are never suggested
+            cls.follow(friend, 'known')
+            cls.follow(friend, 'reader')
+        cls.follow('friend1', 'niche')
+
+    @classmethod
+    def follow(cls, follower, following):
+        Follow.objects.create(follower=cls.users[follower], following=cls.users[following])
+
+    def test_candidates_ranked_by_mutual_follows(self):
+        ranked, truncated = compute_suggestions(self.users['reader'].pk, time_budget=10)
+        self.assertFalse(truncated)
+        self.assertEqual(ranked, [(self.users['popular'].pk, 3), (self.users['niche'].pk, 1)])
+
+    def test_exhausted_budget_stops_counting(self):
+        ranked, truncated = compute_suggestions(self.users['reader'].pk, time_budget=0)
+        self.assertTrue(truncated)
+        self.assertEqual(ranked, [])
+
+    def test_batches_run_one_bounded_query_each(self):
+        with self.assertNumQueries(2) as context:
+            compute_suggestions(self.users['reader'].pk, time_budget=10)
+        batch_sql = context.captured_queries[1]['sql'].upper()
+        self.assertIn('NOT EXISTS', batch_sql)
+        self.assertIn('LIMIT', batch_sql)
+
+    @skipUnless(connection.vendor == 'postgresql', 'statement_timeout is PostgreSQL only')
+    def test_callers_statement_timeout_is_restored(self):
+        # TestCase wraps each test in a transaction, like ATOMIC_REQUESTS
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL statement_timeout = '5s'")
+        compute_suggestions(self.users['reader'].pk, time_budget=10)
+        with connection.cursor() as cursor:
+            cursor.execute('SHOW statement_timeout')
+            self.assertEqual(cursor.fetchone()[0], '5s')
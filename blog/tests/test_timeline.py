@@ -0,0 +1,62 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from blog.models import Follow, Post, Profile, TimelineEntry
+from blog.timeline import timeline_page
+
+
+@override_settings(TIMELINE_FANOUT_LIMIT=2)
+class TimelineModeSwitchTests(TestCase):
+    """Authors crossing TIMELINE_FANOUT_LIMIT in either direction keep a complete timeline"""
+
+    def setUp(self):
+        self.author = User.objects.create_user('author', password='pw')
+        self.reader = User.objects.create_user('reader', password='pw')
+        self.extra = User.objects.create_user('extra', password='pw')
+        self.start = timezone.now() - timedelta(hours=1)
+        self.follow(self.reader)
+
+    def follow(self, user):
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.create(follower=user, following=self.author)
+
+    def publish(self, title, minutes):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Post.objects.create(
+                title=title, content='Body', author=self.author, created_at=self.start + timedelta(minutes=minutes)
+            )
+
+    def titles(self, per_page=10):
+        titles = []
+        page = timeline_page(self.reader, per_page=per_page)
+        while True:
+            titles += [entry.post.title for entry in page]
+            if not page.has_next():
+                return titles
+            page = timeline_page(self.reader, page.next_cursor, per_page=per_page)
+
+    def test_posts_fanned_out_before_the_switch_are_not_repeated(self):
+        self.publish('before', 1)
+        self.follow(self.extra)
+        self.publish('after', 2)
+        self.assertTrue(Profile.objects.get(user=self.author).timeline_read_merged)
+        self.assertEqual(TimelineEntry.objects.filter(user=self.reader).count(), 1)
+        self.assertEqual(self.titles(), ['after', 'before'])
+        self.assertEqual(self.titles(per_page=1), ['after', 'before'])
+
+    def test_posts_from_the_read_merged_period_survive_dropping_under_the_limit(self):
+        self.publish('fanned out', 1)
+        self.follow(self.extra)
+        self.publish('read merged', 2)
+        Follow.objects.get(follower=self.extra).delete()
+        self.publish('back under', 3)
+        self.assertEqual(self.titles(), ['back under', 'read merged', 'fanned out'])
+
+    def test_small_authors_are_fanned_out(self):
+        self.publish('one', 1)
+        self.assertFalse(Profile.objects.get(user=self.author).timeline_read_merged)
+        self.assertEqual(TimelineEntry.objects.filter(user=self.reader).count(), 1)
+        self.assertEqual(self.titles(), ['one'])
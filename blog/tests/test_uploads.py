@@ -0,0 +1,122 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from blog.forms import PostForm
+from blog.models import ChunkedUpload, Post
+from blog.uploads import InvalidUpload, OffsetMismatch, append_chunk, complete_upload, create_upload
+
+VIDEO_BYTES = b'\x00\x00\x00\x18ftypmp42' + b'\x00' * 40
+
+
+class ChunkedUploadTestCase(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(
+            MEDIA_ROOT=media_root,
+            CHUNKED_UPLOAD_TEMP_DIR=f'{media_root}/chunks',
+            CHUNKED_UPLOAD_CHUNK_SIZE=16,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user('uploader', password='pw')
+
+    def upload_video(self, data=VIDEO_BYTES):
+        upload = create_upload(self.user, 'video', 'clip.mp4', len(data))
+        for offset in range(0, len(data), 16):
+            chunk = data[offset:offset + 16]
+            append_chunk(upload, offset, BytesIO(chunk), len(chunk))
+        return upload
+
+
+class UploadLifecycleTests(ChunkedUploadTestCase):
+    def test_chunks_are_assembled_and_stored(self):
+        upload = complete_upload(self.upload_video())
+        self.assertEqual(upload.status, 'complete')
+        field = Post._meta.get_field('video')
+        with field.storage.open(upload.file_name) as stored:
+            self.assertEqual(stored.read(), VIDEO_BYTES)
+
+    def test_chunk_at_the_wrong_offset_is_refused(self):
+        upload = create_upload(self.user, 'video', 'clip.mp4', len(VIDEO_BYTES))
+        with self.assertRaises(OffsetMismatch) as context:
+            append_chunk(upload, 16, BytesIO(VIDEO_BYTES[16:32]), 16)
+        self.assertEqual(context.exception.offset, 0)
+
+    def test_incomplete_upload_cannot_be_completed(self):
+        upload = create_upload(self.user, 'video', 'clip.mp4', len(VIDEO_BYTES))
+        append_chunk(upload, 0, BytesIO(VIDEO_BYTES[:16]), 16)
+        with self.assertRaises(InvalidUpload):
+            complete_upload(upload)
+
+    def test_only_one_finish_request_stores_the_file(self):
+        upload = self.upload_video()
+        racing_copy = ChunkedUpload.objects.get(pk=upload.pk)
+        field = Post._meta.get_field('video')
+        with mock.patch.object(field.storage, 'save', wraps=field.storage.save) as save:
+            complete_upload(upload)
+            # The racing request loaded the row before the first one finished
+            self.assertEqual(complete_upload(racing_copy).file_name, upload.file_name)
+        self.assertEqual(save.call_count, 1)
+
+    def test_finish_request_during_storing_is_refused(self):
+        upload = self.upload_video()
+        racing_copy = ChunkedUpload.objects.get(pk=upload.pk)
+        ChunkedUpload.objects.filter(pk=upload.pk).update(status='storing')
+        with self.assertRaises(InvalidUpload):
+            complete_upload(racing_copy)
+
+    def test_failed_store_releases_the_claim(self):
+        upload = self.upload_video()
+        field = Post._meta.get_field('video')
+        with mock.patch.object(field.storage, 'save', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                complete_upload(upload)
+        self.assertEqual(ChunkedUpload.objects.get(pk=upload.pk).status, 'uploading')
+        self.assertEqual(complete_upload(upload).status, 'complete')
+
+
+class PostFormUploadTests(ChunkedUploadTestCase):
+    def form(self, upload):
+        data = {'title': 'With video', 'content': 'Body', 'video_upload': str(upload.pk)}
+        return PostForm(data, user=self.user)
+
+    def test_saving_the_post_attaches_the_file_and_drops_the_upload(self):
+        upload = complete_upload(self.upload_video())
+        form = self.form(upload)
+        self.assertTrue(form.is_valid(), form.errors)
+        post = form.save(commit=False)
+        post.author = self.user
+        post.save()
+        form.save_m2m()
+        self.assertEqual(Post.objects.get(pk=post.pk).video.name, upload.file_name)
+        self.assertFalse(ChunkedUpload.objects.filter(pk=upload.pk).exists())
+
+    def test_upload_is_kept_until_the_post_is_saved(self):
+        upload = complete_upload(self.upload_video())
+        form = self.form(upload)
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save(commit=False)
+        self.assertTrue(ChunkedUpload.objects.filter(pk=upload.pk).exists())
+
+    def test_failed_post_save_keeps_the_upload(self):
+        upload = complete_upload(self.upload_video())
+        form = self.form(upload)
+        self.assertTrue(form.is_valid(), form.errors)
+        form.instance.author = self.user
+        with mock.patch.object(Post, 'save', side_effect=RuntimeError('database is down')):
+            with self.assertRaises(RuntimeError):
+                form.save()
+        self.assertTrue(ChunkedUpload.objects.filter(pk=upload.pk).exists())
+
+    def test_another_users_upload_is_rejected(self):
+        upload = complete_upload(self.upload_video())
+        other = User.objects.create_user('other', password='pw')
+        form = PostForm({'title': 'T', 'content': 'B', 'video_upload': str(upload.pk)}, user=other)
+        self.assertFalse(form.is_valid())
+        self.assertIn('video_upload', form.errors)
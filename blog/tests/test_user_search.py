@@ -0,0 +1,37 @@
+from django.contrib.auth.models import AnonymousUser, User
+from django.test import TestCase
+
+from blog.search import search_users
+
+
+class SearchUsersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', first_name='Alice', last_name='Liddell', password='pw')
+        cls.bob = User.objects.create_user('bob', email='bob@example.com', password='pw')
+        cls.hidden = User.objects.create_user('alicia', password='pw')
+        cls.hidden.profile.privacy_setting = 'private'
+        cls.hidden.profile.save()
+        cls.viewer = User.objects.create_user('viewer', password='pw')
+
+    def test_substring_inside_a_word_matches(self):
+        self.assertEqual(search_users('lic', self.viewer), [self.alice.pk])
+        self.assertEqual(search_users('example', self.viewer), [self.bob.pk])
+
+    def test_username_prefix_ranks_first(self):
+        carol = User.objects.create_user('carol', last_name='Alison', password='pw')
+        self.assertEqual(search_users('ali', self.viewer), [self.alice.pk, carol.pk])
+
+    def test_short_queries_match_username_prefixes(self):
+        self.assertEqual(search_users('bo', self.viewer), [self.bob.pk])
+
+    def test_private_profiles_are_hidden_except_from_themselves(self):
+        self.assertNotIn(self.hidden.pk, search_users('alicia', self.viewer))
+        self.assertIn(self.hidden.pk, search_users('alicia', self.hidden))
+
+    def test_empty_privacy_setting_counts_as_public(self):
+        legacy = User.objects.create_user('legacy', password='pw')
+        legacy.profile.privacy_setting = ''
+        legacy.profile.save()
+        self.assertEqual(search_users('legacy', self.viewer), [legacy.pk])
+        self.assertEqual(search_users('legacy', AnonymousUser()), [legacy.pk])
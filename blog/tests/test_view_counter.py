@@ -0,0 +1,114 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from blog.models import Post
+from blog.view_counter import CACHE_KEY_PREFIX, ViewCountBuffer
+
+
+class ViewCountBufferTestCase(TestCase):
+    backend = 'memory'
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        author = User.objects.create_user('author', password='pw')
+        self.post = Post.objects.create(author=author, title='Post', content='Body')
+        self.other = Post.objects.create(author=author, title='Other', content='Body')
+
+    def buffer(self):
+        # Long enough that only explicit flushes write anything
+        buffer = ViewCountBuffer(flush_interval=3600, backend=self.backend)
+        self.addCleanup(lambda: buffer._timer and buffer._timer.cancel())
+        return buffer
+
+    def view_count(self, post):
+        post.refresh_from_db(fields=['view_count'])
+        return post.view_count
+
+
+class MemoryBufferTests(ViewCountBufferTestCase):
+    def test_views_are_written_on_flush(self):
+        buffer = self.buffer()
+        buffer.record(self.post.pk)
+        buffer.record(self.post.pk)
+        buffer.record(self.other.pk)
+        self.assertEqual(self.view_count(self.post), 0)
+        self.assertEqual(buffer.pending(self.post.pk), 2)
+
+        self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(self.view_count(self.post), 2)
+        self.assertEqual(self.view_count(self.other), 1)
+        self.assertEqual(buffer.pending(self.post.pk), 0)
+        self.assertIsNotNone(Post.objects.get(pk=self.post.pk).activity_at)
+
+    def test_zero_interval_writes_through(self):
+        buffer = ViewCountBuffer(flush_interval=0, backend=self.backend)
+        buffer.record(self.post.pk)
+        self.assertEqual(self.view_count(self.post), 1)
+
+
+class CacheBufferTests(ViewCountBufferTestCase):
+    backend = 'cache'
+
+    def test_another_worker_flushes_buffered_views(self):
+        killed_worker, other_worker = self.buffer(), self.buffer()
+        killed_worker.record(self.post.pk)
+        killed_worker.record(self.post.pk)
+        killed_worker.record(self.other.pk)
+
+        self.assertEqual(other_worker.flush(), 2)
+        self.assertEqual(self.view_count(self.post), 2)
+        self.assertEqual(self.view_count(self.other), 1)
+        self.assertEqual(killed_worker.flush(), 0)
+        self.assertEqual(self.view_count(self.post), 2)
+
+    def test_views_after_a_flush_are_flushed_next_time(self):
+        first, second = self.buffer(), self.buffer()
+        first.record(self.post.pk)
+        second.flush()
+        first.record(self.post.pk)
+        second.record(self.post.pk)
+        first.flush()
+        self.assertEqual(self.view_count(self.post), 3)
+
+    def test_views_counted_while_a_flush_reads_are_kept(self):
+        buffer = self.buffer()
+        buffer.record(self.post.pk, 2)
+        real_get_many = cache.get_many
+
+        def get_many_then_view(keys):
+            found = real_get_many(keys)
+            if f'{CACHE_KEY_PREFIX}{self.post.pk}' in keys:
+                # A view lands between the read and the decrement
+                cache.incr(f'{CACHE_KEY_PREFIX}{self.post.pk}')
+            return found
+
+        cache.get_many = get_many_then_view
+        try:
+            buffer.flush()
+        finally:
+            cache.get_many = real_get_many
+        self.assertEqual(self.view_count(self.post), 2)
+        buffer.flush()
+        self.assertEqual(self.view_count(self.post), 3)
+
+    def test_counter_taken_by_another_flush_is_not_written_twice(self):
+        buffer = self.buffer()
+        buffer.record(self.post.pk, 2)
+        key = f'{CACHE_KEY_PREFIX}{self.post.pk}'
+        real_get_many = cache.get_many
+
+        def get_many_racing_flush(keys):
+            found = real_get_many(keys)
+            if key in keys:
+                # Another worker takes the same views first
+                cache.decr(key, found[key])
+            return found
+
+        cache.get_many = get_many_racing_flush
+        try:
+            self.assertEqual(buffer.flush(), 0)
+        finally:
+            cache.get_many = real_get_many
+        self.assertEqual(cache.get(key), 0)
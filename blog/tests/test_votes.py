@@ -0,0 +1,113 @@
+import threading
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.urls import reverse
+
+from blog.models import Like, Post
+from blog.votes import apply_vote
+
+
+class ApplyVoteTests(TestCase):
+    """apply_vote keeps the Like row and the post counters in step"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', password='pw')
+        cls.voter = User.objects.create_user('voter', password='pw')
+        cls.other = User.objects.create_user('other', password='pw')
+
+    def setUp(self):
+        self.post = Post.objects.create(title='Voted', content='Body', author=self.author)
+
+    def assertVotes(self, like_count, dislike_count):
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual((post.like_count, post.dislike_count), (like_count, dislike_count))
+        self.assertEqual(Like.objects.filter(post=self.post, is_like=True).count(), like_count)
+        self.assertEqual(Like.objects.filter(post=self.post, is_like=False).count(), dislike_count)
+
+    def test_first_vote_is_created(self):
+        self.assertEqual(apply_vote(self.voter, self.post.pk, True), (None, True, 1, 0))
+        self.assertVotes(1, 0)
+
+    def test_opposite_vote_flips(self):
+        apply_vote(self.voter, self.post.pk, True)
+        self.assertEqual(apply_vote(self.voter, self.post.pk, False), (True, False, 0, 1))
+        self.assertVotes(0, 1)
+
+    def test_same_vote_again_toggles_off(self):
+        apply_vote(self.voter, self.post.pk, False)
+        self.assertEqual(apply_vote(self.voter, self.post.pk, False), (False, None, 0, 0))
+        self.assertVotes(0, 0)
+
+    def test_clearing_removes_whichever_vote_exists(self):
+        apply_vote(self.voter, self.post.pk, True)
+        apply_vote(self.other, self.post.pk, True)
+        self.assertEqual(apply_vote(self.voter, self.post.pk, None), (True, None, 1, 0))
+        self.assertEqual(apply_vote(self.voter, self.post.pk, None), (None, None, 1, 0))
+        self.assertVotes(1, 0)
+
+    def test_votes_from_several_users_add_up(self):
+        apply_vote(self.voter, self.post.pk, True)
+        apply_vote(self.other, self.post.pk, False)
+        self.assertVotes(1, 1)
+
+
+class LikePostViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.voter = User.objects.create_user('voter', password='pw')
+        cls.post = Post.objects.create(title='Voted', content='Body', author=cls.voter)
+
+    def setUp(self):
+        self.client.force_login(self.voter)
+
+    def test_vote_and_toggle(self):
+        url = reverse('like_post', args=[self.post.pk])
+        response = self.client.post(url, {'is_like': 'true'})
+        self.assertEqual(response.json(), {'success': True, 'like_count': 1, 'dislike_count': 0, 'user_vote': True})
+        response = self.client.post(url, {'is_like': 'true'})
+        self.assertEqual(response.json()['user_vote'], None)
+        self.assertEqual(response.json()['like_count'], 0)
+
+    def test_get_is_rejected(self):
+        self.assertEqual(self.client.get(reverse('like_post', args=[self.post.pk])).status_code, 405)
+
+    def test_votes_endpoint_reports_the_viewers_votes(self):
+        apply_vote(self.voter, self.post.pk, False)
+        response = self.client.get(reverse('user_votes'), {'ids': str(self.post.pk)})
+        self.assertEqual(response.json()['votes'], {str(self.post.pk): False})
+        self.assertEqual(response.json()['counts'][str(self.post.pk)], {'like_count': 0, 'dislike_count': 1})
+
+
+@skipUnlessDBFeature('test_db_allows_multiple_connections')
+class ConcurrentVoteTests(TransactionTestCase):
+    """Racing clicks from many voters must leave exact counters"""
+
+    def test_concurrent_votes_are_all_counted(self):
+        author = User.objects.create_user('author', password='pw')
+        voters = [User.objects.create_user(f'voter{i}', password='pw') for i in range(8)]
+        post = Post.objects.create(title='Hot', content='Body', author=author)
+        barrier = threading.Barrier(len(voters))
+        errors = []
+
+        def vote(user):
+            try:
+                barrier.wait()
+                apply_vote(user, post.pk, True)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=vote, args=(user,)) for user in voters]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        post.refresh_from_db()
+        self.assertEqual(post.like_count, len(voters))
+        self.assertEqual(Like.objects.filter(post=post).count(), len(voters))
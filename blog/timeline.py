@@ -0,0 +1,150 @@
+"""
+Following timelines, built fan-out-on-write.
+
+Publishing a post copies a TimelineEntry into the timeline of every
+follower of its author, in batches, once the post is committed. Reading a
+timeline is then one indexed range scan on (user, created_at, post) instead
+of an author__in join over everyone the reader follows.
+
+Authors with TIMELINE_FANOUT_LIMIT or more followers are not fanned out:
+one post would mean that many inserts. Their recent posts are read at
+query time instead (fan-out-on-read) and merged into the page by the same
+(created_at, post id) key, so cursors work across both sources.
+
+The switch is recorded on the author's Profile (timeline_read_merged) the
+first time a post of theirs is not fanned out, and it is never undone.
+Posts published while the author was read-merged have no entries, so
+dropping back under the limit must not stop the merge. Posts fanned out
+before the switch still have entries, so the merged page is deduplicated
+by post id.
+
+Following someone backfills their latest posts into the follower's
+timeline; unfollowing removes that author's entries again.
+"""
+import logging
+
+from django.conf import settings
+
+from .models import Follow, Post, Profile, TimelineEntry
+from .pagination import KeysetPaginator
+
+logger = logging.getLogger(__name__)
+
+
+def fanout_limit():
+    return getattr(settings, 'TIMELINE_FANOUT_LIMIT', 10000)
+
+
+def is_fanned_out_on_read(author_id):
+    """
+    True if the author's posts are merged at read time: they have too many
+    followers to fan out, or had at some point. Records the switch.
+    """
+    row = Profile.objects.filter(user_id=author_id).values_list('followers_count', 'timeline_read_merged').first()
+    if row is None:
+        return False
+    followers_count, read_merged = row
+    if read_merged:
+        return True
+    if followers_count < fanout_limit():
+        return False
+    Profile.objects.filter(user_id=author_id).update(timeline_read_merged=True)
+    logger.info(f"Author {author_id} reached {followers_count} followers; posts are now merged at read time")
+    return True
+
+
+def _entries_for(post_rows, user_ids):
+    return [
+        TimelineEntry(user_id=user_id, post_id=post_id, author_id=author_id, created_at=created_at)
+        for post_id, author_id, created_at in post_rows
+        for user_id in user_ids
+    ]
+
+
+def fan_out_post(post, batch_size=None):
+    """
+    Copy `post` into its author's followers' timelines.
+    Returns the number of timelines written to.
+    """
+    if is_fanned_out_on_read(post.author_id):
+        logger.info(f"Skipping fan-out of post {post.pk}: author {post.author_id} is read at query time")
+        return 0
+
+    batch_size = batch_size or getattr(settings, 'TIMELINE_FANOUT_BATCH_SIZE', 1000)
+    follows = Follow.objects.filter(following_id=post.author_id).order_by('pk')
+    post_rows = [(post.pk, post.author_id, post.created_at)]
+
+    written = 0
+    last_pk = 0
+    while True:
+        batch = list(follows.filter(pk__gt=last_pk).values_list('pk', 'follower_id')[:batch_size])
+        if not batch:
+            break
+        TimelineEntry.objects.bulk_create(
+            _entries_for(post_rows, [follower_id for _, follower_id in batch]),
+            ignore_conflicts=True,
+        )
+        written += len(batch)
+        last_pk = batch[-1][0]
+    return written
+
+
+def backfill_timeline(user_id, author_id, limit=None):
+    """Copy the author's latest posts into a new follower's timeline"""
+    if is_fanned_out_on_read(author_id):
+        return 0
+    limit = limit or getattr(settings, 'TIMELINE_BACKFILL_SIZE', 50)
+    post_rows = list(
+        Post.objects.filter(author_id=author_id)
+        .order_by('-created_at', '-id')
+        .values_list('pk', 'author_id', 'created_at')[:limit]
+    )
+    TimelineEntry.objects.bulk_create(_entries_for(post_rows, [user_id]), ignore_conflicts=True)
+    return len(post_rows)
+
+
+def trim_timeline(user_id, author_id):
+    """Drop an unfollowed author's posts from the reader's timeline"""
+    deleted, _ = TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+    return deleted
+
+
+def fanned_out_on_read_authors(user):
+    """Ids of the accounts `user` follows whose posts are merged at read time"""
+    return list(
+        Follow.objects.filter(follower=user, following__profile__timeline_read_merged=True)
+        .values_list('following_id', flat=True)
+    )
+
+
+def _sort_key(entry):
+    return (entry.created_at, entry.post_id)
+
+
+def timeline_page(user, token=None, per_page=10):
+    """
+    One CursorPage of `user`'s following timeline, newest first.
+    Items are TimelineEntry objects with `post` and `post.author` loaded.
+    Raises InvalidCursor for a malformed token.
+    """
+    entries = TimelineEntry.objects.filter(user=user).select_related('post__author')
+    paginator = KeysetPaginator(entries, per_page, pk_field='post_id')
+    qs, direction, value = paginator.window(token)
+    rows = list(qs[:per_page + 1])
+
+    authors = fanned_out_on_read_authors(user)
+    if authors:
+        posts = Post.objects.filter(author_id__in=authors).select_related('author')
+        posts_qs, _, _ = KeysetPaginator(posts, per_page).window(token)
+        rows += [
+            # Unsaved entries give both sources the same shape for build_page
+            TimelineEntry(user=user, post=post, author_id=post.author_id, created_at=post.created_at)
+            for post in posts_qs[:per_page + 1]
+        ]
+        # Posts fanned out before their author switched come from both sources
+        unique = {}
+        for row in rows:
+            unique.setdefault(row.post_id, row)
+        rows = sorted(unique.values(), key=_sort_key, reverse=(direction == 'next'))[:per_page + 1]
+
+    return paginator.build_page(rows, direction, value)
@@ -0,0 +1,205 @@
+"""
+Chunked, resumable uploads for post videos and audio.
+
+A multipart form upload of a 50MB video ties up a worker for the whole
+transfer and has to start over if the connection drops. Instead the
+browser (static/js/chunked_upload.js):
+
+1. creates an upload with the file's name, kind and size,
+2. PUTs the file in chunks, each tagged with the byte offset it starts at
+   (Upload-Offset header); the server appends it to a temp file on disk,
+   copying at most COPY_BUFFER_SIZE bytes at a time,
+3. after a dropped connection asks for the current offset and carries on
+   from there,
+4. completes the upload, which claims it (status 'storing') and streams the
+   temp file into media storage,
+5. submits the post form with the upload id, and PostForm attaches the
+   stored file to the post.
+
+Temp files live in CHUNKED_UPLOAD_TEMP_DIR, which every worker must share.
+`manage.py purge_chunked_uploads` removes uploads that were abandoned.
+"""
+import logging
+import os
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.http import UnreadablePostError
+from django.utils import timezone
+
+from .models import ChunkedUpload, Post
+
+logger = logging.getLogger(__name__)
+
+COPY_BUFFER_SIZE = 64 * 1024
+
+
+class InvalidUpload(Exception):
+    """Raised when an upload request can't be accepted"""
+
+
+class OffsetMismatch(Exception):
+    """Raised when a chunk doesn't start where the upload currently ends"""
+
+    def __init__(self, offset):
+        super().__init__(f'Upload is at offset {offset}')
+        self.offset = offset
+
+
+def chunk_size():
+    return getattr(settings, 'CHUNKED_UPLOAD_CHUNK_SIZE', 5 * 1024 * 1024)
+
+
+def max_upload_size():
+    return getattr(settings, 'MAX_UPLOAD_SIZE', 50 * 1024 * 1024)
+
+
+def temp_path(upload):
+    return os.path.join(settings.CHUNKED_UPLOAD_TEMP_DIR, f'{upload.pk}.part')
+
+
+def _validate_filename(kind, filename):
+    # The same extension rules as the Post field the file will end up in
+    field = Post._meta.get_field(kind)
+    placeholder = File(None, name=filename)
+    for validator in field.validators:
+        try:
+            validator(placeholder)
+        except ValidationError as e:
+            raise InvalidUpload(' '.join(e.messages))
+
+
+def create_upload(user, kind, filename, size):
+    """Start an upload of `size` bytes and create its empty temp file"""
+    if kind not in dict(ChunkedUpload.KIND_CHOICES):
+        raise InvalidUpload('Unknown upload kind')
+    filename = os.path.basename(filename or '').strip()
+    if not filename:
+        raise InvalidUpload('A file name is required')
+    _validate_filename(kind, filename)
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise InvalidUpload('A file size is required')
+    if size <= 0:
+        raise InvalidUpload('The file is empty')
+    if size > max_upload_size():
+        raise InvalidUpload(f'The file is larger than {max_upload_size() // (1024 * 1024)}MB')
+
+    upload = ChunkedUpload.objects.create(user=user, kind=kind, filename=filename[:255], size=size)
+    os.makedirs(settings.CHUNKED_UPLOAD_TEMP_DIR, exist_ok=True)
+    open(temp_path(upload), 'wb').close()
+    return upload
+
+
+def append_chunk(upload, offset, stream, length):
+    """
+    Copy `length` bytes from `stream` into the upload's temp file at
+    `offset`, which must be where the upload currently ends. Returns the
+    new offset. Bytes that arrived before the client dropped are kept, so
+    a resumed upload only resends what is missing.
+    """
+    if upload.status != 'uploading':
+        raise InvalidUpload('The upload is already complete')
+    if offset != upload.offset:
+        raise OffsetMismatch(upload.offset)
+    if length <= 0 or length > chunk_size():
+        raise InvalidUpload(f'Chunks must be between 1 and {chunk_size()} bytes')
+    if offset + length > upload.size:
+        raise InvalidUpload('The chunk runs past the end of the file')
+
+    written = 0
+    interrupted = None
+    try:
+        with open(temp_path(upload), 'r+b') as temp_file:
+            temp_file.seek(offset)
+            while written < length:
+                try:
+                    block = stream.read(min(COPY_BUFFER_SIZE, length - written))
+                except UnreadablePostError as e:
+                    interrupted = e
+                    break
+                if not block:
+                    break
+                temp_file.write(block)
+                written += len(block)
+    except FileNotFoundError:
+        raise InvalidUpload('The upload has expired')
+
+    # Conditional on the offset, so of two racing writers of the same chunk
+    # only one advances it
+    advanced = ChunkedUpload.objects.filter(pk=upload.pk, offset=offset).update(
+        offset=offset + written, updated_at=timezone.now()
+    )
+    if not advanced:
+        upload.refresh_from_db(fields=['offset'])
+        raise OffsetMismatch(upload.offset)
+    upload.offset = offset + written
+    if interrupted is not None:
+        raise interrupted
+    return upload.offset
+
+
+def complete_upload(upload):
+    """Move a fully received upload into media storage"""
+    if upload.status == 'complete':
+        return upload
+    if upload.offset != upload.size:
+        raise InvalidUpload(f'Only {upload.offset} of {upload.size} bytes have arrived')
+
+    # Claim the upload first, so of two racing finish requests only one
+    # writes the file to storage
+    claimed = ChunkedUpload.objects.filter(pk=upload.pk, status='uploading', offset=upload.size).update(
+        status='storing', updated_at=timezone.now()
+    )
+    if not claimed:
+        upload.refresh_from_db(fields=['status', 'offset', 'file_name'])
+        if upload.status == 'complete':
+            return upload
+        raise InvalidUpload('The upload is already being completed')
+    upload.status = 'storing'
+
+    path = temp_path(upload)
+    field = Post._meta.get_field(upload.kind)
+    try:
+        with open(path, 'rb') as temp_file:
+            # Storage backends read File objects chunk by chunk
+            name = field.storage.save(
+                field.generate_filename(None, upload.filename),
+                File(temp_file, name=upload.filename),
+                max_length=field.max_length,
+            )
+    except BaseException as e:
+        # Release the claim so the upload can be completed again
+        ChunkedUpload.objects.filter(pk=upload.pk, status='storing').update(status='uploading')
+        upload.status = 'uploading'
+        if isinstance(e, FileNotFoundError):
+            raise InvalidUpload('The upload has expired')
+        raise
+
+    upload.status = 'complete'
+    upload.file_name = name
+    upload.save(update_fields=['status', 'file_name', 'updated_at'])
+    discard_temp_file(upload)
+    logger.info(f"Chunked {upload.kind} upload {upload.pk} stored as {name}")
+    return upload
+
+
+def discard_temp_file(upload):
+    try:
+        os.remove(temp_path(upload))
+    except FileNotFoundError:
+        pass
+
+
+def upload_state(upload):
+    """What the client needs to carry on with an upload"""
+    return {
+        'id': str(upload.pk),
+        'kind': upload.kind,
+        'offset': upload.offset,
+        'size': upload.size,
+        'status': upload.status,
+        'chunk_size': chunk_size(),
+    }
@@ -4,14 +4,21 @@ from django.views.generic import RedirectView
 
 urlpatterns = [
     path('', views.home, name='home'),
+    path('following/', views.following_feed, name='following_feed'),
     path('post/<int:pk>/', views.post_detail, name='post_detail'),
+    path('post/<int:pk>/comments/', views.post_comments, name='post_comments'),
+    path('post/<int:pk>/comments/new/', views.add_comment, name='add_comment'),
     path('post/new/', views.create_post, name='create_post'),
     path('post/<int:pk>/edit/', views.edit_post, name='edit_post'),
     path('post/<int:pk>/delete/', views.delete_post, name='delete_post'),
+    path('uploads/', views.start_upload, name='start_upload'),
+    path('uploads/<uuid:upload_id>/', views.upload_chunk, name='upload_chunk'),
+    path('uploads/<uuid:upload_id>/complete/', views.finish_upload, name='finish_upload'),
     path('register/', views.register, name='register'),
     path('login/', views.user_login, name='login'),
     path('logout/', views.user_logout, name='logout'),
     path('like/<int:post_id>/', views.like_post, name='like_post'),
+    path('votes/', views.user_votes, name='user_votes'),
     path('profile/settings/', views.profile_settings, name='profile_settings'),
     path('profile/<str:username>/', views.profile_view, name='profile_view'),
     path('profile/<str:username>/follow/', views.follow_user, name='follow_user'),
@@ -20,5 +27,8 @@ urlpatterns = [
     path('profile/<str:username>/followers/modal/', views.followers_modal, name='followers_modal'),
     path('profile/<str:username>/following/modal/', views.following_modal, name='following_modal'),
     path('search/', views.user_search, name='user_search'),
+    path('search/posts/', views.post_search, name='post_search'),
+    path('search/autocomplete/', views.user_autocomplete, name='user_autocomplete'),
+    path('suggestions/', views.follow_suggestions, name='follow_suggestions'),
     path('users/', RedirectView.as_view(pattern_name='user_search', permanent=False)),
 ]
@@ -0,0 +1,188 @@
+"""
+Write-behind buffer for Post.view_count.
+
+post_detail records a view here instead of saving the Post row. Pending
+increments are accumulated (in process memory, or in the shared Django
+cache when VIEW_COUNT_BUFFER = 'cache') and flushed as batched
+``UPDATE ... SET view_count = view_count + n`` statements at most once
+per VIEW_COUNT_FLUSH_INTERVAL seconds. A timer flushes whatever is still
+pending one interval after the first buffered view, so a quiet post's
+views don't wait for the next request, and once more when the worker exits.
+
+With the cache backend the list of posts with pending views is kept in
+the cache too: a post whose counter goes up from zero is appended to a
+numbered log, and a flush in any worker drains the log entries added since
+the last flush. Views buffered by a worker that was killed before it could
+flush are written by the next flush elsewhere. A flush takes a counter by
+decrementing it by the value it read; if that goes below zero another
+flush took it first, and the decrement is undone.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = 'blog:views:'
+DIRTY_SEQ_KEY = 'blog:views-dirty:seq'
+DIRTY_DRAINED_KEY = 'blog:views-dirty:drained'
+DIRTY_ENTRY_PREFIX = 'blog:views-dirty:'
+
+
+class ViewCountBuffer:
+    def __init__(self, flush_interval=None, backend=None):
+        self.flush_interval = flush_interval
+        self.backend = backend
+        self._pending = defaultdict(int)
+        # Posts this worker marked dirty in the cache backend's log
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._timer = None
+
+    def get_flush_interval(self):
+        if self.flush_interval is not None:
+            return self.flush_interval
+        return getattr(settings, 'VIEW_COUNT_FLUSH_INTERVAL', 10)
+
+    def get_backend(self):
+        return self.backend or getattr(settings, 'VIEW_COUNT_BUFFER', 'memory')
+
+    def record(self, post_id, count=1):
+        """Buffer `count` views for a post and flush if the interval has elapsed"""
+        self._add(post_id, count)
+        if self.get_flush_interval() <= 0 or time.monotonic() - self._last_flush >= self.get_flush_interval():
+            self.flush()
+        else:
+            self._schedule_flush()
+
+    def _schedule_flush(self):
+        """Make sure a flush happens within the interval even if no more views arrive"""
+        with self._lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Timer(self.get_flush_interval(), self._flush_from_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_from_timer(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush()
+        finally:
+            # The timer thread has its own connection; don't leave it open
+            connection.close()
+
+    def _add(self, post_id, count):
+        if self.get_backend() == 'cache':
+            key = f'{CACHE_KEY_PREFIX}{post_id}'
+            # add() is a no-op if the key exists; incr() is atomic on shared backends
+            cache.add(key, 0, timeout=None)
+            if cache.incr(key, count) == count:
+                # Up from zero: no flush knows about this post yet
+                self._mark_dirty(post_id)
+        else:
+            with self._lock:
+                self._pending[post_id] += count
+
+    def pending(self, post_id):
+        """Number of buffered views for a post that are not yet in the database"""
+        if self.get_backend() == 'cache':
+            return cache.get(f'{CACHE_KEY_PREFIX}{post_id}', 0)
+        with self._lock:
+            return self._pending.get(post_id, 0)
+
+    def _mark_dirty(self, post_id):
+        with self._lock:
+            self._dirty.add(post_id)
+        cache.add(DIRTY_SEQ_KEY, 0, timeout=None)
+        seq = cache.incr(DIRTY_SEQ_KEY)
+        cache.set(f'{DIRTY_ENTRY_PREFIX}{seq}', post_id, timeout=None)
+
+    def _drain(self):
+        """Take the pending increments out of the buffer, returning {post_id: n}"""
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if self.get_backend() != 'cache':
+                pending, self._pending = dict(self._pending), defaultdict(int)
+                return pending
+            # A log entry whose number was taken but not yet written when
+            # another worker read the log would be skipped there; our own
+            # marks cover that gap unless this worker dies too
+            dirty, self._dirty = self._dirty, set()
+
+        start = cache.get(DIRTY_DRAINED_KEY, 0)
+        end = cache.get(DIRTY_SEQ_KEY, 0)
+        if end > start:
+            entry_keys = [f'{DIRTY_ENTRY_PREFIX}{seq}' for seq in range(start + 1, end + 1)]
+            dirty.update(cache.get_many(entry_keys).values())
+            cache.set(DIRTY_DRAINED_KEY, end, timeout=None)
+            cache.delete_many(entry_keys)
+        if not dirty:
+            return {}
+
+        keys = {f'{CACHE_KEY_PREFIX}{post_id}': post_id for post_id in dirty}
+        pending = {}
+        for key, value in cache.get_many(list(keys)).items():
+            if not value:
+                continue
+            # Only subtract what we read so concurrent increments are kept
+            remaining = cache.decr(key, value)
+            if remaining < 0:
+                # Another worker's flush took these views first
+                cache.incr(key, value)
+                continue
+            pending[keys[key]] = value
+            if remaining > 0:
+                # Views that arrived meanwhile need a log entry of their own
+                self._mark_dirty(keys[key])
+        return pending
+
+    def flush(self):
+        """Write all buffered views to the database, one UPDATE per distinct increment"""
+        pending = self._drain()
+        if not pending:
+            return 0
+
+        by_increment = defaultdict(list)
+        for post_id, n in pending.items():
+            by_increment[n].append(post_id)
+
+        try:
+            now = timezone.now()
+            with transaction.atomic():
+                for n, post_ids in by_increment.items():
+                    Post.objects.filter(pk__in=post_ids).update(view_count=F('view_count') + n, activity_at=now)
+        except Exception as e:
+            logger.error(f"Error flushing view counts: {str(e)}", exc_info=True)
+            # Put the increments back so they are retried on the next flush
+            for post_id, n in pending.items():
+                self._add(post_id, n)
+            if self.get_flush_interval() > 0:
+                self._schedule_flush()
+            return 0
+
+        logger.debug(f"Flushed {sum(pending.values())} views for {len(pending)} posts")
+        return len(pending)
+
+
+view_counter = ViewCountBuffer()
+
+
+@atexit.register
+def _flush_on_shutdown():
+    try:
+        view_counter.flush()
+    except Exception:
+        logger.exception("Could not flush view counts on shutdown")
@@ -1,111 +1,240 @@
 import logging
 from django.shortcuts import render, get_object_or_404, redirect
+from django.template.loader import render_to_string
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-from django.db.models import Count, Q
 from django.db import transaction
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 from django.views.decorators.http import require_POST, require_http_methods
+from django.urls import reverse
 
 # Set up logging
 logger = logging.getLogger(__name__)
 from django.contrib.auth import get_user_model
-from django.db.models import Q
 from django.conf import settings
 import os
 from django.http import JsonResponse
 from django.db import IntegrityError
-from django.db.models import Q
 from django.contrib.auth import get_user_model
-from .models import Post, Comment, Like, Profile
-from .forms import PostForm, CommentForm, UserRegistrationForm, UserUpdateForm, ProfileUpdateForm, UserSearchForm
+from .models import ChunkedUpload, Post, Comment, Like, Profile
+from .pagination import KeysetPaginator, InvalidCursor
+from .view_counter import view_counter
+from .rankings import top_posts
+from .page_cache import (
+    get_cached_page, store_cached_page, attach_post_versions,
+    feed_version_key, post_version_key, profile_version_key,
+)
+from .votes import apply_vote
+from .timeline import timeline_page
+from .suggestions import suggested_users
+from .search import search_posts, search_users, users_in_order
+from .autocomplete import autocomplete_index
+from .media_serving import media_response
+from .uploads import InvalidUpload, OffsetMismatch, append_chunk, complete_upload, create_upload, upload_state
+from .profile_summary import load_profile_summary, profile_presentation, viewer_is_following
+from .conditional import not_modified, apply_validators, feed_validators, post_validators, profile_validators
+from .forms import PostForm, CommentForm, UserRegistrationForm, UserUpdateForm, ProfileUpdateForm, UserSearchForm, PostSearchForm
 
 
 def home(request):
     # Debug: Log request
     logger.info("Home view accessed")
     
-    # Get featured posts (most viewed and most liked)
-    featured_posts = Post.objects.annotate(
-        like_count=Count('likes', filter=Q(likes__is_like=True))
-    ).order_by('-view_count', '-like_count')[:2]
+    # Answer revalidation requests before building anything
+    etag, last_modified = feed_validators(request)
+    response = not_modified(request, etag, last_modified)
+    if response is not None:
+        return response
     
-    # Debug: Log featured posts count
-    logger.info(f"Found {len(featured_posts)} featured posts")
+    # Anonymous visitors share a cached copy until the feed version changes
+    cache_versions = [feed_version_key()]
+    cached_response = get_cached_page(request, cache_versions)
+    if cached_response is not None:
+        return apply_validators(request, cached_response, etag, last_modified)
     
-    # Get all posts with related data to avoid N+1 queries
-    posts = Post.objects.select_related('author', 'author__profile').prefetch_related('comments').annotate(
-        like_count=Count('likes', filter=Q(likes__is_like=True)),
-        comment_count=Count('comments')
-    ).order_by('-created_at')
+    # Get featured posts from the precomputed ranking table
+    featured_posts = top_posts(2)
     
-    # Debug: Log total posts count
-    logger.info(f"Found {posts.count()} total posts")
+    # Debug: Log featured posts count
+    logger.info(f"Found {len(featured_posts)} featured posts")
     
-    # Pagination
-    paginator = Paginator(posts, 5)  # Show 5 posts per page
-    page_number = request.GET.get('page')
+    # Counts are read from the denormalized columns on Post, so no joins or
+    # per-card aggregates are needed here
+    posts = Post.objects.select_related('author', 'author__profile').order_by('-created_at')
     
-    try:
-        page_obj = paginator.page(page_number)
-    except PageNotAnInteger:
-        page_obj = paginator.page(1)
-    except EmptyPage:
-        page_obj = paginator.page(paginator.num_pages)
+    if request.GET.get('page'):
+        # Legacy ?page=N links (old bookmarks) keep using offset pagination
+        paginator = Paginator(posts, 5)  # Show 5 posts per page
+        page_number = request.GET.get('page')
+        
+        try:
+            page_obj = paginator.page(page_number)
+        except PageNotAnInteger:
+            page_obj = paginator.page(1)
+        except EmptyPage:
+            page_obj = paginator.page(paginator.num_pages)
+        
+        # Debug: Log pagination info
+        logger.info(f"Page {page_obj.number} of {paginator.num_pages}, showing {len(page_obj)} posts")
+        cursor_mode = False
+    else:
+        # Keyset pagination on (created_at, id): no COUNT(*) and no OFFSET
+        paginator = KeysetPaginator(posts, 5)
+        try:
+            page_obj = paginator.page(request.GET.get('cursor'))
+        except InvalidCursor:
+            page_obj = paginator.page()
+        if not page_obj.object_list and request.GET.get('cursor'):
+            page_obj = paginator.page()
+        
+        logger.info(f"Cursor page showing {len(page_obj)} posts")
+        cursor_mode = True
     
-    # Debug: Log pagination info
-    logger.info(f"Page {page_obj.number} of {paginator.num_pages}, showing {len(page_obj)} posts")
+    # Per-post versions key the feed card fragment cache
+    attach_post_versions(page_obj.object_list)
     
     context = {
         'page_obj': page_obj,
         'posts': page_obj,  # This is the paginated queryset
         'featured_posts': featured_posts,
         'is_paginated': page_obj.has_other_pages(),
+        'cursor_mode': cursor_mode,
     }
-    return render(request, 'blog/home.html', context)
+    response = store_cached_page(request, cache_versions, render(request, 'blog/home.html', context))
+    return apply_validators(request, response, etag, last_modified)
+
+
+FOLLOWING_FEED_PAGE_SIZE = 10
+
+
+@login_required
+def following_feed(request):
+    """Posts from the accounts the user follows, read from their timeline"""
+    try:
+        page_obj = timeline_page(request.user, request.GET.get('cursor'), FOLLOWING_FEED_PAGE_SIZE)
+    except InvalidCursor:
+        page_obj = timeline_page(request.user, per_page=FOLLOWING_FEED_PAGE_SIZE)
+    
+    posts = [entry.post for entry in page_obj]
+    attach_post_versions(posts)
+    
+    return render(request, 'blog/following_feed.html', {
+        'page_obj': page_obj,
+        'posts': posts,
+    })
 
 
 def post_detail(request, pk):
-    post = get_object_or_404(Post, pk=pk)
-    comments = post.comments.all()
+    etag, last_modified = post_validators(request, pk)
+    response = not_modified(request, etag, last_modified)
+    if response is not None:
+        view_counter.record(pk)
+        return response
+    
+    cache_versions = [post_version_key(pk)]
+    cached_response = get_cached_page(request, cache_versions)
+    if cached_response is not None:
+        view_counter.record(pk)
+        return apply_validators(request, cached_response, etag, last_modified)
     
-    # Increment view count
-    post.view_count += 1
-    post.save(update_fields=['view_count'])
+    post = get_object_or_404(Post.objects.select_related('author'), pk=pk)
     
     if request.method == 'POST':
+        # Non-JavaScript fallback; the page normally posts to add_comment
         form = CommentForm(request.POST)
         if form.is_valid():
             comment = form.save(commit=False)
             comment.post = post
             comment.author = request.user
-            comment.save()
+            with transaction.atomic():
+                comment.save()
             messages.success(request, 'Your comment has been added!')
             return redirect('post_detail', pk=post.pk)
     else:
         form = CommentForm()
+        # Buffer the view; it is written back in a batched UPDATE by the view
+        # counter, so only the in-memory copy is bumped for display here.
+        # Comment submissions are not counted as views.
+        view_counter.record(post.pk)
+        post.view_count += 1
+    
+    # Only the newest page of comments is rendered; the rest load on demand
+    comments = comment_paginator(post).page()
+    
+    Post.attach_user_votes([post], request.user)
     
     context = {
         'post': post,
         'comments': comments,
         'form': form,
     }
-    return render(request, 'blog/post_detail.html', context)
+    response = store_cached_page(request, cache_versions, render(request, 'blog/post_detail.html', context))
+    return apply_validators(request, response, etag, last_modified)
+
+
+COMMENTS_PAGE_SIZE = 20
+
+
+def comment_paginator(post):
+    comments = Comment.objects.filter(post=post).select_related('author__profile')
+    return KeysetPaginator(comments, COMMENTS_PAGE_SIZE)
+
+
+def post_comments(request, pk):
+    """Return the next page of a post's comments as an HTML fragment"""
+    post = get_object_or_404(Post.objects.only('id'), pk=pk)
+    try:
+        page = comment_paginator(post).page(request.GET.get('cursor'))
+    except InvalidCursor:
+        return JsonResponse({'success': False, 'error': 'Invalid cursor'}, status=400)
+    
+    html = render_to_string('blog/includes/comment_list.html', {'comments': page}, request=request)
+    return JsonResponse({
+        'success': True,
+        'html': html,
+        'next_cursor': page.next_cursor,
+    })
+
+
+@login_required
+@require_POST
+def add_comment(request, pk):
+    """Create a comment via AJAX and return just the rendered comment and the new count"""
+    post = get_object_or_404(Post.objects.only('id'), pk=pk)
+    form = CommentForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'success': False, 'errors': form.errors}, status=400)
+    
+    comment = form.save(commit=False)
+    comment.post = post
+    comment.author = request.user
+    with transaction.atomic():
+        comment.save()
+        # Counter was bumped by the Comment signal in this transaction
+        comment_count = Post.objects.filter(pk=post.pk).values_list('comment_count', flat=True).get()
+    
+    html = render_to_string('blog/includes/comment_list.html', {'comments': [comment]}, request=request)
+    return JsonResponse({
+        'success': True,
+        'html': html,
+        'comment_count': comment_count,
+    })
 
 
 @login_required
 def create_post(request):
     if request.method == 'POST':
-        form = PostForm(request.POST, request.FILES)
+        form = PostForm(request.POST, request.FILES, user=request.user)
         if form.is_valid():
             post = form.save(commit=False)
             post.author = request.user
             post.save()
+            form.save_m2m()
             messages.success(request, 'Your post has been created!')
             return redirect('post_detail', pk=post.pk)
     else:
-        form = PostForm()
+        form = PostForm(user=request.user)
     
     context = {'form': form}
     return render(request, 'blog/create_post.html', context)
@@ -121,13 +250,13 @@ def edit_post(request, pk):
         return redirect('post_detail', pk=post.pk)
     
     if request.method == 'POST':
-        form = PostForm(request.POST, request.FILES, instance=post)
+        form = PostForm(request.POST, request.FILES, instance=post, user=request.user)
         if form.is_valid():
             form.save()
             messages.success(request, 'Your post has been updated!')
             return redirect('post_detail', pk=post.pk)
     else:
-        form = PostForm(instance=post)
+        form = PostForm(instance=post, user=request.user)
     
     context = {'form': form, 'post': post}
     return render(request, 'blog/edit_post.html', context)
@@ -194,68 +323,18 @@ def like_post(request, post_id):
         post = get_object_or_404(Post.objects.only('id'), pk=post_id)
         is_like_param = request.POST.get('is_like', '').lower()
         
-        with transaction.atomic():
-            # Start with base queryset
-            like_qs = Like.objects.select_for_update().filter(
-                user=request.user,
-                post=post
-            )
-            
-            # Get existing like if it exists
-            existing_like = like_qs.first()
-            
-            # Handle toggle off (empty is_like parameter)
-            if is_like_param == '':
-                if existing_like:
-                    existing_like.delete()
-                
-                # Get updated counts in a single optimized query
-                counts = Like.objects.filter(post=post).aggregate(
-                    like_count=Count('id', filter=Q(is_like=True)),
-                    dislike_count=Count('id', filter=Q(is_like=False))
-                )
-                
-                return JsonResponse({
-                    'success': True,
-                    'like_count': counts['like_count'],
-                    'dislike_count': counts['dislike_count'],
-                    'user_vote': None
-                })
-            
-            # Handle like/dislike
-            is_like = is_like_param == 'true'
-            
-            if existing_like:
-                if existing_like.is_like == is_like:
-                    # Toggle off
-                    existing_like.delete()
-                    user_vote = None
-                else:
-                    # Toggle between like/dislike
-                    existing_like.is_like = is_like
-                    existing_like.save(update_fields=['is_like'])
-                    user_vote = is_like
-            else:
-                # Create new like
-                Like.objects.create(
-                    user=request.user,
-                    post=post,
-                    is_like=is_like
-                )
-                user_vote = is_like
-            
-            # Get updated counts using a single query
-            counts = Like.objects.filter(post=post).aggregate(
-                like_count=Count('id', filter=Q(is_like=True)),
-                dislike_count=Count('id', filter=Q(is_like=False))
-            )
-            
-            return JsonResponse({
-                'success': True,
-                'like_count': counts['like_count'],
-                'dislike_count': counts['dislike_count'],
-                'user_vote': user_vote
-            })
+        # Empty is_like clears the vote; otherwise the click toggles like/dislike.
+        # apply_vote upserts the voter's own row and applies a counter delta,
+        # so concurrent voters never lock the post or re-count its likes.
+        is_like = None if is_like_param == '' else is_like_param == 'true'
+        _, user_vote, like_count, dislike_count = apply_vote(request.user, post.pk, is_like)
+        
+        return JsonResponse({
+            'success': True,
+            'like_count': like_count,
+            'dislike_count': dislike_count,
+            'user_vote': user_vote
+        })
             
     except Exception as e:
         logger.error(
@@ -273,6 +352,30 @@ def like_post(request, post_id):
         )
 
 
+MAX_VOTE_LOOKUP_IDS = 100
+
+
+def user_votes(request):
+    """Return the current user's votes and the vote counts for a batch of posts"""
+    try:
+        post_ids = [int(pk) for pk in request.GET.get('ids', '').split(',') if pk.strip()]
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid post ids'}, status=400)
+    post_ids = post_ids[:MAX_VOTE_LOOKUP_IDS]
+    
+    votes = Like.get_user_votes(request.user, post_ids)
+    counts = Post.objects.filter(pk__in=post_ids).values_list('pk', 'like_count', 'dislike_count')
+    
+    return JsonResponse({
+        'success': True,
+        'votes': {str(pk): is_like for pk, is_like in votes.items()},
+        'counts': {
+            str(pk): {'like_count': like_count, 'dislike_count': dislike_count}
+            for pk, like_count, dislike_count in counts
+        },
+    })
+
+
 @login_required
 def profile_settings(request):
     """View for users to edit their profile settings"""
@@ -357,23 +460,22 @@ def profile_view(request, username):
     logger = logging.getLogger(__name__)
     logger.info(f"Profile view called for username: {username}")
     
+    etag, last_modified = profile_validators(request, username)
+    response = not_modified(request, etag, last_modified)
+    if response is not None:
+        return response
+    
+    cache_versions = [profile_version_key(username)]
+    cached_response = get_cached_page(request, cache_versions)
+    if cached_response is not None:
+        return apply_validators(request, cached_response, etag, last_modified)
+    
     try:
-        from django.contrib.auth.models import User
-        user = get_object_or_404(User, username=username)
-        
-        # Get or create profile if it doesn't exist with safe defaults
-        profile, created = Profile.objects.get_or_create(
-            user=user,
-            defaults={
-                'privacy_setting': 'public',
-                'bio': ''
-            }
-        )
-        
-        # Ensure profile has all required fields
-        if not hasattr(profile, 'privacy_setting') or not profile.privacy_setting:
-            profile.privacy_setting = 'public'
-            profile.save()
+        # User, profile, follow counts and post totals in one query
+        user = load_profile_summary(username)
+        if user is None:
+            raise Http404('No such user')
+        profile = user.profile
         
         # Check if the current user can view this profile
         if not profile.can_view_profile(request.user):
@@ -383,74 +485,36 @@ def profile_view(request, username):
             messages.error(request, 'You do not have permission to view this profile.')
             return redirect('home')
         
-        # Get profile picture URL with error handling
-        try:
-            profile_picture_url = profile.get_profile_picture_url()
-        except Exception as e:
-            logger.error(f"Error getting profile picture URL: {str(e)}")
-            profile_picture_url = '/static/images/default-avatar.png'
+        # Avatar URLs and social links are cached until the profile changes
+        presentation = profile_presentation(user)
         
         # Get user's posts (show all posts to the owner, limit to 5 most recent)
-        try:
-            user_posts = Post.objects.filter(author=user).order_by('-created_at')
-            if request.user != user:  # For non-owners, only show posts with an image
-                user_posts = user_posts.exclude(image__isnull=True).exclude(image='')
-            user_posts = list(user_posts[:5])  # Convert to list after slicing
-            post_count = len(user_posts)  # Use len() since we have a list now
-        except Exception as e:
-            logger.error(f"Error getting user posts: {str(e)}")
-            user_posts = []
-            post_count = 0
+        user_posts = Post.objects.filter(author=user).order_by('-created_at')
+        if request.user != user:  # For non-owners, only show posts with an image
+            user_posts = user_posts.exclude(image__isnull=True).exclude(image='')
+        user_posts = list(user_posts[:5])
         
-        # Prepare social links if available
-        social_links = {}
-        try:
-            if hasattr(profile, 'website') and profile.website:
-                social_links['Website'] = profile.website
-            if hasattr(profile, 'twitter_handle') and profile.twitter_handle:
-                social_links['Twitter'] = f'https://twitter.com/{profile.twitter_handle}'
-            if hasattr(profile, 'github_username') and profile.github_username:
-                social_links['GitHub'] = f'https://github.com/{profile.github_username}'
-            # Add new social media fields
-            if hasattr(profile, 'facebook_url') and profile.facebook_url:
-                social_links['Facebook'] = profile.facebook_url
-            if hasattr(profile, 'instagram_username') and profile.instagram_username:
-                social_links['Instagram'] = f'https://instagram.com/{profile.instagram_username}'
-            if hasattr(profile, 'tiktok_username') and profile.tiktok_username:
-                social_links['TikTok'] = f'https://tiktok.com/@{profile.tiktok_username}'
-            if hasattr(profile, 'snapchat_username') and profile.snapchat_username:
-                social_links['Snapchat'] = f'https://snapchat.com/add/{profile.snapchat_username}'
-        except Exception as e:
-            logger.error(f"Error getting social links: {str(e)}")
-        
-        # Get follow data
-        is_following = False
-        if request.user.is_authenticated and request.user != user:
-            from .models import Follow
-            is_following = Follow.objects.filter(
-                follower=request.user, 
-                following=user
-            ).exists()
-            
-        # Get followers and following counts
-        followers_count = user.followers.count()
-        following_count = user.following.count()
+        # The only viewer-specific part of the page
+        is_following = viewer_is_following(request, user.pk)
         
         context = {
             'profile_user': user,
             'profile': profile,
-            'profile_picture_url': profile_picture_url,
+            'profile_picture_url': presentation['profile_picture_url'],
+            'avatar': presentation['avatar'],
             'user_posts': user_posts,
-            'post_count': post_count,
-            'social_links': social_links,
+            # Counts the same posts the grid is drawn from
+            'post_count': user.post_total if request.user == user else user.image_post_total,
+            'social_links': presentation['social_links'],
             'can_edit': request.user == user,
             'is_owner': request.user == user,
             'is_following': is_following,
-            'followers_count': followers_count,
-            'following_count': following_count,
+            'followers_count': profile.followers_count,
+            'following_count': profile.following_count,
         }
         
-        return render(request, 'blog/profile_view.html', context)
+        response = store_cached_page(request, cache_versions, render(request, 'blog/profile_view.html', context))
+        return apply_validators(request, response, etag, last_modified)
         
     except Exception as e:
         logger.error(f"Error in profile_view: {str(e)}", exc_info=True)
@@ -475,16 +539,19 @@ def follow_user(request, username):
             return JsonResponse({'error': 'You cannot follow yourself'}, status=400)
         
         from .models import Follow
-        follow, created = Follow.objects.get_or_create(
-            follower=request.user,
-            following=user_to_follow
-        )
-        
-        if not created:
-            follow.delete()
-            return JsonResponse({'status': 'unfollowed', 'count': user_to_follow.followers.count()})
+        with transaction.atomic():
+            follow, created = Follow.objects.get_or_create(
+                follower=request.user,
+                following=user_to_follow
+            )
+            
+            if not created:
+                follow.delete()
             
-        return JsonResponse({'status': 'followed', 'count': user_to_follow.followers.count()})
+            # The Follow signals adjusted the denormalized count in this transaction
+            count = Profile.objects.filter(user=user_to_follow).values_list('followers_count', flat=True).first() or 0
+        
+        return JsonResponse({'status': 'followed' if created else 'unfollowed', 'count': count})
         
     except get_user_model().DoesNotExist:
         return JsonResponse({'error': 'User not found'}, status=404)
@@ -506,67 +573,95 @@ def get_user_data(user):
     }
 
 
-def followers_list(request, username):
-    """View to get list of followers for a user"""
+FOLLOW_PAGE_SIZE = 20
+MAX_FOLLOW_PAGE_SIZE = 50
+
+
+def follow_page(request, follows, related):
+    """
+    One keyset page of Follow rows with the listed user and their profile
+    joined in. `related` is 'follower' or 'following' depending on the list.
+    """
+    try:
+        per_page = min(max(int(request.GET.get('limit', FOLLOW_PAGE_SIZE)), 1), MAX_FOLLOW_PAGE_SIZE)
+    except ValueError:
+        per_page = FOLLOW_PAGE_SIZE
+    follows = follows.select_related(f'{related}__profile')
+    page = KeysetPaginator(follows, per_page).page(request.GET.get('cursor'))
+    return [getattr(follow, related) for follow in page], page.next_cursor
+
+
+def follow_list_response(request, username, related):
     if not request.headers.get('x-requested-with') == 'XMLHttpRequest':
         return JsonResponse({'error': 'Invalid request'}, status=400)
     
-    try:
-        user = get_user_model().objects.get(username=username)
-        followers = user.followers.all().select_related('follower')
-        
-        followers_data = [{
-            'username': follow.follower.username,
-            'full_name': follow.follower.get_full_name(),
-            'avatar': request.build_absolute_uri(follow.follower.profile.profile_picture.url) if hasattr(follow.follower, 'profile') and follow.follower.profile.profile_picture else ''
-        } for follow in followers]
-        
-        return JsonResponse(followers_data, safe=False)
-    except get_user_model().DoesNotExist:
+    user = get_user_model().objects.filter(username=username).only('id').first()
+    if user is None:
         return JsonResponse({'error': 'User not found'}, status=404)
-    except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
+    
+    follows = user.followers.all() if related == 'follower' else user.following.all()
+    try:
+        people, next_cursor = follow_page(request, follows, related)
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+    
+    return JsonResponse({
+        'results': [{
+            'username': person.username,
+            'full_name': person.get_full_name(),
+            'avatar': request.build_absolute_uri(person.profile.profile_picture.url) if hasattr(person, 'profile') and person.profile.profile_picture else ''
+        } for person in people],
+        'next_cursor': next_cursor,
+    })
+
+
+def followers_list(request, username):
+    """View to get a page of followers for a user"""
+    return follow_list_response(request, username, 'follower')
 
 
 def following_list(request, username):
-    """View to get list of users that the given user is following"""
-    if not request.headers.get('x-requested-with') == 'XMLHttpRequest':
-        return JsonResponse({'error': 'Invalid request'}, status=400)
-    
+    """View to get a page of users that the given user is following"""
+    return follow_list_response(request, username, 'following')
+
+
+def follow_modal_response(request, username, related, template_name, url_name):
+    user = get_object_or_404(get_user_model().objects.only('id', 'username'), username=username)
+    follows = user.followers.all() if related == 'follower' else user.following.all()
     try:
-        user = get_user_model().objects.get(username=username)
-        following = user.following.all().select_related('following')
-        
-        following_data = [{
-            'username': follow.following.username,
-            'full_name': follow.following.get_full_name(),
-            'avatar': request.build_absolute_uri(follow.following.profile.profile_picture.url) if hasattr(follow.following, 'profile') and follow.following.profile.profile_picture else ''
-        } for follow in following]
-        
-        return JsonResponse(following_data, safe=False)
-    except get_user_model().DoesNotExist:
-        return JsonResponse({'error': 'User not found'}, status=404)
-    except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
+        people, next_cursor = follow_page(request, follows, related)
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+    
+    context = {
+        'people': people,
+        'next_url': f"{reverse(url_name, args=[user.username])}?cursor={next_cursor}" if next_cursor else '',
+        'profile_user': user,
+    }
+    # Infinite scroll asks for the following pages as bare list items
+    if request.GET.get('cursor'):
+        template_name = 'blog/includes/follow_rows.html'
+    return render(request, template_name, context)
 
 
 def followers_modal(request, username):
     """View to display followers in a modal"""
-    user = get_object_or_404(get_user_model(), username=username)
-    followers = user.followers.all().select_related('follower')
-    return render(request, 'blog/includes/followers_modal.html', {
-        'followers': followers,
-        'profile_user': user
-    })
+    return follow_modal_response(request, username, 'follower', 'blog/includes/followers_modal.html', 'followers_modal')
 
 
 def following_modal(request, username):
     """View to display following list in a modal"""
-    user = get_object_or_404(get_user_model(), username=username)
-    following = user.following.all().select_related('following')
-    return render(request, 'blog/includes/following_modal.html', {
-        'following': following,
-        'profile_user': user
+    return follow_modal_response(request, username, 'following', 'blog/includes/following_modal.html', 'following_modal')
+
+
+@login_required
+def follow_suggestions(request):
+    """
+    "People you may know" as an HTML fragment. Loaded after the page so
+    profile_view and user_search keep their page cache and validators.
+    """
+    return render(request, 'blog/includes/follow_suggestions.html', {
+        'suggestions': suggested_users(request.user),
     })
 
 
@@ -576,22 +671,8 @@ def user_search(request):
     users = []
     
     if form.is_valid() and form.cleaned_data.get('query'):
-        query = form.cleaned_data['query']
-        users = get_user_model().objects.filter(
-            Q(username__icontains=query) |
-            Q(first_name__icontains=query) |
-            Q(last_name__icontains=query) |
-            Q(email__icontains=query)
-        ).select_related('profile').order_by('username')
-        
-        # Filter out users with private profiles if not the owner
-        if not request.user.is_authenticated:
-            users = users.filter(profile__privacy_setting='public')
-        elif not request.user.is_superuser:  # Admins can see all users
-            users = users.exclude(
-                ~Q(profile__user=request.user) & 
-                Q(profile__privacy_setting='private')
-            )
+        # Ranked ids from the search index, already filtered by privacy
+        users = search_users(form.cleaned_data['query'], request.user)
     
     # Pagination
     page = request.GET.get('page', 1)
@@ -603,6 +684,7 @@ def user_search(request):
         users = paginator.page(1)
     except EmptyPage:
         users = paginator.page(paginator.num_pages)
+    users.object_list = users_in_order(users.object_list)
     
     return render(request, 'blog/user_search.html', {
         'form': form,
@@ -611,6 +693,51 @@ def user_search(request):
     })
 
 
+AUTOCOMPLETE_LIMIT = 8
+MAX_AUTOCOMPLETE_LIMIT = 20
+
+
+def user_autocomplete(request):
+    """Typeahead JSON for usernames and display names, served from memory"""
+    try:
+        limit = min(max(int(request.GET.get('limit', AUTOCOMPLETE_LIMIT)), 1), MAX_AUTOCOMPLETE_LIMIT)
+    except ValueError:
+        limit = AUTOCOMPLETE_LIMIT
+    matches = autocomplete_index.lookup(request.GET.get('q', '')[:100], request.user, limit)
+    return JsonResponse({
+        'results': [
+            {
+                'username': username,
+                'full_name': full_name,
+                'url': reverse('profile_view', args=[username]),
+            }
+            for _, username, full_name in matches
+        ],
+    })
+
+
+POST_SEARCH_PAGE_SIZE = 10
+
+
+def post_search(request):
+    """Full-text search over post titles and content, most relevant first"""
+    form = PostSearchForm(request.GET or None)
+    page_obj = None
+    
+    if form.is_valid() and form.cleaned_data.get('query'):
+        query = form.cleaned_data['query']
+        try:
+            page_obj = search_posts(query, request.GET.get('cursor'), POST_SEARCH_PAGE_SIZE)
+        except InvalidCursor:
+            page_obj = search_posts(query, per_page=POST_SEARCH_PAGE_SIZE)
+    
+    return render(request, 'blog/post_search.html', {
+        'form': form,
+        'page_obj': page_obj,
+        'query': request.GET.get('query', ''),
+    })
+
+
 def handler404(request, exception, template_name='errors/404.html'):
     """
     Custom 404 error handler
@@ -627,3 +754,60 @@ def handler500(request, template_name='errors/500.html'):
     response = render(request, template_name, status=500)
     response.status_code = 500
     return response
+
+
+@login_required
+@require_POST
+def start_upload(request):
+    """Begin a chunked video/audio upload; the client then PUTs chunks to upload_chunk"""
+    try:
+        upload = create_upload(
+            request.user, request.POST.get('kind'), request.POST.get('filename'), request.POST.get('size')
+        )
+    except InvalidUpload as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(upload_state(upload), status=201)
+
+
+@login_required
+@require_http_methods(['GET', 'PUT'])
+def upload_chunk(request, upload_id):
+    """
+    GET reports how far an upload got, for resuming. PUT appends the
+    request body at the byte offset given in the Upload-Offset header.
+    """
+    upload = get_object_or_404(ChunkedUpload, pk=upload_id, user=request.user)
+    if request.method == 'GET':
+        return JsonResponse(upload_state(upload))
+
+    try:
+        offset = int(request.headers['Upload-Offset'])
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except (KeyError, ValueError):
+        return JsonResponse({'error': 'Upload-Offset and Content-Length are required'}, status=400)
+    try:
+        # Read straight from the request stream, never request.body
+        append_chunk(upload, offset, request, length)
+    except OffsetMismatch as e:
+        return JsonResponse({'error': str(e), **upload_state(upload), 'offset': e.offset}, status=409)
+    except InvalidUpload as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(upload_state(upload))
+
+
+@login_required
+@require_POST
+def finish_upload(request, upload_id):
+    """Store a fully received upload so a post form can attach it"""
+    upload = get_object_or_404(ChunkedUpload, pk=upload_id, user=request.user)
+    try:
+        complete_upload(upload)
+    except InvalidUpload as e:
+        return JsonResponse({'error': str(e), **upload_state(upload)}, status=400)
+    return JsonResponse(upload_state(upload))
+
+
+@require_http_methods(['GET', 'HEAD'])
+def serve_media(request, path):
+    """Uploaded files under MEDIA_ROOT, with Range requests and cache validators"""
+    return media_response(request, path)
@@ -0,0 +1,128 @@
+"""
+Lock-free vote path for like_post.
+
+A vote is applied with conflict-aware writes on the voter's own Like row
+instead of SELECT ... FOR UPDATE, and the post counters get a single F()
+delta. Concurrent voters on the same post therefore never wait on each
+other's row locks and never re-count the post's likes.
+
+On PostgreSQL the create/flip case is one INSERT ... ON CONFLICT DO UPDATE
+statement whose RETURNING clause tells us whether the row was inserted or
+flipped (xmax = 0 only for freshly inserted rows). Other backends run the
+same decision as a short sequence of conditional writes; each write only
+succeeds for one of the possible previous states, so the delta is exact.
+"""
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Like, Post
+from .page_cache import feed_version_key, post_version_key
+from .signals import adjust_post_counters, bump_versions_on_commit
+
+
+def _delete_vote(user_id, post_id, is_like):
+    """DELETE the vote only if it matches `is_like`; True if a row was removed"""
+    table = connection.ops.quote_name(Like._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} WHERE user_id = %s AND post_id = %s AND is_like = %s',
+            [user_id, post_id, is_like],
+        )
+        return cursor.rowcount == 1
+
+
+def _clear_vote(user_id, post_id):
+    """Remove whichever vote exists and return it (True, False or None)"""
+    for is_like in (True, False):
+        if _delete_vote(user_id, post_id, is_like):
+            return is_like
+    return None
+
+
+def _insert_vote(user_id, post_id, is_like):
+    """INSERT ... ON CONFLICT DO NOTHING; True if a new row was created"""
+    table = connection.ops.quote_name(Like._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} (user_id, post_id, is_like, created_at) VALUES (%s, %s, %s, %s) '
+            f'ON CONFLICT (user_id, post_id) DO NOTHING',
+            [user_id, post_id, is_like, connection.ops.adapt_datetimefield_value(timezone.now())],
+        )
+        return cursor.rowcount == 1
+
+
+def _upsert_vote_postgresql(user_id, post_id, is_like):
+    """
+    Insert or flip the vote in one statement.
+    Returns 'created', 'flipped', or None when the same vote already exists.
+    """
+    table = connection.ops.quote_name(Like._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} AS v (user_id, post_id, is_like, created_at) VALUES (%s, %s, %s, %s) '
+            f'ON CONFLICT (user_id, post_id) DO UPDATE SET is_like = EXCLUDED.is_like '
+            f'WHERE v.is_like <> EXCLUDED.is_like '
+            f'RETURNING (xmax = 0)',
+            [user_id, post_id, is_like, connection.ops.adapt_datetimefield_value(timezone.now())],
+        )
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    return 'created' if row[0] else 'flipped'
+
+
+def _upsert_vote_generic(user_id, post_id, is_like):
+    """Same contract as _upsert_vote_postgresql using conditional writes"""
+    while True:
+        if _insert_vote(user_id, post_id, is_like):
+            return 'created'
+        if Like.objects.filter(user_id=user_id, post_id=post_id).exclude(is_like=is_like).update(is_like=is_like):
+            return 'flipped'
+        if Like.objects.filter(user_id=user_id, post_id=post_id, is_like=is_like).exists():
+            return None
+        # The row was deleted between our statements; try again
+
+
+def _field(is_like):
+    return 'like_count' if is_like else 'dislike_count'
+
+
+def apply_vote(user, post_id, is_like):
+    """
+    Apply a vote click with the same toggle semantics as the vote buttons:
+    voting again for the current choice removes it, `is_like=None` clears it.
+
+    Returns (previous_vote, current_vote, like_count, dislike_count).
+    """
+    with transaction.atomic():
+        if is_like is None:
+            previous = _clear_vote(user.pk, post_id)
+            current = None
+        else:
+            if connection.vendor == 'postgresql':
+                outcome = _upsert_vote_postgresql(user.pk, post_id, is_like)
+            else:
+                outcome = _upsert_vote_generic(user.pk, post_id, is_like)
+
+            if outcome == 'created':
+                previous, current = None, is_like
+            elif outcome == 'flipped':
+                previous, current = (not is_like), is_like
+            elif _delete_vote(user.pk, post_id, is_like):
+                # Same vote clicked again: toggle it off
+                previous, current = is_like, None
+            else:
+                # A concurrent request removed it first; nothing changed
+                previous = current = None
+
+        deltas = {}
+        if previous is not None:
+            deltas[_field(previous)] = -1
+        if current is not None:
+            deltas[_field(current)] = deltas.get(_field(current), 0) + 1
+        if deltas:
+            adjust_post_counters(post_id, **deltas)
+            bump_versions_on_commit(feed_version_key(), post_version_key(post_id))
+
+        counts = Post.objects.filter(pk=post_id).values_list('like_count', 'dislike_count').get()
+    return previous, current, counts[0], counts[1]
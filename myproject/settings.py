@@ -13,6 +13,7 @@ from pathlib import Path
 from decouple import config
 import os
 import logging
+import tempfile
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -165,9 +166,29 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 # File upload settings
-MAX_UPLOAD_SIZE = 52428800  # 50MB in bytes
-DATA_UPLOAD_MAX_MEMORY_SIZE = 52428800  # 50MB in bytes
-FILE_UPLOAD_MAX_MEMORY_SIZE = 52428800  # 50MB in bytes
+MAX_UPLOAD_SIZE = 52428800  # 50MB in bytes, per file
+# Uploaded files larger than this spool to a temp file instead of being
+# held in worker memory; the other limit caps the non-file form fields
+DATA_UPLOAD_MAX_MEMORY_SIZE = 2621440  # 2.5MB in bytes
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2621440  # 2.5MB in bytes
+
+# Chunked, resumable video/audio uploads (see blog/uploads.py). The temp
+# directory must be shared by every worker that serves /uploads/.
+CHUNKED_UPLOAD_TEMP_DIR = os.environ.get(
+    'CHUNKED_UPLOAD_TEMP_DIR', os.path.join(tempfile.gettempdir(), 'blog-chunked-uploads')
+)
+CHUNKED_UPLOAD_CHUNK_SIZE = int(os.environ.get('CHUNKED_UPLOAD_CHUNK_SIZE', 5 * 1024 * 1024))  # bytes
+CHUNKED_UPLOAD_EXPIRY_HOURS = int(os.environ.get('CHUNKED_UPLOAD_EXPIRY_HOURS', 24))
+
+# Serving /media/ (see blog/media_serving.py). Content-addressed names
+# (image derivatives) are cached for a year; others are revalidated.
+MEDIA_CACHE_MAX_AGE = int(os.environ.get('MEDIA_CACHE_MAX_AGE', 3600))  # seconds
+MEDIA_IMMUTABLE_MAX_AGE = 31536000  # seconds
+# '' streams files from Python; 'x-accel-redirect' (nginx) or 'x-sendfile'
+# (Apache mod_xsendfile, lighttpd) lets the web server send them. For nginx,
+# MEDIA_SENDFILE_PREFIX must be an `internal` location aliased to MEDIA_ROOT.
+MEDIA_SENDFILE = os.environ.get('MEDIA_SENDFILE', '')
+MEDIA_SENDFILE_PREFIX = os.environ.get('MEDIA_SENDFILE_PREFIX', '/protected-media/')
 
 # File upload validators
 FILE_UPLOAD_HANDLERS = [
@@ -251,12 +272,87 @@ else:
     DEFAULT_FILE_STORAGE = 'django.core.files.storage.FileSystemStorage'
 MEDIA_ROOT = BASE_DIR / 'media'  # Fallback for local development
 
+# Put a memoizing layer in front of whichever backend was chosen above, so
+# repeated url()/exists() calls (signed URLs, HTTP HEADs on Cloudinary) are
+# answered from process memory (see blog/storage.py). Size 0 disables it.
+MEDIA_STORAGE_BACKEND = DEFAULT_FILE_STORAGE
+MEDIA_URL_CACHE_SIZE = int(os.environ.get('MEDIA_URL_CACHE_SIZE', 10000))  # entries per process
+MEDIA_URL_CACHE_TIMEOUT = int(os.environ.get('MEDIA_URL_CACHE_TIMEOUT', 300))  # seconds
+DEFAULT_FILE_STORAGE = 'blog.storage.CachedURLStorage'
+
 # WhiteNoise configuration - exclude media files
 WHITENOISE_USE_FINDERS = True
 WHITENOISE_AUTOREFRESH = True
 WHITENOISE_MAX_AGE = 31536000
 WHITENOISE_SKIP_COMPRESS_EXTENSIONS = ['jpg', 'jpeg', 'png', 'gif', 'webp', 'zip', 'gz', 'tgz', 'bz2', 'tbz', 'xz', 'br']
 
+# Caching
+# Use Redis when REDIS_URL is set so all workers share page caches and
+# version counters; otherwise fall back to a per-process memory cache.
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            # Django's own Redis backend; only needs the redis client library
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'blog-default',
+        }
+    }
+
+# Anonymous full-page cache lifetime (see blog/page_cache.py), 0 disables
+PAGE_CACHE_TIMEOUT = int(os.environ.get('PAGE_CACHE_TIMEOUT', 60))  # seconds
+
+# Post view counting (see blog/view_counter.py)
+# Views are buffered and written back in batches at most once per interval.
+# Use 'cache' to share the buffer between workers through the Django cache.
+VIEW_COUNT_FLUSH_INTERVAL = int(os.environ.get('VIEW_COUNT_FLUSH_INTERVAL', 10))  # seconds
+VIEW_COUNT_BUFFER = os.environ.get('VIEW_COUNT_BUFFER', 'memory')
+
+# Trending ranking for the home sidebar (see blog/rankings.py)
+RANKING_WINDOW_DAYS = int(os.environ.get('RANKING_WINDOW_DAYS', 30))
+# Run `manage.py refresh_rankings --loop` as a separate process: it rescores
+# posts with new activity every RANKING_REFRESH_INTERVAL and the whole
+# window every RANKING_FULL_REFRESH_INTERVAL.
+RANKING_REFRESH_INTERVAL = int(os.environ.get('RANKING_REFRESH_INTERVAL', 60))  # seconds
+RANKING_FULL_REFRESH_INTERVAL = int(os.environ.get('RANKING_FULL_REFRESH_INTERVAL', 3600))  # seconds
+
+# Following timelines (see blog/timeline.py)
+# Authors with at least TIMELINE_FANOUT_LIMIT followers are not fanned out;
+# their posts are merged into readers' timelines at query time instead.
+TIMELINE_FANOUT_LIMIT = int(os.environ.get('TIMELINE_FANOUT_LIMIT', 10000))
+TIMELINE_FANOUT_BATCH_SIZE = int(os.environ.get('TIMELINE_FANOUT_BATCH_SIZE', 1000))
+TIMELINE_BACKFILL_SIZE = int(os.environ.get('TIMELINE_BACKFILL_SIZE', 50))  # posts copied on follow
+
+# "People you may know" (see blog/suggestions.py)
+SUGGESTIONS_SEED_LIMIT = int(os.environ.get('SUGGESTIONS_SEED_LIMIT', 500))  # newest follows used as seeds
+SUGGESTIONS_TIME_BUDGET = float(os.environ.get('SUGGESTIONS_TIME_BUDGET', 0.2))  # seconds
+SUGGESTIONS_CACHE_TIMEOUT = int(os.environ.get('SUGGESTIONS_CACHE_TIMEOUT', 3600))  # seconds
+
+# Cached avatar URL and social links for profile_view (see blog/profile_summary.py)
+PROFILE_SUMMARY_CACHE_TIMEOUT = int(os.environ.get('PROFILE_SUMMARY_CACHE_TIMEOUT', 3600))  # seconds
+
+# Post search (see blog/search.py)
+# Only the newest matches are ranked, which bounds the cost of broad queries.
+POST_SEARCH_RANK_CANDIDATES = int(os.environ.get('POST_SEARCH_RANK_CANDIDATES', 1000))
+
+# Username autocomplete (see blog/autocomplete.py)
+# How often each worker replays other workers' user/privacy changes; also
+# the longest a privacy change can take to reach every worker.
+AUTOCOMPLETE_REFRESH_INTERVAL = float(os.environ.get('AUTOCOMPLETE_REFRESH_INTERVAL', 10))  # seconds
+
+# Resized/WebP copies of post images and profile pictures (see blog/images.py)
+# are built by this many background threads per process after an upload.
+# 0 builds them inline when the upload commits; `manage.py
+# generate_image_derivatives` backfills existing uploads.
+IMAGE_DERIVATIVE_WORKERS = int(os.environ.get('IMAGE_DERIVATIVE_WORKERS', 2))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
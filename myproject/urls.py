@@ -19,7 +19,7 @@ from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from django.views.generic import RedirectView
-from django.views.static import serve
+from blog.views import serve_media
 
 from django.contrib import admin
 
@@ -35,19 +35,16 @@ urlpatterns = [
     path('admin/doc/', include('django.contrib.admindocs.urls')),
 ]
 
-# Serve media files in development
+# Media files, with Range support so audio/video players can seek. Set
+# MEDIA_SENDFILE to hand the bytes to nginx/Apache instead of streaming
+# them from Python.
+urlpatterns += [
+    re_path(r'^media/(?P<path>.*)$', serve_media, name='serve_media'),
+]
+
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
 else:
-        # In production, serve media files through Django if needed (better to use a CDN or web server)
-    urlpatterns += [
-        re_path(r'^media/(?P<path>.*)$', serve, {
-            'document_root': settings.MEDIA_ROOT,
-            'show_indexes': False,
-        }),
-    ]
-    
     # Serve static files in production using WhiteNoise
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
 
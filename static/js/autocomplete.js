@@ -0,0 +1,78 @@
+// Username typeahead for inputs with a data-autocomplete-url attribute
+document.addEventListener('DOMContentLoaded', () => {
+    document.querySelectorAll('input[data-autocomplete-url]').forEach(input => {
+        const menu = document.createElement('div');
+        menu.className = 'list-group position-absolute w-100 shadow-sm d-none';
+        menu.style.top = '100%';
+        menu.style.zIndex = '1050';
+        input.parentElement.classList.add('position-relative');
+        input.parentElement.appendChild(menu);
+
+        let timer = null;
+        let controller = null;
+
+        const hide = () => menu.classList.add('d-none');
+
+        const render = results => {
+            menu.replaceChildren();
+            results.forEach(result => {
+                const item = document.createElement('a');
+                item.className = 'list-group-item list-group-item-action';
+                item.href = result.url;
+                const name = document.createElement('strong');
+                name.textContent = result.full_name || result.username;
+                const handle = document.createElement('span');
+                handle.className = 'text-muted ms-2';
+                handle.textContent = `@${result.username}`;
+                item.append(name, handle);
+                menu.appendChild(item);
+            });
+            menu.classList.toggle('d-none', results.length === 0);
+        };
+
+        input.addEventListener('input', () => {
+            clearTimeout(timer);
+            const query = input.value.trim();
+            if (!query) {
+                hide();
+                return;
+            }
+            // Wait for a pause in typing, and drop answers to stale prefixes
+            timer = setTimeout(() => {
+                if (controller) {
+                    controller.abort();
+                }
+                controller = new AbortController();
+                const url = `${input.dataset.autocompleteUrl}?q=${encodeURIComponent(query)}`;
+                fetch(url, {
+                    headers: { 'X-Requested-With': 'XMLHttpRequest' },
+                    credentials: 'same-origin',
+                    signal: controller.signal
+                })
+                    .then(response => {
+                        if (!response.ok) {
+                            throw new Error(`HTTP ${response.status}`);
+                        }
+                        return response.json();
+                    })
+                    .then(data => render(data.results))
+                    .catch(error => {
+                        if (error.name !== 'AbortError') {
+                            console.error('Error loading autocomplete results:', error);
+                        }
+                    });
+            }, 120);
+        });
+
+        input.addEventListener('keydown', event => {
+            if (event.key === 'Escape') {
+                hide();
+            }
+        });
+        document.addEventListener('click', event => {
+            if (!input.parentElement.contains(event.target)) {
+                hide();
+            }
+        });
+    });
+});
@@ -0,0 +1,150 @@
+// Send video/audio files in resumable chunks before a post form submits.
+// File inputs carry data-chunked-upload (the id of the hidden field that
+// receives the finished upload's id); the form carries data-upload-url.
+(() => {
+    const MAX_RETRIES = 5;
+
+    const csrfToken = form =>
+        form.querySelector('[name=csrfmiddlewaretoken]')?.value ||
+        document.cookie.match(/csrftoken=([^;]+)/)?.[1] || '';
+
+    const sleep = ms => new Promise(resolve => setTimeout(resolve, ms));
+
+    // Remembered per file so a reload or a new tab resumes instead of restarting
+    const storageKey = (kind, file) => `chunked-upload:${kind}:${file.name}:${file.size}:${file.lastModified}`;
+
+    async function request(url, options, token) {
+        const response = await fetch(url, {
+            credentials: 'same-origin',
+            ...options,
+            headers: { 'X-CSRFToken': token, 'X-Requested-With': 'XMLHttpRequest', ...(options.headers || {}) },
+        });
+        const data = await response.json().catch(() => ({}));
+        return { response, data };
+    }
+
+    async function resumeOrStart(startUrl, kind, file, token) {
+        const savedUrl = localStorage.getItem(storageKey(kind, file));
+        if (savedUrl) {
+            try {
+                const { response, data } = await request(savedUrl, { method: 'GET' }, token);
+                if (response.ok) {
+                    return { url: savedUrl, state: data };
+                }
+            } catch (error) {
+                // Fall through and start over
+            }
+            localStorage.removeItem(storageKey(kind, file));
+        }
+        const body = new FormData();
+        body.append('kind', kind);
+        body.append('filename', file.name);
+        body.append('size', file.size);
+        const { response, data } = await request(startUrl, { method: 'POST', body }, token);
+        if (!response.ok) {
+            throw new Error(data.error || `Upload could not start (HTTP ${response.status})`);
+        }
+        const url = `${startUrl}${data.id}/`;
+        localStorage.setItem(storageKey(kind, file), url);
+        return { url, state: data };
+    }
+
+    async function sendFile(startUrl, kind, file, token, onProgress) {
+        let { url, state } = await resumeOrStart(startUrl, kind, file, token);
+        let retries = 0;
+        while (state.status === 'uploading' && state.offset < state.size) {
+            const chunk = file.slice(state.offset, Math.min(state.offset + state.chunk_size, state.size));
+            onProgress(state.offset / state.size);
+            try {
+                const { response, data } = await request(url, {
+                    method: 'PUT',
+                    body: chunk,
+                    headers: { 'Upload-Offset': String(state.offset), 'Content-Type': 'application/octet-stream' },
+                }, token);
+                if (response.ok || response.status === 409) {
+                    // 409 means the server is elsewhere (e.g. a retried chunk landed); carry on from there
+                    state = { ...state, ...data };
+                    retries = 0;
+                    continue;
+                }
+                throw new Error(data.error || `HTTP ${response.status}`);
+            } catch (error) {
+                if (++retries > MAX_RETRIES) {
+                    throw error;
+                }
+                // Back off, then ask the server how much actually arrived
+                await sleep(1000 * 2 ** (retries - 1));
+                const { response, data } = await request(url, { method: 'GET' }, token).catch(() => ({}));
+                if (response && response.ok) {
+                    state = data;
+                }
+            }
+        }
+        onProgress(1);
+        if (state.status !== 'complete') {
+            const { response, data } = await request(`${url}complete/`, { method: 'POST' }, token);
+            if (!response.ok) {
+                throw new Error(data.error || `Upload could not be completed (HTTP ${response.status})`);
+            }
+            state = data;
+        }
+        localStorage.removeItem(storageKey(kind, file));
+        return state.id;
+    }
+
+    function progressBar(input) {
+        let bar = input.parentElement.querySelector('.chunked-upload-progress');
+        if (!bar) {
+            bar = document.createElement('div');
+            bar.className = 'progress mt-2 chunked-upload-progress';
+            bar.innerHTML = '<div class="progress-bar" role="progressbar" style="width: 0%"></div>';
+            input.parentElement.appendChild(bar);
+        }
+        const inner = bar.firstElementChild;
+        return fraction => {
+            inner.style.width = `${Math.round(fraction * 100)}%`;
+            inner.textContent = `${Math.round(fraction * 100)}%`;
+        };
+    }
+
+    document.addEventListener('DOMContentLoaded', () => {
+        document.querySelectorAll('form[data-upload-url]').forEach(form => {
+            let uploading = false;
+            form.addEventListener('submit', async event => {
+                const inputs = [...form.querySelectorAll('input[type=file][data-chunked-upload]')]
+                    .filter(input => input.files.length);
+                if (!inputs.length || uploading) {
+                    if (uploading) {
+                        event.preventDefault();
+                    }
+                    return;
+                }
+                event.preventDefault();
+                uploading = true;
+                const submit = form.querySelector('[type=submit]');
+                if (submit) {
+                    submit.disabled = true;
+                }
+                try {
+                    for (const input of inputs) {
+                        const kind = input.name;
+                        const id = await sendFile(
+                            form.dataset.uploadUrl, kind, input.files[0], csrfToken(form), progressBar(input)
+                        );
+                        document.getElementById(input.dataset.chunkedUpload).value = id;
+                        // The file is already stored; don't send it again with the form
+                        input.value = '';
+                    }
+                    form.submit();
+                } catch (error) {
+                    console.error('Chunked upload failed:', error);
+                    alert(`Upload failed: ${error.message}. Submit the form again to resume.`);
+                    uploading = false;
+                    if (submit) {
+                        submit.disabled = false;
+                    }
+                }
+            });
+        });
+    });
+})();
@@ -2,6 +2,7 @@
 document.addEventListener('DOMContentLoaded', () => {
     initializeLikeButtons();
     initializeButtonStates();
+    hydrateVoteStates();
 });
 
 // Initialize event listeners for like/dislike buttons
@@ -43,6 +44,42 @@ function initializeButtonStates() {
     });
 }
 
+// Fetch vote state for every button rendered without one, in a single request
+async function hydrateVoteStates() {
+    const pending = document.querySelectorAll('.like-btn:not([data-user-vote]), .dislike-btn:not([data-user-vote])');
+    const postIds = [...new Set([...pending].map(button => button.dataset.postId))];
+    if (!postIds.length) return;
+    
+    try {
+        const response = await fetch(`/votes/?ids=${postIds.join(',')}`, {
+            headers: { 'X-Requested-With': 'XMLHttpRequest' }
+        });
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        
+        const data = await response.json();
+        if (!data.success) return;
+        
+        postIds.forEach(postId => {
+            const counts = data.counts[postId];
+            if (counts) {
+                updateCounts(postId, counts.like_count, counts.dislike_count);
+            }
+            const userVote = postId in data.votes ? data.votes[postId] : null;
+            document.querySelectorAll(`[data-post-id="${postId}"]`).forEach(button => {
+                button.dataset.userVote = userVote === null ? '' : String(userVote);
+                const isLike = button.classList.contains('like-btn');
+                if ((isLike && userVote === true) || (!isLike && userVote === false)) {
+                    updateButtonState(button, true);
+                }
+            });
+        });
+    } catch (error) {
+        console.error('Error loading vote states:', error);
+    }
+}
+
 // Handle the voting process with optimistic UI updates
 async function handleVote(button, isLike) {
     const postId = button.dataset.postId;
@@ -0,0 +1,21 @@
+// Fill "People you may know" placeholders after the page has loaded
+document.addEventListener('DOMContentLoaded', () => {
+    document.querySelectorAll('.follow-suggestions[data-url]').forEach(container => {
+        fetch(container.dataset.url, {
+            headers: { 'X-Requested-With': 'XMLHttpRequest' },
+            credentials: 'same-origin'
+        })
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(`HTTP ${response.status}`);
+                }
+                return response.text();
+            })
+            .then(html => {
+                container.innerHTML = html;
+            })
+            .catch(error => {
+                console.error('Error loading suggestions:', error);
+            });
+    });
+});